@@ -1,6 +1,12 @@
 from django.contrib import admin
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from .latency_timeline import timeline_rows, timeline_summary
 from .models import Problem, InterviewSession, ChatMessage, CodeSubmission, UserProblem, UserProfile, InterviewRecording
 
+# Highlights timeline turns whose reply was slower than LATENCY_TIMELINE_SLOW_MS
+SLOW_ROW_STYLE = mark_safe(' style="background:#fff3cd"')
+
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -23,7 +29,29 @@ class InterviewSessionAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'status', 'difficulty_preference', 'started_at']
     list_filter = ['status', 'difficulty_preference', 'started_at']
     search_fields = ['user__username']
-    readonly_fields = ['started_at', 'completed_at']
+    readonly_fields = ['started_at', 'completed_at', 'latency_timeline_table']
+    exclude = ['latency_timeline']
+    
+    @admin.display(description='Latency timeline')
+    def latency_timeline_table(self, obj):
+        summary = timeline_summary(obj.latency_timeline)
+        if not summary:
+            return '-'
+        rows = format_html_join(
+            '',
+            '<tr{}><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+            (
+                (SLOW_ROW_STYLE if turn['slow'] else '', f"{turn['at']:.1f}", turn['kind'],
+                 *('-' if turn[stage] is None else turn[stage] for stage in ('first_token', 'reply', 'tts')))
+                for turn in timeline_rows(obj.latency_timeline)
+            )
+        )
+        return format_html(
+            '<p>{} turns, median reply {} ms, slowest {} ms</p>'
+            '<table><tr><th>At (s)</th><th>Turn</th><th>First token (ms)</th><th>Reply sent (ms)</th>'
+            '<th>Audio ready (ms)</th></tr>{}</table>',
+            summary['turns'], summary['median_reply'], summary['max_reply'], rows
+        )
 
 
 @admin.register(ChatMessage)
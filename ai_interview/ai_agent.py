@@ -1,15 +1,58 @@
-from kronoslabs import KronosLabs
 import json
+import logging
 import random
 from typing import List, Dict, Optional
-from django.conf import settings
+from django.core.cache import cache
 from .models import Problem, InterviewSession, ChatMessage, UserProblem
+from .instrumentation import counter, span
+from .latency_timeline import mark_first_token
 from .leetcode_service import leetcode_service
+from .llm_backends import llm_backend
+from .problem_pools import IdBitset
+from .problem_warmer import materialize_problem, ready_problems, problem_warmer
+from .topics import canonical_topic
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds a session's exclusion set stays cached
+EXCLUDED_PROBLEMS_TIMEOUT = 60 * 60
+
+
+def _excluded_problems_key(session: InterviewSession) -> str:
+    return f"excluded_problems:{session.id}"
+
+
+def get_excluded_problem_ids(session: InterviewSession) -> frozenset:
+    """
+    LeetCode IDs of every problem the session's user has already been given.
+
+    Computed with a single query and cached per session.
+    """
+    key = _excluded_problems_key(session)
+    excluded = cache.get(key)
+    if excluded is None:
+        excluded = frozenset(
+            UserProblem.objects.filter(
+                user_id=session.user_id,
+                problem__leetcode_id__isnull=False
+            ).values_list('problem__leetcode_id', flat=True)
+        )
+        cache.set(key, excluded, EXCLUDED_PROBLEMS_TIMEOUT)
+    return excluded
+
+
+INITIAL_GREETING = """Hi! I'm your AI interviewer. Let's start!
+
+**Difficulty:** Easy, Medium, or Hard?
+**Topic:** Arrays, Strings, Trees, Graphs, DP, etc.
+
+Tell me both and I'll pick a problem for you!"""
 
 
 class AIInterviewAgent:
     def __init__(self):
-        self.client = KronosLabs(api_key=settings.KRONOS_API_KEY)
+        self.llm = llm_backend()
         self.system_prompt = """You are a technical interviewer conducting a coding interview. Be CONCISE and helpful.
 
 Your role:
@@ -20,147 +63,85 @@ Your role:
 
 Keep responses short (2-3 sentences max). Be encouraging but don't give away solutions."""
 
+    def _complete(self, kind: str, prompt: str, temperature: float) -> str:
+        # Streamed so the turn's time to first token is known; the reply is sent whole
+        with span('llm.complete', labels={'kind': kind}, prompt_chars=len(prompt)):
+            chunks = []
+            for chunk in self.llm.stream(prompt, temperature=temperature):
+                if not chunks:
+                    mark_first_token()
+                chunks.append(chunk)
+            response = ''.join(chunks)
+        counter('llm_tokens_total', kind=kind).inc(len(response.split()))
+        return response
+
     def get_initial_greeting(self) -> str:
         """Get the initial greeting message from the AI."""
-        return """Hi! I'm your AI interviewer. Let's start!
-
-**Difficulty:** Easy, Medium, or Hard?
-**Topic:** Arrays, Strings, Trees, Graphs, DP, etc.
-
-Tell me both and I'll pick a problem for you!"""
+        return INITIAL_GREETING
 
     def assess_skill_level(self, user_message: str, session: InterviewSession) -> str:
         """Assess user's skill level and preferences based on their message."""
         prompt = f"{self.system_prompt}\n\nUser said: {user_message}. Please respond appropriately to assess their skill level and preferences."
         
-        response = self.client.chat.completions.create(
-            prompt=prompt,
-            model="hermes",
-            temperature=0.7,
-            is_stream=False
-        )
-        
-        return response.choices[0].message.content
+        return self._complete('assess', prompt, temperature=0.7)
 
+    @span('problem.select')
     def select_problem(self, session: InterviewSession) -> Optional[Problem]:
         """Select an appropriate problem from LeetCode based on user preferences."""
         difficulty = session.difficulty_preference or 'medium'
         topics = session.topic_preferences or []
         problem_name_request = getattr(session, 'problem_name_request', None)
         
-        print(f"AI Agent: Selecting problem with difficulty={difficulty}, topics={topics}, problem_name_request={problem_name_request}")
+        logger.debug(f"AI Agent: Selecting problem with difficulty={difficulty}, topics={topics}, problem_name_request={problem_name_request}")
         
         # If user requested a specific problem by name, try to find it first
         leetcode_problem = None
         if problem_name_request:
-            print(f"AI Agent: Searching for specific problem: '{problem_name_request}'")
+            logger.debug(f"AI Agent: Searching for specific problem: '{problem_name_request}'")
             leetcode_problem = leetcode_service.search_problem_by_name(problem_name_request)
             
             if leetcode_problem:
-                print(f"AI Agent: Found requested problem: {leetcode_problem['title']}")
+                logger.info(f"AI Agent: Found requested problem: {leetcode_problem['title']}")
             else:
-                print(f"AI Agent: Could not find requested problem '{problem_name_request}', falling back to random selection")
+                logger.info(f"AI Agent: Could not find requested problem '{problem_name_request}', falling back to random selection")
         
-        # If no specific problem found or requested, get a random problem
+        # If no specific problem found or requested, prefer one the warmer has
+        # already materialised; it needs no LeetCode round trips
+        topic = (canonical_topic(topics[0]) or topics[0]) if topics else None
+        problem = None
         if not leetcode_problem:
+            problem = ready_problems(difficulty, topic, session.user_id).order_by('?').first()
+            if problem:
+                logger.debug(f"AI Agent: Using pre-materialised problem: {problem.title}")
+        
+        # Otherwise get a random problem from LeetCode
+        if not leetcode_problem and not problem:
             # Get problems this user has already been given
-            user_problems = UserProblem.objects.filter(user=session.user)
-            exclude_ids = [up.problem.leetcode_id for up in user_problems if up.problem.leetcode_id]
-            print(f"AI Agent: Excluding {len(exclude_ids)} previously assigned problems")
+            exclude_ids = IdBitset(get_excluded_problem_ids(session))
+            logger.debug(f"AI Agent: Excluding {len(exclude_ids)} previously assigned problems")
             
-            # Get a random problem from LeetCode
-            topic = topics[0] if topics else None
             leetcode_problem = leetcode_service.get_random_problem(
                 difficulty=difficulty,
                 topic=topic,
                 exclude_ids=exclude_ids
             )
         
-        if not leetcode_problem:
-            print("AI Agent: No problem found from LeetCode service")
-            return None
+        if not problem and leetcode_problem:
+            problem = materialize_problem(leetcode_problem)
         
-        # Check if we already have this problem in our database
-        problem = Problem.objects.filter(leetcode_id=leetcode_problem['frontendQuestionId']).first()
-        
-        if problem:
-            print(f"Using existing problem: {problem.title}")
-            # If the existing problem doesn't have a function signature, generate it
-            if not problem.function_signature:
-                print(f"Existing problem missing function signature, generating...")
-                function_signature = leetcode_service.get_official_function_signature(
-                    leetcode_problem['titleSlug']
-                )
-                if not function_signature:
-                    print(f"No official function signature found for {leetcode_problem['titleSlug']}, using generated one")
-                    details = leetcode_service.get_problem_details(leetcode_problem['titleSlug'])
-                    if details:
-                        function_signature = leetcode_service.extract_function_signature(
-                            details.get('content', ''), 
-                            leetcode_problem['title']
-                        )
-                
-                if function_signature:
-                    problem.function_signature = function_signature
-                    problem.save()
-                    print(f"Updated function signature for existing problem: {len(function_signature)} chars")
-        else:
-            # Fetch detailed problem content
-            details = leetcode_service.get_problem_details(leetcode_problem['titleSlug'])
-            if not details:
-                return None
-            
-            # Parse the content
-            parsed_content = leetcode_service.parse_problem_content(details.get('content', ''))
-            
-            # Get official function signature and test cases from LeetCode
-            print(f"Getting official data for {leetcode_problem['titleSlug']}")
-            function_signature = leetcode_service.get_official_function_signature(
-                leetcode_problem['titleSlug']
-            )
-            test_cases = leetcode_service.get_official_test_cases(
-                leetcode_problem['titleSlug']
+        # While LeetCode is failing, serve any problem already in the database
+        # rather than failing the selection
+        if not problem and not leetcode_service.available():
+            problem = (
+                ready_problems(difficulty, None, session.user_id).order_by('?').first()
+                or ready_problems(None, None, session.user_id).order_by('?').first()
             )
-            
-            print(f"Official function signature length: {len(function_signature) if function_signature else 0}")
-            print(f"Official test cases count: {len(test_cases) if test_cases else 0}")
-            
-            # Fallback to generated ones if official ones are not available
-            if not function_signature:
-                print(f"No official function signature found for {leetcode_problem['titleSlug']}, using generated one")
-                function_signature = leetcode_service.extract_function_signature(
-                    details.get('content', ''), 
-                    leetcode_problem['title']
-                )
-            
-            if not test_cases:
-                print(f"No official test cases found for {leetcode_problem['titleSlug']}, using generated ones")
-                test_cases = leetcode_service.generate_test_cases(
-                    parsed_content.get('examples', []), 
-                    leetcode_problem['title']
-                )
-            
-            print(f"Final function signature length: {len(function_signature) if function_signature else 0}")
-            print(f"Final test cases count: {len(test_cases) if test_cases else 0}")
-            print(f"Final function signature content: {repr(function_signature)}")
-            
-            # Create new problem in database
-            problem = Problem.objects.create(
-                leetcode_id=leetcode_problem['frontendQuestionId'],
-                title_slug=leetcode_problem['titleSlug'],
-                title=leetcode_problem['title'],
-                description=parsed_content.get('description', ''),
-                difficulty=leetcode_problem['difficulty'].lower(),
-                topics=[tag['slug'] for tag in leetcode_problem.get('topicTags', [])],
-                constraints=parsed_content.get('constraints', ''),
-                examples=parsed_content.get('examples', []),
-                function_signature=function_signature,
-                test_cases=test_cases
-            )
-            
-            print(f"Problem created with ID: {problem.id}")
-            print(f"Saved function signature length: {len(problem.function_signature) if problem.function_signature else 0}")
-            print(f"Saved function signature content: {repr(problem.function_signature)}")
+            if problem:
+                logger.warning(f"AI Agent: LeetCode unavailable, using stored problem: {problem.title}")
+        
+        if not problem:
+            logger.warning("AI Agent: No problem found from LeetCode service")
+            return None
         
         # Record that this user has been given this problem
         user_problem, created = UserProblem.objects.get_or_create(
@@ -174,6 +155,17 @@ Tell me both and I'll pick a problem for you!"""
             user_problem.session = session
             user_problem.save()
         
+        # Keep the cached exclusion set in step with the new assignment
+        if problem.leetcode_id:
+            cache.set(
+                _excluded_problems_key(session),
+                get_excluded_problem_ids(session) | {problem.leetcode_id},
+                EXCLUDED_PROBLEMS_TIMEOUT
+            )
+        
+        # Top the shared pool back up in the background if it runs low
+        problem_warmer.request(difficulty, topic)
+        
         return problem
 
     def present_problem(self, problem: Problem) -> str:
@@ -189,7 +181,7 @@ Read the details in the left panel. What's your approach?"""
             return "No problem selected yet. Let's start!"
         
         # Get recent chat history for context (limit to last 5 messages)
-        recent_messages = ChatMessage.objects.filter(session=session).order_by('-timestamp')[:5]
+        recent_messages = ChatMessage.objects.filter(session=session).order_by('-timestamp', '-id')[:5]
         chat_history = []
         for msg in recent_messages:
             role = "user" if msg.message_type == "user" else "assistant"
@@ -209,14 +201,7 @@ Give brief guidance. Max 2-3 sentences. Ask one clarifying question."""
         
         prompt = f"{self.system_prompt}\n\n{context}"
         
-        response = self.client.chat.completions.create(
-            prompt=prompt,
-            model="hermes",
-            temperature=0.5,
-            is_stream=False
-        )
-        
-        return response.choices[0].message.content
+        return self._complete('guidance', prompt, temperature=0.5)
 
     def provide_hint(self, session: InterviewSession, hint_level: int = 1) -> str:
         """Provide a progressive hint for the current problem."""
@@ -252,19 +237,12 @@ Give brief feedback on correctness, complexity, and improvements. Max 3 sentence
         
         prompt = f"Technical interviewer. Be CONCISE and helpful.\n\n{context}"
         
-        response = self.client.chat.completions.create(
-            prompt=prompt,
-            model="hermes",
-            temperature=0.5,
-            is_stream=False
-        )
-        
-        return response.choices[0].message.content
+        return self._complete('review', prompt, temperature=0.5)
 
     def generate_feedback(self, session: InterviewSession) -> str:
         """Generate comprehensive feedback for the completed interview."""
         # Get all messages and code submissions
-        messages = ChatMessage.objects.filter(session=session).order_by('timestamp')
+        messages = ChatMessage.objects.filter(session=session).order_by('timestamp', 'id')
         code_submissions = session.code_submissions.all().order_by('timestamp')
         
         # Build context for feedback generation
@@ -338,11 +316,4 @@ Be constructive, specific, encouraging, and actionable. Use examples from their
         
         prompt = f"You are an experienced technical interviewer providing comprehensive feedback. Be detailed, constructive, and encouraging.\n\n{context}"
         
-        response = self.client.chat.completions.create(
-            prompt=prompt,
-            model="hermes",
-            temperature=0.5,
-            is_stream=False
-        )
-        
-        return response.choices[0].message.content
+        return self._complete('feedback', prompt, temperature=0.5)
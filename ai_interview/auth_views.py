@@ -8,10 +8,12 @@ from django.contrib.auth.models import User
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q, Avg
+from django.db.models import Q, Avg, Count
 from django.core.paginator import Paginator
-from .models import UserProfile, InterviewSession
+from .models import UserProfile, InterviewSession, InterviewRecording
 from .supabase_service import supabase_service
+from .message_writer import chat_message_writer
+from .latency_timeline import timeline_rows, timeline_summary
 import json
 
 
@@ -95,19 +97,16 @@ def profile(request):
     profile = user.profile
     
     # Update statistics
-    profile.update_statistics()
+    stats = profile.update_statistics()
     
     # Get recent interviews
     recent_interviews = InterviewSession.objects.filter(
         user=user,
         status='completed'
-    ).order_by('-completed_at')[:5]
+    ).select_related('problem').order_by('-completed_at')[:5]
     
     # Get interview statistics
-    total_time = sum(
-        session.get_duration() 
-        for session in InterviewSession.objects.filter(user=user, status='completed')
-    )
+    total_time = stats['total_duration'].total_seconds() / 60 if stats['total_duration'] else 0
     
     context = {
         'profile': profile,
@@ -227,8 +226,11 @@ def interview_history(request):
             Q(problem__description__icontains=search_query)
         )
     
-    # Order by most recent
-    interviews = interviews.order_by('-started_at')
+    # Order by most recent; problem and counts come with each row instead of a query apiece
+    interviews = interviews.select_related('problem').annotate(
+        message_count=Count('messages', distinct=True),
+        submission_count=Count('code_submissions', distinct=True),
+    ).order_by('-started_at')
     
     # Pagination
     paginator = Paginator(interviews, 10)
@@ -244,7 +246,7 @@ def interview_history(request):
         'status_filter': status_filter,
         'difficulty_filter': difficulty_filter,
         'search_query': search_query,
-        'total_interviews': interviews.count(),
+        'total_interviews': paginator.count,
         'avg_score': round(avg_score, 1) if avg_score else 0,
     }
     
@@ -255,19 +257,20 @@ def interview_history(request):
 def interview_detail(request, session_id):
     """View details of a specific interview session - shows the same results page as after completion"""
     session = get_object_or_404(
-        InterviewSession,
+        InterviewSession.objects.select_related('problem', 'recording'),
         id=session_id,
         user=request.user
     )
     
     # Get messages and code submissions
-    messages = session.messages.all().order_by('timestamp')
+    chat_message_writer.flush()
+    messages = session.messages.all().order_by('timestamp', 'id')
     code_submissions = session.code_submissions.all().order_by('timestamp')
     
     # Try to get recording data
     try:
         recording = session.recording
-    except:
+    except InterviewRecording.DoesNotExist:
         recording = None
     
     context = {
@@ -275,6 +278,8 @@ def interview_detail(request, session_id):
         'messages': messages,
         'code_submissions': code_submissions,
         'recording': recording,
+        'latency_timeline': timeline_rows(session.latency_timeline),
+        'latency_summary': timeline_summary(session.latency_timeline),
     }
     
     # Use the same results template that's shown after completing an interview
@@ -0,0 +1,172 @@
+"""
+Local mirror of the LeetCode question catalog.
+
+LeetCodeService.fetch_catalog pulls every questionList page in parallel;
+this module stores the result in LeetCodeQuestion and checkpoints partial
+fetches to a JSON file so an interrupted sync resumes where it stopped.
+
+Once a mirror exists, refresh_catalog and refresh_problem_content keep it
+and the Problem table current by writing only what changed upstream.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from django.conf import settings
+from .leetcode_service import CatalogFetch, leetcode_service
+from .models import LeetCodeQuestion, Problem
+from .problem_parser import content_hash
+from .problem_warmer import rematerialize_problem
+
+# Fields refreshed when a mirrored question is fetched again
+MIRRORED_FIELDS = ['leetcode_id', 'title', 'difficulty', 'paid_only', 'topics', 'ac_rate', 'updated_at']
+# Fields an incremental refresh compares (those in CATALOG_DELTA_QUERY)
+DELTA_FIELDS = ['leetcode_id', 'title', 'difficulty', 'paid_only', 'topics']
+
+
+def question_fields(question: Dict) -> Dict:
+    """Map a questionList summary to LeetCodeQuestion field values."""
+    try:
+        leetcode_id = int(question.get('frontendQuestionId'))
+    except (TypeError, ValueError):
+        leetcode_id = None
+    return {
+        'title_slug': question['titleSlug'],
+        'leetcode_id': leetcode_id,
+        'title': question.get('title', ''),
+        'difficulty': (question.get('difficulty') or '').lower(),
+        'paid_only': bool(question.get('paidOnly')),
+        'topics': [tag['slug'] for tag in question.get('topicTags') or []],
+        'ac_rate': question.get('acRate'),
+    }
+
+
+def mirror_catalog(questions: Iterable[Dict], update_fields: List[str] = None, batch_size: int = 500) -> int:
+    """Insert or update LeetCodeQuestion rows for the given summaries. Returns the number written."""
+    rows = [LeetCodeQuestion(**question_fields(question)) for question in questions]
+    if rows:
+        LeetCodeQuestion.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['title_slug'],
+            update_fields=update_fields or MIRRORED_FIELDS,
+        )
+    return len(rows)
+
+
+def refresh_catalog(page_size: int = None, workers: int = None) -> Dict:
+    """
+    Bring the mirror up to date with an incremental delta.
+
+    questionList cannot be filtered by ID or modification time, so the
+    catalog is listed with the slim CATALOG_DELTA_QUERY and compared with
+    the mirror in memory. Only new questions and rows whose difficulty,
+    tags, paid flag or title changed are written, and those changes are
+    carried over to materialized Problem rows.
+
+    Returns counts of what changed, plus ``failed`` pages; nothing is
+    written unless every page was fetched.
+    """
+    known = {
+        row[0]: row[1:]
+        for row in LeetCodeQuestion.objects.values_list('title_slug', *DELTA_FIELDS)
+    }
+    known_max = max((row[0] for row in known.values() if row[0] is not None), default=0)
+
+    fetch = leetcode_service.fetch_catalog(
+        page_size=page_size, workers=workers, query=leetcode_service.CATALOG_DELTA_QUERY
+    )
+    summary = {'new': 0, 'beyond_known_max': 0, 'changed': 0, 'problems_updated': 0, 'failed': len(fetch.failed)}
+    if not fetch.complete:
+        return summary
+
+    new, changed = [], []
+    for question in fetch.questions():
+        fields = question_fields(question)
+        existing = known.get(fields['title_slug'])
+        if existing is None:
+            new.append(question)
+            if (fields['leetcode_id'] or 0) > known_max:
+                summary['beyond_known_max'] += 1
+        elif existing != tuple(fields[field] for field in DELTA_FIELDS):
+            changed.append(question)
+
+    # The slim query has no acceptance rate, so it is left as it was
+    mirror_catalog(new + changed, update_fields=DELTA_FIELDS + ['updated_at'])
+    summary['new'], summary['changed'] = len(new), len(changed)
+
+    # Keep materialized problems in step with their catalog entry
+    changed_fields = {question['titleSlug']: question_fields(question) for question in changed}
+    problems = list(Problem.objects.filter(title_slug__in=changed_fields))
+    for problem in problems:
+        fields = changed_fields[problem.title_slug]
+        problem.difficulty, problem.topics = fields['difficulty'], fields['topics']
+    Problem.objects.bulk_update(problems, ['difficulty', 'topics'])
+    summary['problems_updated'] = len(problems)
+    return summary
+
+
+def refresh_problem_content(workers: int = None) -> Dict:
+    """
+    Re-materialize Problem rows whose content HTML changed upstream.
+
+    Details are fetched in parallel and their SHA-256 compared with
+    Problem.content_hash. Rows materialized before content hashes existed
+    only have their hash recorded.
+    """
+    workers = workers or getattr(settings, 'LEETCODE_CATALOG_WORKERS', 8)
+    problems = list(Problem.objects.exclude(title_slug__isnull=True).exclude(title_slug=''))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='leetcode-content') as executor:
+        all_details = list(executor.map(lambda problem: leetcode_service.get_problem_details(problem.title_slug, use_cache=False), problems))
+
+    summary = {'checked': len(problems), 'rematerialized': 0, 'baselined': 0, 'failed': 0}
+    for problem, details in zip(problems, all_details):
+        if not details or not details.get('content'):
+            summary['failed'] += 1
+            continue
+        upstream_hash = content_hash(details['content'])
+        if upstream_hash == problem.content_hash:
+            continue
+        if not problem.content_hash:
+            problem.content_hash = upstream_hash
+            problem.save(update_fields=['content_hash'])
+            summary['baselined'] += 1
+            continue
+        leetcode_problem = {
+            'frontendQuestionId': problem.leetcode_id,
+            'titleSlug': problem.title_slug,
+            'title': problem.title,
+            'difficulty': problem.difficulty,
+            'topicTags': [{'slug': topic} for topic in problem.topics],
+        }
+        rematerialize_problem(problem, leetcode_problem, details)
+        summary['rematerialized'] += 1
+    return summary
+
+
+def load_checkpoint(path: Path) -> Optional[CatalogFetch]:
+    """Read a partial fetch saved by save_checkpoint, or None if there is none."""
+    try:
+        with open(path) as checkpoint:
+            data = json.load(checkpoint)
+    except FileNotFoundError:
+        return None
+    pages = {int(skip): questions for skip, questions in data['pages'].items()}
+    return CatalogFetch(data['page_size'], data['total'], pages)
+
+
+def save_checkpoint(path: Path, fetch: CatalogFetch) -> None:
+    """Write the fetched pages atomically so a crash never leaves a torn checkpoint."""
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as checkpoint:
+        json.dump({'page_size': fetch.page_size, 'total': fetch.total, 'pages': fetch.pages}, checkpoint)
+    os.replace(temporary, path)
+
+
+def clear_checkpoint(path: Path) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,29 @@
+"""
+System checks for deployment settings the interview app relies on.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Cache backends whose entries only the writing process can read
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """The default cache must be shared by every worker process."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f"The default cache ({backend}) is local to each process.",
+        hint=(
+            "Metrics aggregation, WebSocket resume and message dedupe, and per-session problem "
+            "exclusions are shared between Daphne workers through the default cache. Point "
+            "CACHES['default'] at Redis, or add 'ai_interview.E001' to SILENCED_SYSTEM_CHECKS "
+            "when running a single process."
+        ),
+        id='ai_interview.E001',
+    )]
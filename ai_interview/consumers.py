@@ -1,9 +1,21 @@
+import copy
 import json
+import logging
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import InterviewSession, ChatMessage, CodeSubmission
+from .models import InterviewSession, CodeSubmission
 from .ai_agent import AIInterviewAgent
+from .session_replay import session_replay
+from .message_writer import chat_message_writer
+from .instrumentation import bind_session, counter, gauge, span
+from .metrics import metrics_publisher
+from .intent_matcher import match_intent
+from .latency_timeline import TURN_KINDS, SessionTimeline
+
+logger = logging.getLogger(__name__)
 
 
 class InterviewConsumer(AsyncWebsocketConsumer):
@@ -12,9 +24,20 @@ class InterviewConsumer(AsyncWebsocketConsumer):
         self.ai_agent = AIInterviewAgent()
         self.session_id = None
         self.session = None
+        self._session_snapshot = {}
+        self.group_name = None
+        self.accepted = False
+        self.timeline = None
+        # Other channels (observers, second tabs) subscribed to this session,
+        # with when each last confirmed its presence. While this is empty,
+        # frames are sent straight to our own socket instead of making a
+        # round-trip through the channel layer.
+        self.peer_channels = {}
+        self.peers_probed_at = None
 
     async def connect(self):
         self.session_id = self.scope['url_route']['kwargs']['session_id']
+        bind_session(self.session_id)
         self.session = await self.get_session(self.session_id)
         
         if not self.session:
@@ -22,35 +45,67 @@ class InterviewConsumer(AsyncWebsocketConsumer):
             return
         
         # Join session group
+        self.group_name = f"session_{self.session_id}"
         await self.channel_layer.group_add(
-            f"session_{self.session_id}",
+            self.group_name,
             self.channel_name
         )
         
+        # Announce ourselves so existing subscribers switch to group fan-out
+        # (they answer with subscriber.present so we learn about them too)
+        await self.announce_presence()
+        
         await self.accept()
+        self.accepted = True
+        self.timeline = SessionTimeline(self.session)
+        gauge('websocket_connections').inc()
+        metrics_publisher.start()
         
         # Send initial greeting if this is a new session
-        print(f"WebSocket connected for session {self.session_id}, status: {self.session.status}")
-        if self.session.status == 'preparing':
-            print("Sending initial greeting...")
+        logger.info(f"WebSocket connected for session {self.session_id}, status: {self.session.status}")
+        # Only greet once per session - a reconnecting client gets the greeting through resume
+        if self.session.status == 'preparing' and not await session_replay.alast_seq(self.session_id):
+            logger.debug("Sending initial greeting...")
+            self.timeline.start('greeting')
             greeting = self.ai_agent.get_initial_greeting()
             await self.send_ai_message(greeting)
-            print("Initial greeting sent!")
+            self.timeline.finish()
+            logger.debug("Initial greeting sent!")
         else:
-            print(f"Session status is {self.session.status}, not sending greeting")
+            logger.debug(f"Session status is {self.session.status}, not sending greeting")
 
     async def disconnect(self, close_code):
+        if self.accepted:
+            gauge('websocket_connections').dec()
+            # Persist the latency timeline (and anything else still unsaved)
+            try:
+                await self.update_session()
+            except Exception as e:
+                logger.warning(f"Could not save session {self.session_id} on disconnect: {e}")
+        
         # Leave session group
-        if self.session_id:
+        if self.group_name:
             await self.channel_layer.group_discard(
-                f"session_{self.session_id}",
+                self.group_name,
                 self.channel_name
             )
+            # Sent even without known peers: one may have learned about us
+            # before its answer to our announcement reached us
+            await self.channel_layer.group_send(self.group_name, {
+                'type': 'subscriber.left',
+                'channel': self.channel_name
+            })
+        
+        # Make sure this session's messages are on disk before the socket goes away
+        await self.flush_messages()
 
     async def receive(self, text_data):
+        counter('websocket_messages_total', direction='received').inc()
         try:
             data = json.loads(text_data)
             message_type = data.get('type')
+            if message_type in TURN_KINDS:
+                self.timeline.start(TURN_KINDS[message_type])
             
             if message_type == 'chat_message':
                 await self.handle_chat_message(data)
@@ -62,11 +117,17 @@ class InterviewConsumer(AsyncWebsocketConsumer):
                 await self.handle_code_analysis(data)
             elif message_type == 'end_interview':
                 await self.handle_end_interview(data)
+            elif message_type == 'resume':
+                await self.handle_resume(data)
+            elif message_type == 'tts_ready':
+                self.timeline.tts_ready(data.get('seq'))
                 
         except json.JSONDecodeError:
             await self.send_error("Invalid JSON data")
         except Exception as e:
             await self.send_error(f"Error processing message: {str(e)}")
+        finally:
+            self.timeline.finish()
 
     async def handle_chat_message(self, data):
         """Handle incoming chat messages from the user."""
@@ -75,21 +136,32 @@ class InterviewConsumer(AsyncWebsocketConsumer):
         if not user_message:
             return
         
-        # Save user message
-        await self.save_message('user', user_message)
+        # Ignore messages the client resent after a reconnect; the reply (if
+        # any) reaches it through the replay buffer instead
+        client_msg_id = data.get('client_msg_id')
+        if not await session_replay.claim_client_message(self.session_id, client_msg_id):
+            return
         
-        # Send user message to group
-        await self.channel_layer.group_send(
-            f"session_{self.session_id}",
-            {
+        try:
+            # Save user message
+            await self.save_message('user', user_message)
+            
+            # Send user message to group
+            await self.broadcast({
                 'type': 'chat_message',
                 'message': user_message,
-                'sender': 'user'
-            }
-        )
-        
-        # Process with AI agent
-        await self.process_with_ai(user_message)
+                'sender': 'user',
+                'client_msg_id': client_msg_id
+            })
+            
+            # Process with AI agent
+            answered = await self.process_with_ai(user_message)
+        except BaseException:
+            # Failed or cancelled by a disconnect: let the client's resend through
+            await session_replay.release_client_message(self.session_id, client_msg_id)
+            raise
+        if not answered:
+            await session_replay.release_client_message(self.session_id, client_msg_id)
 
     async def handle_code_submission(self, data):
         """Handle code submissions from the IDE."""
@@ -108,15 +180,12 @@ class InterviewConsumer(AsyncWebsocketConsumer):
         await self.send_ai_message(analysis)
         
         # Send code to group
-        await self.channel_layer.group_send(
-            f"session_{self.session_id}",
-            {
-                'type': 'code_submission',
-                'code': code,
-                'language': language,
-                'testResults': test_results
-            }
-        )
+        await self.broadcast({
+            'type': 'code_submission',
+            'code': code,
+            'language': language,
+            'testResults': test_results
+        })
 
     async def handle_hint_request(self, data):
         """Handle requests for hints."""
@@ -134,6 +203,26 @@ class InterviewConsumer(AsyncWebsocketConsumer):
         analysis = await self.analyze_code_async(code)
         await self.send_ai_message(analysis)
 
+    async def handle_resume(self, data):
+        """Replay the frames a reconnecting client missed since its last-seen sequence number."""
+        try:
+            last_seq = int(data.get('last_seq', 0))
+        except (TypeError, ValueError):
+            last_seq = 0
+        
+        frames = await session_replay.frames_since(self.session_id, last_seq)
+        if frames is None:
+            # Gap is no longer covered by the buffer - client must refetch over HTTP
+            await self.flush_messages()
+            await self.send(text_data=json.dumps({
+                'type': 'resync',
+                'seq': await session_replay.alast_seq(self.session_id)
+            }))
+            return
+        
+        for event in frames:
+            await getattr(self, event['type'])(event)
+
     async def handle_end_interview(self, data):
         """Handle end interview request."""
         # Update session status
@@ -143,21 +232,26 @@ class InterviewConsumer(AsyncWebsocketConsumer):
         # Send final message
         await self.send_ai_message("Thank you for the interview! Your session has been completed. Redirecting you to your profile where you can review your interview...")
         
-        # Close the WebSocket connection
+        # The client waits for the close before loading the results page,
+        # which reads the transcript from the database
+        await self.flush_messages()
         await self.close()
 
     async def process_with_ai(self, user_message):
-        """Process user message with AI agent."""
+        """Process user message with AI agent. Returns False if it failed and only an error was sent."""
         try:
+            # Scan the message once for everything below
+            intent = match_intent(user_message)
+            
             # Check if user wants to change problems
-            if await self.check_for_problem_change_request(user_message):
-                await self.handle_problem_change_request(user_message)
-                return
+            if await self.check_for_problem_change_request(user_message, intent):
+                await self.handle_problem_change_request(user_message, intent)
+                return True
             
             # Check if we need to select a problem
             if self.session.status == 'preparing' and not self.session.problem:
                 # Try to extract preferences from user message
-                await self.extract_preferences(user_message)
+                await self.extract_preferences(user_message, intent)
                 
                 # Check if we have at least one preference
                 has_difficulty = bool(self.session.difficulty_preference)
@@ -166,11 +260,11 @@ class InterviewConsumer(AsyncWebsocketConsumer):
                 # If we have at least one preference, proceed with problem selection
                 if has_difficulty or has_topics:
                     # Log what we found for debugging
-                    print(f"AI Agent: Found preferences - difficulty: {self.session.difficulty_preference}, topics: {self.session.topic_preferences}")
+                    logger.debug(f"AI Agent: Found preferences - difficulty: {self.session.difficulty_preference}, topics: {self.session.topic_preferences}")
                 else:
                     # Ask for at least one preference
                     await self.send_ai_message("I'd like to select a good problem for you. Could you please specify either your preferred difficulty level (easy, medium, or hard) or topic(s) you'd like to work on?")
-                    return
+                    return True
                 
                 # We have both preferences, select and present problem
                 problem = await self.select_problem_async()
@@ -185,174 +279,40 @@ class InterviewConsumer(AsyncWebsocketConsumer):
                 current_code = await self.get_latest_code()
                 guidance = await self.provide_guidance_async(user_message, current_code)
                 await self.send_ai_message(guidance)
+            return True
                 
         except Exception as e:
             await self.send_error(f"Error processing with AI: {str(e)}")
+            return False
 
-    async def extract_preferences(self, user_message):
+    async def extract_preferences(self, user_message, intent=None):
         """Extract difficulty, topic preferences, and problem name requests from user message."""
-        # Simple keyword matching for now - could be enhanced with NLP
-        user_message_lower = user_message.lower()
-        
-        print(f"AI Agent: Extracting preferences from: '{user_message}'")
-        
-        # Check for specific problem name requests first
-        problem_name = None
-        problem_request_keywords = [
-            'i want to do',
-            'i want',
-            'can i do',
-            'let me do',
-            'give me',
-            'i would like',
-            'i would like to do',
-            'can we do',
-            'let\'s do',
-            'let us do'
-        ]
-        
-        for keyword in problem_request_keywords:
-            if keyword in user_message_lower:
-                # Extract the text after the keyword
-                parts = user_message_lower.split(keyword, 1)
-                if len(parts) > 1:
-                    potential_problem = parts[1].strip()
-                    # Remove common words that might follow
-                    potential_problem = potential_problem.replace('problem', '').replace('the', '').strip()
-                    if potential_problem and len(potential_problem) > 2:
-                        problem_name = potential_problem
-                        print(f"AI Agent: Found potential problem name request: '{problem_name}'")
-                        break
-        
-        # If no keyword-based extraction worked, check if the message looks like a problem name
-        if not problem_name:
-            import re
-            
-            # First, check if the entire message is a simple problem name (like "two sum")
-            # This handles cases where someone just says the problem name directly
-            message_clean = user_message.strip().lower()
-            
-            # Check if it's a simple problem name (2-4 words, no special characters except spaces)
-            if (re.match(r'^[a-z]+(?:\s+[a-z]+){0,3}$', message_clean) and 
-                len(message_clean.split()) <= 4 and 
-                len(message_clean) > 3 and
-                not any(word in message_clean for word in ['easy', 'medium', 'hard', 'array', 'string', 'tree', 'graph', 'dp', 'dynamic', 'programming'])):
-                problem_name = user_message.strip()
-                print(f"AI Agent: Detected direct problem name: '{problem_name}'")
-            
-            # If still no match, look for capitalized words that might be problem names
-            if not problem_name:
-                capitalized_words = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', user_message)
-                if capitalized_words:
-                    # Filter out common words that aren't problem names
-                    common_words = {'Easy', 'Medium', 'Hard', 'Array', 'String', 'Tree', 'Graph', 'The', 'A', 'An', 'And', 'Or', 'But', 'In', 'On', 'At', 'To', 'For', 'Of', 'With', 'By'}
-                    potential_problems = [word for word in capitalized_words if word not in common_words]
-                    if potential_problems:
-                        problem_name = ' '.join(potential_problems)
-                        print(f"AI Agent: Found potential problem name from capitalized words: '{problem_name}'")
+        intent = intent or match_intent(user_message)
+        logger.debug(f"Extracted preferences from '{user_message}': {intent}")
         
         # Store the problem name request if found
-        if problem_name:
-            self.session.problem_name_request = problem_name
-            print(f"AI Agent: Storing problem name request: '{problem_name}'")
+        if intent['problem_name']:
+            self.session.problem_name_request = intent['problem_name']
         
-        # Extract difficulty preference
-        if 'easy' in user_message_lower:
-            self.session.difficulty_preference = 'easy'
-            print("AI Agent: Found difficulty: easy")
-        elif 'medium' in user_message_lower:
-            self.session.difficulty_preference = 'medium'
-            print("AI Agent: Found difficulty: medium")
-        elif 'hard' in user_message_lower:
-            self.session.difficulty_preference = 'hard'
-            print("AI Agent: Found difficulty: hard")
+        if intent['difficulty']:
+            self.session.difficulty_preference = intent['difficulty']
         
-        # Extract topic preferences with more comprehensive mapping
-        topics = []
-        topic_keywords = {
-            'array': 'arrays',
-            'arrays': 'arrays',
-            'string': 'strings',
-            'strings': 'strings',
-            'tree': 'trees',
-            'trees': 'trees',
-            'graph': 'graphs',
-            'graphs': 'graphs',
-            'dynamic programming': 'dynamic-programming',
-            'dp': 'dynamic-programming',
-            'binary search': 'binary-search',
-            'two pointer': 'two-pointers',
-            'two pointers': 'two-pointers',
-            'sliding window': 'sliding-window',
-            'hash': 'hash-table',
-            'hash table': 'hash-table',
-            'hash tables': 'hash-table',
-            'stack': 'stack',
-            'stacks': 'stack',
-            'queue': 'queue',
-            'queues': 'queue',
-            'linked list': 'linked-list',
-            'linked lists': 'linked-list',
-            'recursion': 'recursion',
-            'backtracking': 'backtracking',
-            'greedy': 'greedy',
-            'sorting': 'sorting',
-            'heap': 'heap',
-            'trie': 'trie',
-            'union find': 'union-find',
-            'segment tree': 'segment-tree',
-            'fenwick tree': 'fenwick-tree'
-        }
-        
-        for keyword, topic in topic_keywords.items():
-            if keyword in user_message_lower:
-                if topic not in topics:  # Avoid duplicates
-                    topics.append(topic)
-                    print(f"AI Agent: Found topic: {topic} (from keyword: {keyword})")
-        
-        if topics:
-            self.session.topic_preferences = topics
-            print(f"AI Agent: Final topics: {topics}")
-        else:
-            print("AI Agent: No topics found")
+        if intent['topics']:
+            self.session.topic_preferences = intent['topics']
         
         await self.update_session()
 
-    async def check_for_problem_change_request(self, user_message):
+    async def check_for_problem_change_request(self, user_message, intent=None):
         """Check if user wants to change problems."""
-        user_message_lower = user_message.lower()
-        
-        # Keywords that indicate user wants to change problems
-        change_keywords = [
-            'change problem',
-            'new problem',
-            'different problem',
-            'switch problem',
-            'another problem',
-            'try a different',
-            'can we do',
-            'let\'s do',
-            'i want to do',
-            'i\'d like to do',
-            'can i try',
-            'give me a different',
-            'pick a different',
-            'choose a different'
-        ]
-        
-        # Check if any change keywords are present
-        for keyword in change_keywords:
-            if keyword in user_message_lower:
-                return True
-        
-        return False
+        intent = intent or match_intent(user_message)
+        return intent['change_request']
 
-    async def handle_problem_change_request(self, user_message):
+    async def handle_problem_change_request(self, user_message, intent=None):
         """Handle user's request to change problems."""
-        print(f"AI Agent: User wants to change problem: '{user_message}'")
+        logger.debug(f"User wants to change problem: '{user_message}'")
         
         # Extract new preferences from the message
-        await self.extract_preferences(user_message)
+        await self.extract_preferences(user_message, intent)
         
         # Check if we have new preferences
         has_difficulty = bool(self.session.difficulty_preference)
@@ -387,24 +347,81 @@ class InterviewConsumer(AsyncWebsocketConsumer):
         await self.save_message('ai', message)
         
         # Send to group
-        await self.channel_layer.group_send(
-            f"session_{self.session_id}",
-            {
-                'type': 'chat_message',
-                'message': message,
-                'sender': 'ai'
-            }
-        )
+        event = {
+            'type': 'chat_message',
+            'message': message,
+            'sender': 'ai'
+        }
+        await self.broadcast(event)
+        self.timeline.reply_sent(event['seq'])
 
     async def send_error(self, error_message):
         """Send an error message."""
-        await self.channel_layer.group_send(
-            f"session_{self.session_id}",
-            {
-                'type': 'error_message',
-                'message': error_message
-            }
-        )
+        await self.broadcast({
+            'type': 'error_message',
+            'message': error_message
+        })
+
+    async def broadcast(self, event):
+        """Stamp an event with the session's next sequence number, buffer it for replay and send it to the group."""
+        event['seq'] = await session_replay.append(self.session_id, event)
+        counter('websocket_messages_total', direction='sent').inc()
+        
+        if self.peer_channels:
+            await self.check_peers()
+        
+        if self.peer_channels:
+            with span('channel.send', labels={'fanout': 'group'}, type=event['type']):
+                await self.channel_layer.group_send(self.group_name, event)
+        else:
+            # Fast path: we are the only subscriber, so deliver directly
+            with span('channel.send', labels={'fanout': 'direct'}, type=event['type']):
+                await getattr(self, event['type'])(event)
+
+    # Subscriber presence handlers
+    async def announce_presence(self):
+        """Ask the other subscribers of the session to (re)confirm their presence."""
+        self.peers_probed_at = time.monotonic()
+        await self.channel_layer.group_send(self.group_name, {
+            'type': 'subscriber.joined',
+            'channel': self.channel_name
+        })
+
+    async def check_peers(self):
+        """
+        Forget peers that went away without a subscriber.left (a crashed
+        worker), so they do not keep us off the fast path for good.
+
+        Every INTERVIEW_PRESENCE_CHECK_INTERVAL seconds the peers that have not
+        answered the previous announcement are dropped and a new one is sent.
+        """
+        interval = getattr(settings, 'INTERVIEW_PRESENCE_CHECK_INTERVAL', 30)
+        if time.monotonic() - self.peers_probed_at < interval:
+            return
+        for channel, seen in list(self.peer_channels.items()):
+            if seen < self.peers_probed_at:
+                logger.info(f"Dropping unresponsive subscriber {channel} of session {self.session_id}")
+                del self.peer_channels[channel]
+        if self.peer_channels:
+            await self.announce_presence()
+
+    async def subscriber_joined(self, event):
+        """Another channel joined the session group (or re-announced itself)."""
+        if event['channel'] == self.channel_name:
+            return
+        self.peer_channels[event['channel']] = time.monotonic()
+        await self.channel_layer.send(event['channel'], {
+            'type': 'subscriber.present',
+            'channel': self.channel_name
+        })
+
+    async def subscriber_present(self, event):
+        """An existing subscriber answered our announcement."""
+        self.peer_channels[event['channel']] = time.monotonic()
+
+    async def subscriber_left(self, event):
+        """Another channel left the session group."""
+        self.peer_channels.pop(event['channel'], None)
 
     # WebSocket event handlers
     async def chat_message(self, event):
@@ -412,7 +429,9 @@ class InterviewConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             'type': 'chat_message',
             'message': event['message'],
-            'sender': event['sender']
+            'sender': event['sender'],
+            'seq': event.get('seq'),
+            'client_msg_id': event.get('client_msg_id')
         }))
 
     async def code_submission(self, event):
@@ -420,48 +439,72 @@ class InterviewConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             'type': 'code_submission',
             'code': event['code'],
-            'language': event['language']
+            'language': event['language'],
+            'seq': event.get('seq')
         }))
 
     async def error_message(self, event):
         """Handle error message events."""
         await self.send(text_data=json.dumps({
             'type': 'error',
-            'message': event['message']
+            'message': event['message'],
+            'seq': event.get('seq')
         }))
 
-    # Database operations
-    @database_sync_to_async
-    def get_session(self, session_id):
+    # Database operations (native async ORM - no thread hop)
+    async def get_session(self, session_id):
         try:
-            return InterviewSession.objects.get(id=session_id)
+            session = await InterviewSession.objects.select_related('problem', 'user').aget(id=session_id)
         except InterviewSession.DoesNotExist:
             return None
+        self._snapshot_session(session)
+        return session
+
+    def _snapshot_session(self, session):
+        """Remember the persisted column values so update_session() can write only what changed."""
+        self._session_snapshot = {
+            field.attname: copy.deepcopy(getattr(session, field.attname))
+            for field in InterviewSession._meta.concrete_fields
+            if not field.primary_key
+        }
 
-    @database_sync_to_async
-    def save_message(self, message_type, content):
-        ChatMessage.objects.create(
-            session=self.session,
-            message_type=message_type,
-            content=content
-        )
-
-    @database_sync_to_async
-    def save_code_submission(self, code, language):
-        CodeSubmission.objects.create(
+    async def flush_messages(self):
+        """
+        Write this worker's buffered chat messages now. Done before any frame
+        that sends the client to a page reading the transcript over HTTP,
+        since the view's own flush only drains its process's buffer.
+        """
+        await database_sync_to_async(chat_message_writer.flush)()
+
+    async def save_message(self, message_type, content):
+        # Written behind by chat_message_writer so the DB stays off the reply path
+        await chat_message_writer.aenqueue(self.session.id, message_type, content)
+
+    @span('db.code_submission')
+    async def save_code_submission(self, code, language):
+        await CodeSubmission.objects.acreate(
             session=self.session,
             code=code,
             language=language
         )
 
-    @database_sync_to_async
-    def update_session(self):
-        self.session.save()
+    async def update_session(self):
+        """Save the session columns that differ from the cached snapshot."""
+        changed = [
+            field.name
+            for field in InterviewSession._meta.concrete_fields
+            if not field.primary_key
+            and getattr(self.session, field.attname) != self._session_snapshot.get(field.attname)
+        ]
+        if not changed:
+            return
+        with span('db.session_update', fields=len(changed)):
+            await self.session.asave(update_fields=changed)
+        self._snapshot_session(self.session)
 
-    @database_sync_to_async
-    def get_latest_code(self):
-        latest_submission = self.session.code_submissions.order_by('-timestamp').first()
-        return latest_submission.code if latest_submission else ""
+    async def get_latest_code(self):
+        latest_code = await self.session.code_submissions.order_by('-timestamp').values_list('code', flat=True).afirst()
+        return latest_code or ""
 
     @database_sync_to_async
     def select_problem_async(self):
@@ -478,12 +521,11 @@ class InterviewConsumer(AsyncWebsocketConsumer):
         """Async wrapper for AI agent guidance."""
         return self.ai_agent.provide_guidance(user_message, self.session, current_code)
 
-    @database_sync_to_async
-    def update_session_problem(self, problem):
+    async def update_session_problem(self, problem):
         """Update session with selected problem."""
         self.session.problem = problem
         self.session.status = 'active'
-        self.session.save()
+        await self.update_session()
 
     @database_sync_to_async
     def provide_hint_async(self, hint_level):
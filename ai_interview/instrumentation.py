@@ -0,0 +1,215 @@
+"""
+Timing spans for the hot paths of an interview.
+
+span() times a block or a function (sync or async):
+
+    with span('leetcode.request', operation='question') as timing:
+        ...
+        timing.set(status=response.status_code)
+
+    @span('problem.select')
+    def select_problem(...): ...
+
+Each finished span is observed into an in-process histogram named after it
+and its ``labels`` (see histograms()) and, at DEBUG level, logged as a
+structured record to the ``ai_interview.spans`` logger with its duration,
+fields and the session it ran for. bind_session() sets that session for
+the current task or thread; asgiref carries it across sync_to_async hops.
+
+counter() and gauge() keep the other in-process metrics; ai_interview.metrics
+exposes all of them to Prometheus.
+"""
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+span_logger = logging.getLogger('ai_interview.spans')
+
+current_session_id: ContextVar[Optional[int]] = ContextVar('current_session_id', default=None)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last is +Inf
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def bind_session(session_id) -> None:
+    """Attribute spans in the current task or thread to a session."""
+    current_session_id.set(session_id)
+
+
+class Histogram:
+    """Cumulative latency histogram: bucket counts, total count and sum."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict:
+        """{'buckets': [(upper bound, cumulative count), ...], 'count': n, 'sum': seconds}"""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            running += count
+            cumulative.append((bound, running))
+        return {'buckets': cumulative, 'count': running, 'sum': total}
+
+
+class Counter:
+    """A value that only goes up."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge(Counter):
+    """A value that goes up and down."""
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+
+# (name, sorted label items) -> metric
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_histograms: Dict[MetricKey, Histogram] = {}
+_counters: Dict[MetricKey, Counter] = {}
+_gauges: Dict[MetricKey, Gauge] = {}
+_registry_lock = threading.Lock()
+
+
+def _metric(registry: Dict, factory, name: str, labels: Dict):
+    key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+    found = registry.get(key)
+    if found is None:
+        with _registry_lock:
+            found = registry.setdefault(key, factory())
+    return found
+
+
+def histogram(name: str, **labels) -> Histogram:
+    """The latency histogram for a span name and labels, created on first use."""
+    return _metric(_histograms, Histogram, name, labels)
+
+
+def counter(name: str, **labels) -> Counter:
+    """The counter for a name and labels, created on first use."""
+    return _metric(_counters, Counter, name, labels)
+
+
+def gauge(name: str, **labels) -> Gauge:
+    """The gauge for a name and labels, created on first use."""
+    return _metric(_gauges, Gauge, name, labels)
+
+
+def histograms() -> Dict[MetricKey, Histogram]:
+    """Every span histogram recorded so far, by (name, labels)."""
+    return dict(_histograms)
+
+
+def counters() -> Dict[MetricKey, Counter]:
+    return dict(_counters)
+
+
+def gauges() -> Dict[MetricKey, Gauge]:
+    return dict(_gauges)
+
+
+class Span:
+    """A timed block; see span()."""
+
+    def __init__(self, name: str, labels: Dict = None, **fields):
+        self.name = name
+        self.labels = labels or {}
+        self.fields = fields
+        self.started = None
+
+    def set(self, **fields) -> None:
+        """Add fields to the span's log record."""
+        self.fields.update(fields)
+
+    def __enter__(self) -> 'Span':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self.started
+        histogram(self.name, **self.labels).observe(duration)
+        if span_logger.isEnabledFor(logging.DEBUG):
+            record = {
+                'span': self.name,
+                'duration_ms': round(duration * 1000, 3),
+                'session_id': current_session_id.get(),
+                **self.labels,
+                **self.fields,
+            }
+            if exc_type is not None:
+                record['error'] = exc_type.__name__
+            span_logger.debug("%s %.1fms", self.name, duration * 1000, extra={'span': record})
+
+    def __call__(self, func):
+        name, labels, fields = self.name, self.labels, self.fields
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed_coroutine(*args, **kwargs):
+                with Span(name, labels, **fields):
+                    return await func(*args, **kwargs)
+            return timed_coroutine
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            with Span(name, labels, **fields):
+                return func(*args, **kwargs)
+        return timed
+
+
+def span(name: str, labels: Dict = None, **fields) -> Span:
+    """
+    Time a block (``with span(...)``) or every call of a function (``@span(...)``).
+
+    ``labels`` select the histogram the duration goes to, so keep their
+    values few (a call kind, an operation); ``fields`` are only logged.
+    """
+    return Span(name, labels, **fields)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; span records carry their fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if hasattr(record, 'span'):
+            data.update(record.span)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
@@ -0,0 +1,177 @@
+"""
+Precompiled keyword matcher for candidate chat messages.
+
+InterviewConsumer needs to know, for every user message, the requested
+difficulty, topics, whether the candidate wants a different problem and
+whether they asked for a problem by name. All keyword lists are compiled
+into a single trie-shaped regex at import time and the message is scanned
+once; the results are identical to checking each keyword with ``in``.
+"""
+import re
+from typing import Dict, List, Optional
+from .topics import TOPIC_SYNONYMS
+
+# Phrases after which a candidate usually names the problem they want (checked in this order)
+PROBLEM_REQUEST_KEYWORDS = [
+    'i want to do',
+    'i want',
+    'can i do',
+    'let me do',
+    'give me',
+    'i would like',
+    'i would like to do',
+    'can we do',
+    'let\'s do',
+    'let us do'
+]
+
+# Phrases that indicate the candidate wants to change problems
+CHANGE_KEYWORDS = [
+    'change problem',
+    'new problem',
+    'different problem',
+    'switch problem',
+    'another problem',
+    'try a different',
+    'can we do',
+    'let\'s do',
+    'i want to do',
+    'i\'d like to do',
+    'can i try',
+    'give me a different',
+    'pick a different',
+    'choose a different'
+]
+
+# Checked in priority order - the first one present wins
+DIFFICULTY_KEYWORDS = ['easy', 'medium', 'hard']
+
+# Keyword -> LeetCode tag slug, in the order topics are reported
+TOPIC_KEYWORDS = TOPIC_SYNONYMS
+
+# A message containing any of these is a preference, not a bare problem name
+NON_PROBLEM_NAME_WORDS = ['easy', 'medium', 'hard', 'array', 'string', 'tree', 'graph', 'dp', 'dynamic', 'programming']
+
+# Capitalised words that are never part of a problem name
+COMMON_CAPITALIZED_WORDS = {'Easy', 'Medium', 'Hard', 'Array', 'String', 'Tree', 'Graph', 'The', 'A', 'An', 'And', 'Or', 'But', 'In', 'On', 'At', 'To', 'For', 'Of', 'With', 'By'}
+
+
+def _build_keyword_regex(keywords: List[str]):
+    # Compile the keywords as a trie ("tree(?:s)?" rather than "trees|tree")
+    # so the regex engine walks one branch per character instead of trying
+    # every alternative at every position. Optional tails are greedy, so the
+    # longest keyword starting at a position wins.
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return re.compile(build(trie))
+
+
+def _build_prefix_table(keywords: List[str]) -> Dict[str, List[str]]:
+    # Every keyword that matches at the same position as a longer one is a
+    # prefix of it, so the longest match at a position implies the others.
+    return {
+        keyword: [other for other in keywords if keyword.startswith(other)]
+        for keyword in keywords
+    }
+
+
+_ALL_KEYWORDS = sorted(set(
+    PROBLEM_REQUEST_KEYWORDS + CHANGE_KEYWORDS + DIFFICULTY_KEYWORDS +
+    list(TOPIC_KEYWORDS) + NON_PROBLEM_NAME_WORDS
+))
+_KEYWORD_RE = _build_keyword_regex(_ALL_KEYWORDS)
+_KEYWORD_PREFIXES = _build_prefix_table(_ALL_KEYWORDS)
+
+# Lookup tables so results are built from the handful of keywords found
+# rather than by walking every keyword list
+_TOPIC_ORDER = {keyword: (index, topic) for index, (keyword, topic) in enumerate(TOPIC_KEYWORDS.items())}
+_CHANGE_KEYWORDS = frozenset(CHANGE_KEYWORDS)
+_NON_PROBLEM_NAME_WORDS = frozenset(NON_PROBLEM_NAME_WORDS)
+
+_SIMPLE_NAME_RE = re.compile(r'^[a-z]+(?:\s+[a-z]+){0,3}$')
+_CAPITALIZED_RE = re.compile(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b')
+
+
+def find_keywords(message_lower: str) -> Dict[str, int]:
+    """Return the position of the first occurrence of every known keyword in the message."""
+    found = {}
+    search = _KEYWORD_RE.search
+    position = 0
+    while True:
+        match = search(message_lower, position)
+        if not match:
+            return found
+        position = match.start()
+        for keyword in _KEYWORD_PREFIXES[match.group()]:
+            if keyword not in found:
+                found[keyword] = position
+        # Resume one character later so keywords inside this one (e.g. "tree"
+        # in "segment tree") are still found
+        position += 1
+
+
+def _extract_problem_name(message: str, message_lower: str, found: Dict[str, int]) -> Optional[str]:
+    # Text following a request phrase, e.g. "i want to do two sum"
+    for keyword in PROBLEM_REQUEST_KEYWORDS:
+        if keyword in found:
+            potential_problem = message_lower[found[keyword] + len(keyword):].strip()
+            # Remove common words that might follow
+            potential_problem = potential_problem.replace('problem', '').replace('the', '').strip()
+            if potential_problem and len(potential_problem) > 2:
+                return potential_problem
+
+    # The whole message is a short problem name, e.g. "two sum"
+    message_clean = message.strip().lower()
+    if (_SIMPLE_NAME_RE.match(message_clean) and
+            len(message_clean.split()) <= 4 and
+            len(message_clean) > 3 and
+            _NON_PROBLEM_NAME_WORDS.isdisjoint(found)):
+        return message.strip()
+
+    # Capitalised words, e.g. "Let's try Valid Parentheses"
+    capitalized_words = _CAPITALIZED_RE.findall(message)
+    potential_problems = [word for word in capitalized_words if word not in COMMON_CAPITALIZED_WORDS]
+    if potential_problems:
+        return ' '.join(potential_problems)
+
+    return None
+
+
+def match_intent(message: str) -> Dict:
+    """
+    Extract everything InterviewConsumer needs from a user message in one pass.
+
+    Returns a dict with:
+        difficulty: 'easy', 'medium', 'hard' or None
+        topics: list of LeetCode tag slugs in TOPIC_KEYWORDS order
+        change_request: True if the candidate asked for a different problem
+        problem_name: a requested problem name or None
+    """
+    message_lower = message.lower()
+    found = find_keywords(message_lower)
+
+    difficulty = next((level for level in DIFFICULTY_KEYWORDS if level in found), None)
+
+    topics = []
+    for _, topic in sorted(_TOPIC_ORDER[keyword] for keyword in found if keyword in _TOPIC_ORDER):
+        if topic not in topics:
+            topics.append(topic)
+
+    return {
+        'difficulty': difficulty,
+        'topics': topics,
+        'change_request': not _CHANGE_KEYWORDS.isdisjoint(found),
+        'problem_name': _extract_problem_name(message, message_lower, found),
+    }
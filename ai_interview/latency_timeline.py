@@ -0,0 +1,142 @@
+"""
+Per-session timeline of turn latencies.
+
+A turn is one frame from the candidate and the AI reply it triggers (or
+the greeting when the socket opens). Each turn is one compact row of
+InterviewSession.latency_timeline:
+
+    [at, kind, first_token, reply, tts]
+
+``at`` is milliseconds since the session started. The other three are
+milliseconds from the frame being received to the first LLM token, to the
+reply being sent and to the reply's audio being ready in the browser (the
+client reports that with a tts_ready frame); null when the stage did not
+happen. The consumer keeps the rows on its session object, so they are
+saved with its other column changes and at the latest when the socket
+closes.
+"""
+import statistics
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from django.conf import settings
+
+# Row kind for each client frame that starts a turn
+TURN_KINDS = {
+    'chat_message': 'chat',
+    'code_submission': 'code',
+    'request_hint': 'hint',
+    'analyze_code': 'analyze',
+    'end_interview': 'end',
+}
+
+# Replies whose tts_ready report is still accepted, per socket
+RECENT_REPLIES = 20
+
+
+class Turn:
+    """Timings of one turn, in milliseconds since it started."""
+
+    def __init__(self, kind: str, at: int, index: int):
+        self.kind = kind
+        self.at = at
+        self.index = index
+        self.started = time.monotonic()
+        self.first_token: Optional[int] = None
+        self.reply: Optional[int] = None
+        self.tts: Optional[int] = None
+
+    def elapsed(self) -> int:
+        return int((time.monotonic() - self.started) * 1000)
+
+    def row(self) -> List:
+        return [self.at, self.kind, self.first_token, self.reply, self.tts]
+
+
+current_turn: ContextVar[Optional[Turn]] = ContextVar('current_turn', default=None)
+
+
+def mark_first_token() -> None:
+    """Record the first LLM token of the current turn (a no-op outside one)."""
+    turn = current_turn.get()
+    if turn is not None and turn.first_token is None:
+        turn.first_token = turn.elapsed()
+
+
+class SessionTimeline:
+    """Records the turns of one socket into its session's latency_timeline."""
+
+    def __init__(self, session, max_turns: int = None):
+        self.session = session
+        self.max_turns = max_turns or getattr(settings, 'LATENCY_TIMELINE_MAX_TURNS', 500)
+        self._recent_replies: Dict[int, Turn] = {}
+
+    def start(self, kind: str) -> Optional[Turn]:
+        """Begin a turn in the current task; None once the timeline is full."""
+        rows = self.session.latency_timeline
+        if len(rows) >= self.max_turns:
+            current_turn.set(None)
+            return None
+        at = int((time.time() - self.session.started_at.timestamp()) * 1000)
+        turn = Turn(kind, at, len(rows))
+        rows.append(turn.row())
+        current_turn.set(turn)
+        return turn
+
+    def _store(self, turn: Turn) -> None:
+        self.session.latency_timeline[turn.index] = turn.row()
+
+    def reply_sent(self, seq: int) -> None:
+        """The current turn's first AI reply went out with frame number ``seq``."""
+        turn = current_turn.get()
+        if turn is None or turn.reply is not None:
+            return
+        turn.reply = turn.elapsed()
+        self._store(turn)
+        self._recent_replies[seq] = turn
+        while len(self._recent_replies) > RECENT_REPLIES:
+            del self._recent_replies[next(iter(self._recent_replies))]
+
+    def tts_ready(self, seq) -> None:
+        """The browser has the audio for the reply with frame number ``seq``."""
+        turn = self._recent_replies.get(seq)
+        if turn is None or turn.tts is not None:
+            return
+        turn.tts = turn.elapsed()
+        self._store(turn)
+
+    def finish(self) -> None:
+        """End the current turn, dropping it if nothing happened (e.g. a resent message)."""
+        turn = current_turn.get()
+        current_turn.set(None)
+        if turn is None:
+            return
+        rows = self.session.latency_timeline
+        if turn.reply is None and turn.first_token is None and turn.index == len(rows) - 1:
+            rows.pop()
+        else:
+            self._store(turn)
+
+
+def timeline_rows(rows: List[List]) -> List[Dict]:
+    """Stored rows as dicts for display, flagging replies slower than LATENCY_TIMELINE_SLOW_MS."""
+    slow_ms = getattr(settings, 'LATENCY_TIMELINE_SLOW_MS', 5000)
+    return [
+        {
+            'at': at / 1000,
+            'kind': kind,
+            'first_token': first_token,
+            'reply': reply,
+            'tts': tts,
+            'slow': reply is not None and reply > slow_ms,
+        }
+        for at, kind, first_token, reply, tts in rows
+    ]
+
+
+def timeline_summary(rows: List[List]) -> Optional[Dict]:
+    """Median and worst reply time of a timeline, or None without replies."""
+    replies = [row[3] for row in rows if row[3] is not None]
+    if not replies:
+        return None
+    return {'turns': len(rows), 'median_reply': int(statistics.median(replies)), 'max_reply': max(replies)}
@@ -1,8 +1,82 @@
+import asyncio
+import hashlib
+import httpx
 import requests
 import json
+import logging
+import random
 import re
-from typing import List, Dict, Optional
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Iterable, Optional
 from django.conf import settings
+from django.core.cache import cache
+from .instrumentation import counter, span
+from .models import LeetCodeQuestion
+from .rate_limit import leetcode_circuit_breaker, leetcode_rate_limiter
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .topics import canonical_topic
+from .problem_pools import IdBitset, ProblemPoolIndex
+from .problem_parser import clean_html_text, parsed_content_cache
+from .output_normalizer import expected_value, format_expected_output, official_test_case
+
+logger = logging.getLogger(__name__)
+
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Statuses that count against the circuit breaker: LeetCode is refusing us or is down.
+# Other client errors (400, 404) are about the request and count as a response.
+BREAKER_FAILURE_STATUSES = {401, 403, 429}
+
+
+def breaker_failure(status: int) -> bool:
+    return status in BREAKER_FAILURE_STATUSES or status >= 500
+
+
+def backoff_delay(attempt: int) -> float:
+    """Seconds to wait before retry ``attempt`` (0-based): capped exponential backoff with full jitter."""
+    base = getattr(settings, 'LEETCODE_RETRY_BACKOFF', 0.5)
+    return random.uniform(0, min(8.0, base * 2 ** attempt))
+
+
+_OPERATION_RE = re.compile(r'query\s+(\w+)')
+
+
+def graphql_operation(query: str) -> str:
+    """The operation name of a GraphQL query, e.g. problemsetQuestionList."""
+    match = _OPERATION_RE.search(query)
+    return match.group(1) if match else 'unknown'
+
+
+class LeetCodeUnavailable(Exception):
+    """Raised without making a request: the circuit breaker is open or no rate-limit token came in time."""
+
+
+class CatalogFetch:
+    """Pages of a full questionList fetch, keyed by their skip offset"""
+    
+    def __init__(self, page_size: int, total: int = None, pages: Dict[int, List[Dict]] = None):
+        self.page_size = page_size
+        self.total = total
+        self.pages: Dict[int, List[Dict]] = dict(pages or {})
+        self.failed: Dict[int, str] = {}  # skip -> error
+    
+    def missing_skips(self) -> List[int]:
+        """Offsets of the pages not fetched yet."""
+        if self.total is None:
+            return [0]
+        return [skip for skip in range(0, self.total, self.page_size) if skip not in self.pages]
+    
+    @property
+    def complete(self) -> bool:
+        return self.total is not None and not self.missing_skips()
+    
+    def questions(self) -> List[Dict]:
+        """All fetched questions, merged in catalog order."""
+        return [question for skip in sorted(self.pages) for question in self.pages[skip]]
 
 
 class LeetCodeService:
@@ -43,6 +117,32 @@ class LeetCodeService:
     }
     """
     
+    # Slim questionList query for incremental catalog refreshes: only the
+    # fields a refresh compares (no acceptance rate or per-user state, which
+    # change constantly)
+    CATALOG_DELTA_QUERY = """
+    query problemsetQuestionList($categorySlug: String, $limit: Int, $skip: Int, $filters: QuestionListFilterInput) {
+        problemsetQuestionList: questionList(
+            categorySlug: $categorySlug
+            limit: $limit
+            skip: $skip
+            filters: $filters
+        ) {
+            total: totalNum
+            questions: data {
+                difficulty
+                frontendQuestionId: questionFrontendId
+                paidOnly: isPaidOnly
+                title
+                titleSlug
+                topicTags {
+                    slug
+                }
+            }
+        }
+    }
+    """
+    
     # GraphQL query to get problem details
     PROBLEM_DETAILS_QUERY = """
     query questionContent($titleSlug: String!) {
@@ -61,78 +161,422 @@ class LeetCodeService:
     }
     """
     
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'application/json',
+        'Content-Type': 'application/json',
+    }
+    
+    # Seconds before a catalog page request is abandoned
+    CATALOG_REQUEST_TIMEOUT = 30
+    
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/json',
-            'Content-Type': 'application/json',
-        })
+        # LEETCODE_GRAPHQL_URL can point at a stand-in (see leetcode_standin)
+        self.GRAPHQL_URL = getattr(settings, 'LEETCODE_GRAPHQL_URL', None) or self.GRAPHQL_URL
+        # Each thread keeps its own pooled keep-alive session
+        self._thread_local = threading.local()
+        # httpx.AsyncClient is bound to the event loop it was first used on
+        self._async_clients = weakref.WeakKeyDictionary()
+        # Outbound requests are throttled, and refused outright while LeetCode keeps failing
+        self.rate_limiter = leetcode_rate_limiter()
+        self.breaker = leetcode_circuit_breaker()
+        # Concurrent cache misses for the same query share one request
+        self._flights = SingleFlight()
+        self._async_flights = AsyncSingleFlight()
+        # Precomputed (difficulty, topic) -> question ID pools for random selection
+        self.pools = ProblemPoolIndex(self._pool_problems)
+    
+    def available(self) -> bool:
+        """False while the circuit breaker is open and requests fail without being sent."""
+        return not self.breaker.is_open()
+    
+    def _rate_limit_wait(self, waited: float) -> float:
+        """Take a token, returning 0, or the seconds to wait before trying again."""
+        if self.breaker.is_open():
+            raise LeetCodeUnavailable("LeetCode circuit breaker is open")
+        wait = self.rate_limiter.take()
+        if wait and waited + wait > getattr(settings, 'LEETCODE_RATE_LIMIT_MAX_WAIT', 10):
+            raise LeetCodeUnavailable("Timed out waiting for a LeetCode rate limit token")
+        return wait
+    
+    def _admit(self) -> None:
+        """Block until this request may be sent, or raise LeetCodeUnavailable."""
+        waited = 0.0
+        while True:
+            wait = self._rate_limit_wait(waited)
+            if not wait:
+                break
+            time.sleep(wait)
+            waited += wait
+    
+    async def _aadmit(self) -> None:
+        waited = 0.0
+        while True:
+            wait = self._rate_limit_wait(waited)
+            if not wait:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+    
+    def _admit_call(self) -> None:
+        """Ask the circuit breaker once per logical call; in the half-open state this call is the trial."""
+        if not self.breaker.allow():
+            raise LeetCodeUnavailable("LeetCode circuit breaker is open")
+    
+    def _record_status(self, status: int) -> None:
+        if breaker_failure(status):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+    
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers.update(self.HEADERS)
+        pool_size = getattr(settings, 'LEETCODE_MAX_CONNECTIONS', 20)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def _thread_session(self) -> requests.Session:
+        session = getattr(self._thread_local, 'session', None)
+        if session is None:
+            session = self._thread_local.session = self._new_session()
+        return session
+    
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            max_connections = getattr(settings, 'LEETCODE_MAX_CONNECTIONS', 20)
+            client = self._async_clients[loop] = httpx.AsyncClient(
+                headers=self.HEADERS,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            )
+        return client
+    
+    async def aclose(self) -> None:
+        """Close the async client of the running event loop."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+    
+    def _timeouts(self, read_timeout: float = None):
+        """(connect, read) timeouts in seconds."""
+        return (
+            getattr(settings, 'LEETCODE_CONNECT_TIMEOUT', 5),
+            read_timeout or getattr(settings, 'LEETCODE_READ_TIMEOUT', 20),
+        )
+    
+    def _post_graphql(self, query: str, variables: Dict, read_timeout: float = None) -> Dict:
+        """
+        POST a GraphQL query and return the decoded response.
+        
+        The call is admitted by the circuit breaker and each attempt by the
+        rate limiter. Connection errors, timeouts and retryable statuses are
+        retried with jittered backoff up to LEETCODE_MAX_RETRIES times; the
+        last failure is raised. The breaker is told the outcome once, after
+        the last attempt.
+        """
+        self._admit_call()
+        retries = getattr(settings, 'LEETCODE_MAX_RETRIES', 2)
+        for attempt in range(retries + 1):
+            self._admit()
+            try:
+                with span('leetcode.request', labels={'operation': graphql_operation(query)}, attempt=attempt) as timing:
+                    response = self._thread_session().post(
+                        self.GRAPHQL_URL,
+                        json={'query': query, 'variables': variables},
+                        timeout=self._timeouts(read_timeout)
+                    )
+                    timing.set(status=response.status_code)
+            except requests.RequestException as e:
+                if attempt == retries or not isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                    self.breaker.record_failure()
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUSES or attempt == retries:
+                    self._record_status(response.status_code)
+                    response.raise_for_status()
+                    return response.json()
+            time.sleep(backoff_delay(attempt))
+    
+    async def _apost_graphql(self, query: str, variables: Dict, read_timeout: float = None) -> Dict:
+        """Async counterpart of _post_graphql over the pooled httpx client."""
+        connect_timeout, read_timeout = self._timeouts(read_timeout)
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._admit_call()
+        retries = getattr(settings, 'LEETCODE_MAX_RETRIES', 2)
+        for attempt in range(retries + 1):
+            await self._aadmit()
+            try:
+                with span('leetcode.request', labels={'operation': graphql_operation(query)}, attempt=attempt) as timing:
+                    response = await self._async_client().post(
+                        self.GRAPHQL_URL,
+                        json={'query': query, 'variables': variables},
+                        timeout=timeout
+                    )
+                    timing.set(status=response.status_code)
+            except httpx.HTTPError as e:
+                if attempt == retries or not isinstance(e, httpx.TransportError):
+                    self.breaker.record_failure()
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUSES or attempt == retries:
+                    self._record_status(response.status_code)
+                    response.raise_for_status()
+                    return response.json()
+            await asyncio.sleep(backoff_delay(attempt))
+    
+    def _response_cache_key(self, query: str, variables: Dict) -> str:
+        payload = json.dumps({'query': query, 'variables': variables}, sort_keys=True)
+        return f"leetcode:graphql:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+    
+    def _cached_graphql(self, query: str, variables: Dict) -> Dict:
+        """
+        _post_graphql through the response cache shared with the async
+        methods. Identical concurrent misses are coalesced into one request.
+        """
+        key = self._response_cache_key(query, variables)
+        data = cache.get(key)
+        counter('leetcode_cache_requests_total', result='miss' if data is None else 'hit').inc()
+        if data is None:
+            data = self._flights.do(key, lambda: self._fetch_and_cache(key, query, variables))
+        return data
+    
+    def _fetch_and_cache(self, key: str, query: str, variables: Dict) -> Dict:
+        data = self._post_graphql(query, variables)
+        if self._cacheable(data):
+            cache.set(key, data, getattr(settings, 'LEETCODE_RESPONSE_CACHE_TTL', 60 * 60))
+        return data
+    
+    @staticmethod
+    def _cacheable(data: Dict) -> bool:
+        """GraphQL error payloads and empty results are not cached, so the next call asks again."""
+        return isinstance(data, dict) and not data.get('errors') and bool(data.get('data'))
+    
+    async def _acached_graphql(self, query: str, variables: Dict) -> Dict:
+        key = self._response_cache_key(query, variables)
+        data = await cache.aget(key)
+        counter('leetcode_cache_requests_total', result='miss' if data is None else 'hit').inc()
+        if data is None:
+            data = await self._async_flights.do(key, lambda: self._afetch_and_cache(key, query, variables))
+        return data
+    
+    async def _afetch_and_cache(self, key: str, query: str, variables: Dict) -> Dict:
+        data = await self._apost_graphql(query, variables)
+        if self._cacheable(data):
+            await cache.aset(key, data, getattr(settings, 'LEETCODE_RESPONSE_CACHE_TTL', 60 * 60))
+        return data
+    
+    def _problems_variables(self, difficulty: str = None, topic: str = None, limit: int = 50) -> Dict:
+        filters = {}
+        if difficulty:
+            difficulty_map = {'easy': 'EASY', 'medium': 'MEDIUM', 'hard': 'HARD'}
+            filters['difficulty'] = difficulty_map.get(difficulty.lower())
+        
+        # Filter by topic server-side using the LeetCode tag slug
+        if topic:
+            filters['tags'] = [canonical_topic(topic) or topic.lower().replace(' ', '-')]
+        
+        return {
+            'categorySlug': '',
+            'limit': limit,
+            'skip': 0,
+            'filters': filters
+        }
+    
+    def _free_questions(self, data: Dict) -> List[Dict]:
+        questions = (data.get('data') or {}).get('problemsetQuestionList', {}).get('questions', [])
+        # Filter out paid-only problems
+        return [q for q in questions if not q.get('paidOnly', False)]
     
     def get_problems(self, difficulty: str = None, topic: str = None, limit: int = 50) -> List[Dict]:
         """Get list of problems from LeetCode"""
         try:
-            filters = {}
-            if difficulty:
-                difficulty_map = {'easy': 'EASY', 'medium': 'MEDIUM', 'hard': 'HARD'}
-                filters['difficulty'] = difficulty_map.get(difficulty.lower())
-            
-            variables = {
-                'categorySlug': '',
-                'limit': limit,
-                'skip': 0,
-                'filters': filters
+            data = self._cached_graphql(self.PROBLEMS_QUERY, self._problems_variables(difficulty, topic, limit))
+            return self._free_questions(data)
+        except Exception as e:
+            logger.warning(f"Exception in get_problems: {e}")
+            return []
+    
+    def mirrored_problems(self, difficulty: str = None, topic: str = None, limit: int = None) -> List[Dict]:
+        """
+        Free questions from the local catalog mirror (see sync_leetcode_catalog),
+        in the same summary format as get_problems.
+        """
+        questions = LeetCodeQuestion.objects.filter(paid_only=False).order_by('leetcode_id')
+        if difficulty:
+            questions = questions.filter(difficulty=difficulty.lower())
+        if topic:
+            slug = canonical_topic(topic) or topic.lower().replace(' ', '-')
+            questions = questions.filter(topics__icontains=f'"{slug}"')
+        return [
+            {
+                'frontendQuestionId': str(question.leetcode_id),
+                'titleSlug': question.title_slug,
+                'title': question.title,
+                'difficulty': question.difficulty.capitalize(),
+                'paidOnly': False,
+                'acRate': question.ac_rate,
+                'topicTags': [{'slug': slug} for slug in question.topics],
             }
-            
-            response = self.session.post(
-                self.GRAPHQL_URL,
-                json={'query': self.PROBLEMS_QUERY, 'variables': variables}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                questions = data.get('data', {}).get('problemsetQuestionList', {}).get('questions', [])
-                
-                # Filter out paid-only problems
-                questions = [q for q in questions if not q.get('paidOnly', False)]
-                
-                # Filter by topic if specified
-                if topic:
-                    topic_lower = topic.lower()
-                    questions = [q for q in questions if any(
-                        topic_lower in tag.get('slug', '').lower() or 
-                        topic_lower in tag.get('name', '').lower()
-                        for tag in q.get('topicTags', [])
-                    )]
-                
-                return questions
-            else:
-                print(f"Error fetching problems: {response.status_code}")
-                return []
-                
+            for question in questions[:limit]
+        ]
+    
+    def _pool_problems(self, difficulty: str = None, topic: str = None, limit: int = 50) -> List[Dict]:
+        """Pool loader: live problems, or the catalog mirror while LeetCode is unavailable."""
+        problems = self.get_problems(difficulty, topic, limit)
+        if not problems and not self.available():
+            problems = self.mirrored_problems(difficulty, topic, limit)
+            logger.warning(f"LeetCode unavailable, loaded {len(problems)} problems from the catalog mirror")
+        return problems
+    
+    async def aget_problems(self, difficulty: str = None, topic: str = None, limit: int = 50) -> List[Dict]:
+        """Async get_problems"""
+        try:
+            data = await self._acached_graphql(self.PROBLEMS_QUERY, self._problems_variables(difficulty, topic, limit))
+            return self._free_questions(data)
         except Exception as e:
-            print(f"Exception in get_problems: {e}")
+            logger.warning(f"Exception in aget_problems: {e}")
             return []
     
-    def get_problem_details(self, title_slug: str) -> Optional[Dict]:
-        """Get detailed problem content from LeetCode"""
+    def _page_variables(self, skip: int, limit: int, filters: Dict = None) -> Dict:
+        return {
+            'categorySlug': '',
+            'limit': limit,
+            'skip': skip,
+            'filters': filters or {}
+        }
+    
+    def _page(self, data: Dict) -> Dict:
+        page = data['data']['problemsetQuestionList']
+        return {'total': page['total'], 'questions': page['questions']}
+    
+    def fetch_problem_page(self, skip: int, limit: int, filters: Dict = None, query: str = None) -> Dict:
+        """
+        Fetch one page of the questionList, paid-only questions included.
+        
+        Returns {'total': int, 'questions': [...]}; raises on any failure so
+        callers can retry the page. ``query`` defaults to PROBLEMS_QUERY.
+        Pages are never cached: the catalog sync needs what is live.
+        """
+        return self._page(self._post_graphql(
+            query or self.PROBLEMS_QUERY, self._page_variables(skip, limit, filters),
+            read_timeout=self.CATALOG_REQUEST_TIMEOUT
+        ))
+    
+    async def afetch_problem_page(self, skip: int, limit: int, filters: Dict = None, query: str = None) -> Dict:
+        """Async fetch_problem_page"""
+        return self._page(await self._apost_graphql(
+            query or self.PROBLEMS_QUERY, self._page_variables(skip, limit, filters),
+            read_timeout=self.CATALOG_REQUEST_TIMEOUT
+        ))
+    
+    def fetch_catalog(self, page_size: int = None, workers: int = None, resume: CatalogFetch = None,
+                      on_page: Callable[[CatalogFetch, int], None] = None, query: str = None) -> CatalogFetch:
+        """
+        Fetch the whole question catalog, pages in parallel.
+        
+        The first page is fetched on its own to learn the total; the rest are
+        spread over a pool of at most ``workers`` threads. Failed pages are
+        recorded in ``failed`` rather than aborting the fetch, and passing the
+        result back as ``resume`` fetches only the pages still missing.
+        ``on_page(fetch, skip)`` is called from the calling thread as each
+        page arrives (e.g. to checkpoint progress).
+        """
+        page_size = page_size or getattr(settings, 'LEETCODE_CATALOG_PAGE_SIZE', 100)
+        workers = workers or getattr(settings, 'LEETCODE_CATALOG_WORKERS', 8)
+        fetch = resume if resume and resume.page_size == page_size else CatalogFetch(page_size)
+        fetch.failed = {}
+        
+        def store(skip, page):
+            fetch.total = page['total']
+            fetch.pages[skip] = page['questions']
+            if on_page:
+                on_page(fetch, skip)
+        
+        if fetch.total is None:
+            try:
+                store(0, self.fetch_problem_page(0, page_size, query=query))
+            except Exception as e:
+                fetch.failed[0] = str(e)
+                return fetch
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='leetcode-catalog') as executor:
+            futures = {
+                executor.submit(self.fetch_problem_page, skip, page_size, query=query): skip
+                for skip in fetch.missing_skips()
+            }
+            for future in as_completed(futures):
+                skip = futures[future]
+                try:
+                    store(skip, future.result())
+                except Exception as e:
+                    fetch.failed[skip] = str(e)
+        
+        logger.info(f"Catalog fetch: {len(fetch.pages)} pages, {len(fetch.failed)} failed, total={fetch.total}")
+        return fetch
+    
+    async def afetch_catalog(self, page_size: int = None, workers: int = None, resume: CatalogFetch = None,
+                             on_page: Callable[[CatalogFetch, int], None] = None, query: str = None) -> CatalogFetch:
+        """Async fetch_catalog: at most ``workers`` pages are in flight at once."""
+        page_size = page_size or getattr(settings, 'LEETCODE_CATALOG_PAGE_SIZE', 100)
+        workers = workers or getattr(settings, 'LEETCODE_CATALOG_WORKERS', 8)
+        fetch = resume if resume and resume.page_size == page_size else CatalogFetch(page_size)
+        fetch.failed = {}
+        in_flight = asyncio.Semaphore(workers)
+        
+        async def fetch_page(skip):
+            async with in_flight:
+                try:
+                    page = await self.afetch_problem_page(skip, page_size, query=query)
+                except Exception as e:
+                    fetch.failed[skip] = str(e)
+                    return
+            fetch.total = page['total']
+            fetch.pages[skip] = page['questions']
+            if on_page:
+                on_page(fetch, skip)
+        
+        if fetch.total is None:
+            await fetch_page(0)
+            if fetch.total is None:
+                return fetch
+        
+        await asyncio.gather(*(fetch_page(skip) for skip in fetch.missing_skips()))
+        logger.info(f"Catalog fetch: {len(fetch.pages)} pages, {len(fetch.failed)} failed, total={fetch.total}")
+        return fetch
+    
+    def get_problem_details(self, title_slug: str, use_cache: bool = True) -> Optional[Dict]:
+        """
+        Get detailed problem content from LeetCode.
+        
+        Responses are cached for LEETCODE_RESPONSE_CACHE_TTL seconds (shared
+        with aget_problem_details); pass use_cache=False to force a fetch.
+        """
         try:
             variables = {'titleSlug': title_slug}
-            
-            response = self.session.post(
-                self.GRAPHQL_URL,
-                json={'query': self.PROBLEM_DETAILS_QUERY, 'variables': variables}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('data', {}).get('question', {})
+            if use_cache:
+                data = self._cached_graphql(self.PROBLEM_DETAILS_QUERY, variables)
             else:
-                print(f"Error fetching problem details: {response.status_code}")
-                return None
-                
+                data = self._post_graphql(self.PROBLEM_DETAILS_QUERY, variables)
+            return (data.get('data') or {}).get('question', {})
+        except Exception as e:
+            logger.warning(f"Exception in get_problem_details: {e}")
+            return None
+    
+    async def aget_problem_details(self, title_slug: str, use_cache: bool = True) -> Optional[Dict]:
+        """Async get_problem_details"""
+        try:
+            variables = {'titleSlug': title_slug}
+            if use_cache:
+                data = await self._acached_graphql(self.PROBLEM_DETAILS_QUERY, variables)
+            else:
+                data = await self._apost_graphql(self.PROBLEM_DETAILS_QUERY, variables)
+            return (data.get('data') or {}).get('question', {})
         except Exception as e:
-            print(f"Exception in get_problem_details: {e}")
+            logger.warning(f"Exception in aget_problem_details: {e}")
             return None
     
     def get_official_function_signature(self, title_slug: str) -> str:
@@ -141,25 +585,27 @@ class LeetCodeService:
             details = self.get_problem_details(title_slug)
             if not details:
                 return ""
-            
-            # Get Python code snippet
-            code_snippets = details.get('codeSnippets', [])
-            python_snippet = None
-            
-            for snippet in code_snippets:
-                if snippet.get('langSlug') == 'python3' or snippet.get('lang') == 'Python3':
-                    python_snippet = snippet.get('code', '')
-                    break
-            
-            if python_snippet:
-                print(f"Found official Python snippet for {title_slug}")
-                return python_snippet
-            else:
-                print(f"No Python snippet found for {title_slug}")
-                return ""
-                
+            return self.function_signature_from_details(details, title_slug)
         except Exception as e:
-            print(f"Exception getting official function signature: {e}")
+            logger.warning(f"Exception getting official function signature: {e}")
+            return ""
+    
+    def function_signature_from_details(self, details: Dict, title_slug: str = '') -> str:
+        """The official Python code snippet in a question's details, or an empty string."""
+        # Get Python code snippet
+        code_snippets = details.get('codeSnippets') or []
+        python_snippet = None
+        
+        for snippet in code_snippets:
+            if snippet.get('langSlug') == 'python3' or snippet.get('lang') == 'Python3':
+                python_snippet = snippet.get('code', '')
+                break
+        
+        if python_snippet:
+            logger.debug(f"Found official Python snippet for {title_slug}")
+            return python_snippet
+        else:
+            logger.debug(f"No Python snippet found for {title_slug}")
             return ""
     
     def get_official_test_cases(self, title_slug: str) -> List[Dict]:
@@ -168,175 +614,57 @@ class LeetCodeService:
             details = self.get_problem_details(title_slug)
             if not details:
                 return []
-            
-            # First try to get test cases from parsed content (more reliable)
-            parsed_content = self.parse_problem_content(details.get('content', ''))
-            examples = parsed_content.get('examples', [])
-            
-            if examples:
-                test_cases = []
-                for example in examples:
-                    # Clean up the input and output
-                    input_text = example.get('input', '').replace('columnNumber = ', '').strip()
-                    output_text = example.get('output', '').strip()
-                    
-                    # Remove HTML tags and extra text from output
-                    output_text = self._clean_html_text(output_text)
-                    output_text = output_text.replace('"', '').strip()
-                    
-                    # Extract just the first line if there are multiple lines
-                    if '\n' in output_text:
-                        output_text = output_text.split('\n')[0].strip()
-                    
-                    # Remove any remaining HTML-like content (more aggressive)
-                    output_text = re.sub(r'<[^>]*>', '', output_text).strip()
-                    output_text = re.sub(r'&[a-zA-Z]+;', '', output_text)  # Remove HTML entities
-                    
-                    # Remove any text that looks like HTML attributes or classes
-                    output_text = re.sub(r'<span[^>]*>', '', output_text)
-                    output_text = re.sub(r'<div[^>]*>', '', output_text)
-                    output_text = re.sub(r'<p[^>]*>', '', output_text)
-                    output_text = re.sub(r'<strong[^>]*>', '', output_text)
-                    output_text = re.sub(r'<em[^>]*>', '', output_text)
-                    
-                    # Clean up common formatting issues
-                    output_text = re.sub(r'\s+', ' ', output_text)  # Normalize whitespace
-                    output_text = output_text.strip()
-                    
-                    # Fix common boolean values
-                    if output_text.lower() in ['true', 'false']:
-                        output_text = output_text.capitalize()
-                    
-                    # Remove any remaining quotes if they're not part of the actual value
-                    if output_text.startswith("'") and output_text.endswith("'"):
-                        output_text = output_text[1:-1]
-                    
-                    # If the output still contains HTML-like content, try to extract just the value
-                    if '<' in output_text or 'class=' in output_text:
-                        # Try to extract just the boolean or numeric value
-                        if 'true' in output_text.lower():
-                            output_text = 'True'
-                        elif 'false' in output_text.lower():
-                            output_text = 'False'
-                        elif re.search(r'\d+', output_text):
-                            # Extract the first number found
-                            number_match = re.search(r'\d+', output_text)
-                            if number_match:
-                                output_text = number_match.group()
-                    
-                    if input_text and output_text:
-                        test_cases.append({
-                            'input': input_text,
-                            'expected': output_text
-                        })
-                
-                if test_cases:
-                    print(f"Found {len(test_cases)} test cases from parsed content for {title_slug}")
-                    return test_cases
-            
-            # Fallback to exampleTestcases field if parsed content doesn't work
-            example_testcases = details.get('exampleTestcases', '')
-            if not example_testcases:
-                return []
-            
-            # Parse the test cases string
-            # LeetCode returns test cases as a newline-separated string
-            # Format is usually: "input1\noutput1\ninput2\noutput2\n..."
-            test_cases = []
-            lines = example_testcases.strip().split('\n')
-            
-            for i in range(0, len(lines), 2):
-                if i + 1 < len(lines):
-                    input_line = lines[i].strip()
-                    output_line = lines[i + 1].strip()
-                    
-                    test_cases.append({
-                        'input': input_line,
-                        'expected': output_line
-                    })
-            
-            print(f"Found {len(test_cases)} official test cases from exampleTestcases for {title_slug}")
-            return test_cases
-            
+            return self.test_cases_from_details(details, title_slug)
         except Exception as e:
-            print(f"Exception getting official test cases: {e}")
+            logger.warning(f"Exception getting official test cases: {e}")
             return []
     
-    def parse_problem_content(self, content: str) -> Dict:
-        """Parse LeetCode problem content to extract structured data with proper formatting"""
-        if not content:
-            return {}
-        
-        # Extract examples using multiple regex patterns
-        examples = []
-        
-        # Try different patterns for examples (ordered by specificity)
-        example_patterns = [
-            # Pattern 1: Handle the new LeetCode format with example-block divs (most specific)
-            r'<strong class="example">Example\s*(\d+):</strong>.*?<div class="example-block">.*?<strong>Input:</strong>\s*<span[^>]*>(.*?)</span>.*?<strong>Output:</strong>\s*<span[^>]*>(.*?)</span>.*?</div>',
-            # Pattern 2: <strong>Example X:</strong> with <pre> blocks
-            r'<strong>Example\s*(\d+):</strong>.*?<pre>.*?<strong>Input:</strong>\s*(.*?)<strong>Output:</strong>\s*(.*?)(?:<strong>Explanation:</strong>\s*(.*?))?</pre>',
-            # Pattern 3: <b>Example X:</b> with <pre> blocks  
-            r'<b>Example\s*(\d+):</b>.*?<pre>.*?<b>Input:</b>\s*(.*?)<b>Output:</b>\s*(.*?)(?:<b>Explanation:</b>\s*(.*?))?</pre>',
-            # Pattern 4: Plain text examples without <pre>
-            r'<strong>Example\s*(\d+):</strong>.*?<strong>Input:</strong>\s*(.*?)<strong>Output:</strong>\s*(.*?)(?:<strong>Explanation:</strong>\s*(.*?))?(?=<strong>Example|$)',
-            # Pattern 5: More flexible pattern
-            r'Example\s*(\d+):.*?Input:\s*(.*?)Output:\s*(.*?)(?:Explanation:\s*(.*?))?(?=Example|\Z)',
-            # Pattern 6: Handle cases where output might be in different format
-            r'<strong>Example\s*(\d+):</strong>.*?<strong>Input:</strong>\s*(.*?)<strong>Output:</strong>\s*(.*?)(?=<strong>Example|$)',
-            # Pattern 7: Handle cases with different HTML structure
-            r'<b>Example\s*(\d+):</b>.*?<b>Input:</b>\s*(.*?)<b>Output:</b>\s*(.*?)(?=<b>Example|$)'
-        ]
+    def test_cases_from_details(self, details: Dict, title_slug: str = '') -> List[Dict]:
+        """The official test cases in a question's details: its parsed examples, else exampleTestcases."""
+        # First try to get test cases from parsed content (more reliable)
+        parsed_content = self.parse_problem_content(details.get('content', ''))
+        examples = parsed_content.get('examples', [])
         
-        for pattern in example_patterns:
-            matches = re.findall(pattern, content, re.DOTALL | re.IGNORECASE)
-            if matches:
-                for match in matches:
-                    example_num = match[0]
-                    input_text = self._clean_html_text(match[1])
-                    output_text = self._clean_html_text(match[2])
-                    explanation = self._clean_html_text(match[3]) if len(match) > 3 and match[3] else None
-                    
-                    examples.append({
-                        'input': input_text,
-                        'output': output_text,
-                        'explanation': explanation
-                    })
-                break  # Use first pattern that finds matches
-        
-        # Extract constraints using multiple patterns
-        constraints = ""
-        constraints_patterns = [
-            r'<strong>Constraints:</strong>(.*?)(?:<p>|<br>|$)',
-            r'<b>Constraints:</b>(.*?)(?:<p>|<br>|$)',
-            r'Constraints:(.*?)(?:<p>|<br>|$)'
-        ]
-        
-        for pattern in constraints_patterns:
-            constraints_match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            if constraints_match:
-                constraints = self._clean_html_text(constraints_match.group(1))
-                break
-        
-        # Extract the main description by removing examples and constraints
-        description = content
+        if examples:
+            test_cases = []
+            for example in examples:
+                test_case = official_test_case(example)
+                if test_case['input'] and test_case['expected']:
+                    test_cases.append(test_case)
+            
+            if test_cases:
+                logger.debug(f"Found {len(test_cases)} test cases from parsed content for {title_slug}")
+                return test_cases
         
-        # Remove all example patterns from description
-        for pattern in example_patterns:
-            description = re.sub(pattern, '', description, flags=re.DOTALL | re.IGNORECASE)
+        # Fallback to exampleTestcases field if parsed content doesn't work
+        example_testcases = details.get('exampleTestcases', '')
+        if not example_testcases:
+            return []
         
-        # Remove constraints from description
-        for pattern in constraints_patterns:
-            description = re.sub(pattern, '', description, flags=re.DOTALL | re.IGNORECASE)
+        # Parse the test cases string
+        # LeetCode returns test cases as a newline-separated string
+        # Format is usually: "input1\noutput1\ninput2\noutput2\n..."
+        test_cases = []
+        lines = example_testcases.strip().split('\n')
         
-        # Clean up the description while preserving some formatting
-        description = self._clean_html_text(description)
+        for i in range(0, len(lines), 2):
+            if i + 1 < len(lines):
+                input_line = lines[i].strip()
+                output_line = lines[i + 1].strip()
+                
+                test_cases.append({
+                    'input': input_line,
+                    'expected': output_line,
+                    'expected_value': expected_value(output_line)
+                })
         
-        return {
-            'description': description,
-            'constraints': constraints,
-            'examples': examples
-        }
+        logger.debug(f"Found {len(test_cases)} official test cases from exampleTestcases for {title_slug}")
+        return test_cases
+    
+    def parse_problem_content(self, content: str) -> Dict:
+        """Parse LeetCode problem content to extract structured data with proper formatting"""
+        # Memoized by content hash - the same HTML is parsed for test cases and on materialization
+        return parsed_content_cache.parse(content)
     
     def extract_function_signature(self, content: str, title: str) -> str:
         """Extract function signature from LeetCode problem content"""
@@ -491,7 +819,8 @@ class LeetCodeService:
             
             test_cases.append({
                 'input': input_text,
-                'expected': output_text
+                'expected': output_text,
+                'expected_value': expected_value(output_text)
             })
         
         return test_cases
@@ -530,30 +859,7 @@ class LeetCodeService:
     
     def _format_test_output(self, output_text: str) -> str:
         """Format test output for comparison"""
-        if not output_text:
-            return ""
-        
-        # Clean the output text
-        output_text = output_text.strip()
-        
-        # If it's already quoted, return as is
-        if output_text.startswith('"') and output_text.endswith('"'):
-            return output_text
-        
-        # If it's a boolean, format it
-        if output_text.lower() in ['true', 'false']:
-            return output_text.capitalize()
-        
-        # If it's a number, return as is
-        if output_text.isdigit() or (output_text.startswith('-') and output_text[1:].isdigit()):
-            return output_text
-        
-        # If it's a list, return as is
-        if output_text.startswith('[') and output_text.endswith(']'):
-            return output_text
-        
-        # Default: wrap in quotes
-        return f'"{output_text}"'
+        return format_expected_output(output_text)
     
     def _generate_fallback_test_cases(self, title: str) -> List[Dict]:
         """Generate fallback test cases when no examples are available"""
@@ -582,73 +888,36 @@ class LeetCodeService:
     
     def _clean_html_text(self, text: str) -> str:
         """Clean HTML text while preserving important formatting"""
-        if not text:
-            return ""
-        
-        import html
-        
-        # Decode HTML entities first
-        text = html.unescape(text)
-        
-        # Preserve line breaks and paragraphs
-        text = re.sub(r'<br\s*/?>', '\n', text)
-        text = re.sub(r'<p[^>]*>', '\n', text)
-        text = re.sub(r'</p>', '\n', text)
-        
-        # Remove other HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        # Clean up whitespace but preserve structure
-        text = re.sub(r'\n\s*\n', '\n\n', text)  # Multiple newlines to double newlines
-        text = re.sub(r'[ \t]+', ' ', text)  # Multiple spaces to single space
-        text = text.strip()
-        
-        return text
+        return clean_html_text(text)
     
-    def get_random_problem(self, difficulty: str = None, topic: str = None, exclude_ids: List[int] = None) -> Optional[Dict]:
-        """Get a random problem matching criteria"""
-        print(f"Getting random problem with difficulty={difficulty}, topic={topic}, exclude_ids={exclude_ids}")
-        
-        problems = self.get_problems(difficulty=difficulty, topic=topic, limit=100)
-        print(f"Found {len(problems)} problems from LeetCode API")
-        
-        if not problems:
-            print("No problems found, trying without topic filter...")
-            # Try without topic filter if no problems found
-            problems = self.get_problems(difficulty=difficulty, topic=None, limit=100)
-            print(f"Found {len(problems)} problems without topic filter")
-        
-        if not problems:
-            print("Still no problems found, trying with any difficulty...")
-            # Try with any difficulty if still no problems
-            problems = self.get_problems(difficulty=None, topic=topic, limit=100)
-            print(f"Found {len(problems)} problems with any difficulty")
-        
-        if not problems:
-            print("No problems found at all, returning None")
-            return None
-        
-        # Filter out excluded problems
-        if exclude_ids:
-            original_count = len(problems)
-            problems = [p for p in problems if p.get('frontendQuestionId') not in exclude_ids]
-            print(f"Filtered out excluded problems: {original_count} -> {len(problems)}")
-        
-        if not problems:
-            print("All problems were excluded, returning None")
-            return None
-        
-        # Return a random problem
-        import random
-        selected = random.choice(problems)
-        print(f"Selected problem: {selected.get('title', 'Unknown')} (ID: {selected.get('frontendQuestionId', 'Unknown')})")
-        return selected
+    def get_random_problem(self, difficulty: str = None, topic: str = None, exclude_ids: Iterable = None) -> Optional[Dict]:
+        """Get a random problem matching criteria that is not in exclude_ids"""
+        exclude = exclude_ids if isinstance(exclude_ids, IdBitset) else IdBitset(exclude_ids or [])
+        logger.debug(f"Getting random problem with difficulty={difficulty}, topic={topic}, excluding {len(exclude)} problems")
+        
+        # Relax the topic, then the difficulty, if a pool has nothing left
+        attempts = []
+        for attempt in [(difficulty, topic), (difficulty, None), (None, topic)]:
+            if attempt not in attempts:
+                attempts.append(attempt)
+        
+        for pool_difficulty, pool_topic in attempts:
+            selected = self.pools.sample(pool_difficulty, pool_topic, exclude)
+            if selected:
+                logger.info(f"Selected problem: {selected.get('title', 'Unknown')} (ID: {selected.get('frontendQuestionId', 'Unknown')})")
+                return selected
+            logger.info(f"No unseen problems for difficulty={pool_difficulty}, topic={pool_topic}")
+        
+        logger.warning("No problems found at all, returning None")
+        return None
     
     def search_problem_by_name(self, problem_name: str) -> Optional[Dict]:
         """Search for a problem by name (case-insensitive partial match)"""
         try:
             # Get all problems to search through
             problems = self.get_problems(limit=1000)  # Get more problems for search
+            if not problems and not self.available():
+                problems = self.mirrored_problems()
             
             if not problems:
                 return None
@@ -659,7 +928,7 @@ class LeetCodeService:
             # Search for exact matches first
             for problem in problems:
                 if problem['title'].lower() == search_term:
-                    print(f"Found exact match for '{problem_name}': {problem['title']}")
+                    logger.debug(f"Found exact match for '{problem_name}': {problem['title']}")
                     return problem
             
             # Search for partial matches
@@ -671,21 +940,21 @@ class LeetCodeService:
             
             if matches:
                 # Return the first match (most relevant)
-                print(f"Found {len(matches)} partial matches for '{problem_name}': {matches[0]['title']}")
+                logger.debug(f"Found {len(matches)} partial matches for '{problem_name}': {matches[0]['title']}")
                 return matches[0]
             
             # If no matches found, try searching by title slug
             title_slug = search_term.replace(' ', '-').replace('_', '-')
             for problem in problems:
                 if problem['titleSlug'].lower() == title_slug:
-                    print(f"Found match by title slug for '{problem_name}': {problem['title']}")
+                    logger.debug(f"Found match by title slug for '{problem_name}': {problem['title']}")
                     return problem
             
-            print(f"No matches found for '{problem_name}'")
+            logger.info(f"No matches found for '{problem_name}'")
             return None
             
         except Exception as e:
-            print(f"Error searching for problem by name: {e}")
+            logger.warning(f"Error searching for problem by name: {e}")
             return None
 
 
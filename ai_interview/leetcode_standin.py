@@ -0,0 +1,161 @@
+"""
+Offline stand-in for the LeetCode GraphQL endpoint.
+
+LeetCodeStandIn answers the questionList and question queries that
+LeetCodeService sends, replaying recorded responses from a fixtures
+directory:
+
+    question_list.json          questionList entries (PROBLEMS_QUERY fields)
+    questions/<titleSlug>.json  question objects (PROBLEM_DETAILS_QUERY fields)
+
+Latency and errors can be injected so the selection path can be
+benchmarked and load-tested reproducibly. Run it with the leetcode_standin
+management command and point LEETCODE_GRAPHQL_URL at it, or use
+start_standin in-process. record_fixtures captures fixtures from the live
+endpoint (record_leetcode_fixtures command).
+"""
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'testdata' / 'leetcode'
+
+
+class LeetCodeStandIn:
+    """Answers LeetCode GraphQL payloads from recorded fixtures."""
+
+    def __init__(self, fixtures_dir: Path = FIXTURES_DIR, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, seed: int = None):
+        self.fixtures_dir = Path(fixtures_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        with open(self.fixtures_dir / 'question_list.json') as f:
+            self.questions: List[Dict] = json.load(f)
+        self.requests = 0
+
+    def question(self, title_slug: str) -> Optional[Dict]:
+        try:
+            with open(self.fixtures_dir / 'questions' / f'{title_slug}.json') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def question_list(self, variables: Dict) -> Dict:
+        filters = variables.get('filters') or {}
+        questions = self.questions
+        if filters.get('difficulty'):
+            questions = [q for q in questions if q['difficulty'].upper() == filters['difficulty']]
+        for tag in filters.get('tags') or []:
+            questions = [q for q in questions if tag in {t['slug'] for t in q.get('topicTags') or []}]
+        skip = variables.get('skip') or 0
+        limit = variables.get('limit') or len(questions)
+        return {'total': len(questions), 'questions': questions[skip:skip + limit]}
+
+    def _draw(self) -> Tuple[float, bool]:
+        with self._random_lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+        return delay, fail
+
+    def respond(self, payload: Dict) -> Tuple[int, Dict]:
+        """(HTTP status, JSON body) for a GraphQL request payload, after the injected latency."""
+        delay, fail = self._draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            return self.error_status, {'errors': [{'message': 'Injected error'}]}
+
+        query = payload.get('query') or ''
+        variables = payload.get('variables') or {}
+        if 'questionList(' in query:
+            return 200, {'data': {'problemsetQuestionList': self.question_list(variables)}}
+        if 'question(' in query:
+            return 200, {'data': {'question': self.question(variables.get('titleSlug', ''))}}
+        return 400, {'errors': [{'message': 'Query not supported by the stand-in'}]}
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    standin: LeetCodeStandIn = None
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            status, body = 400, {'errors': [{'message': 'Invalid JSON'}]}
+        else:
+            status, body = self.standin.respond(payload)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(standin: LeetCodeStandIn, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    handler = type('BoundStandInRequestHandler', (StandInRequestHandler,), {'standin': standin})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def graphql_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/graphql"
+
+
+def start_standin(standin: LeetCodeStandIn = None, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Serve a stand-in on a daemon thread; stop it with server.shutdown()."""
+    server = make_server(standin or LeetCodeStandIn(), host, port)
+    threading.Thread(target=server.serve_forever, name='leetcode-standin', daemon=True).start()
+    return server
+
+
+def record_fixtures(service, fixtures_dir: Path, title_slugs: Iterable[str], catalog_page_size: int = 100,
+                    catalog_pages: int = None) -> Dict:
+    """
+    Record fixtures from the endpoint ``service`` points at.
+
+    Writes question_list.json from the first ``catalog_pages`` questionList
+    pages (all of them if None) and a questions/<slug>.json file per slug.
+    Returns counts of what was written.
+    """
+    fixtures_dir = Path(fixtures_dir)
+    (fixtures_dir / 'questions').mkdir(parents=True, exist_ok=True)
+
+    questions, skip = [], 0
+    while catalog_pages is None or skip < catalog_pages * catalog_page_size:
+        page = service.fetch_problem_page(skip, catalog_page_size)
+        questions.extend(page['questions'])
+        skip += catalog_page_size
+        if skip >= page['total']:
+            break
+    with open(fixtures_dir / 'question_list.json', 'w') as f:
+        json.dump(questions, f, indent=2)
+
+    recorded = 0
+    for title_slug in title_slugs:
+        details = service.get_problem_details(title_slug, use_cache=False)
+        if not details:
+            logger.warning(f"Could not record {title_slug}")
+            continue
+        with open(fixtures_dir / 'questions' / f'{title_slug}.json', 'w') as f:
+            json.dump(details, f, indent=2)
+        recorded += 1
+    return {'questions': len(questions), 'details': recorded}
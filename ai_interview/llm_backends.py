@@ -0,0 +1,149 @@
+"""
+LLM backends for AIInterviewAgent.
+
+The agent only needs a prompt in and text out, so completions go through a
+small backend interface: complete() for a whole response and stream() for
+its chunks as they are generated. LLM_BACKEND names the class to use and
+LLM_BACKEND_OPTIONS its keyword arguments:
+
+    KronosBackend   the Kronos Labs API (default)
+    StandInBackend  deterministic local completions with configurable
+                    time-to-first-token, tokens/second and failure rate,
+                    for benchmarks, load tests and tests
+"""
+import abc
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import Dict, Iterator, List
+from django.conf import settings
+from django.utils.module_loading import import_string
+from kronoslabs import KronosLabs
+
+
+class LLMBackendError(Exception):
+    """A completion failed (the stand-in raises this for injected failures)."""
+
+
+class LLMBackend(abc.ABC):
+    """Interface of an LLM backend; subclasses implement stream()."""
+
+    def complete(self, prompt: str, temperature: float = 0.5) -> str:
+        """The full completion for a prompt."""
+        return ''.join(self.stream(prompt, temperature))
+
+    @abc.abstractmethod
+    def stream(self, prompt: str, temperature: float = 0.5) -> Iterator[str]:
+        """The completion for a prompt, chunk by chunk."""
+
+
+class KronosBackend(LLMBackend):
+    """Kronos Labs chat completions."""
+
+    def __init__(self, model: str = 'hermes', api_key: str = None):
+        self.model = model
+        self.client = KronosLabs(api_key=api_key or settings.KRONOS_API_KEY)
+
+    def complete(self, prompt: str, temperature: float = 0.5) -> str:
+        response = self.client.chat.completions.create(
+            prompt=prompt,
+            model=self.model,
+            temperature=temperature,
+            is_stream=False
+        )
+        return response.choices[0].message.content
+
+    def stream(self, prompt: str, temperature: float = 0.5) -> Iterator[str]:
+        chunks = self.client.chat.completions.create(
+            prompt=prompt,
+            model=self.model,
+            temperature=temperature,
+            is_stream=True
+        )
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+# Stand-in responses by prompt kind; {problem} is filled from the prompt
+STANDIN_TEMPLATES: Dict[str, List[str]] = {
+    'review': [
+        "Your solution to {problem} looks correct for the examples. "
+        "Its time complexity is linear with linear extra space. Consider the empty input edge case.",
+        "The approach to {problem} works, but the nested loop makes it quadratic. "
+        "A hash map would bring it down to a single pass.",
+    ],
+    'feedback': [
+        "**Overall Assessment**\n\nYou worked through {problem} methodically and explained your reasoning clearly. "
+        "Focus next on testing edge cases before submitting.\n\nPerformance rating: 7/10",
+    ],
+    'guidance': [
+        "Good start on {problem}. What happens to your approach when the input is empty?",
+        "Think about which data structure gives constant-time lookups here. How would that change your loop?",
+        "You're close. Can you walk me through your solution on the second example?",
+    ],
+    'default': [
+        "Great, let's keep going. Tell me the difficulty and topic you'd like to practice.",
+    ],
+}
+
+_PROBLEM_RE = re.compile(r'^(?:Problem|Code review for): (.+)$', re.MULTILINE)
+_TOKEN_RE = re.compile(r'\S+\s*|\s+')
+
+
+class StandInBackend(LLMBackend):
+    """
+    Deterministic local completions.
+
+    The response is chosen from STANDIN_TEMPLATES by the kind of prompt and
+    a hash of its text, so a prompt always gets the same completion.
+    Streaming waits ``time_to_first_token`` seconds, then yields one
+    whitespace-delimited token every 1/``tokens_per_second`` seconds (0 for
+    no delay). A ``failure_rate`` fraction of calls raise LLMBackendError
+    before the first token; ``seed`` makes those failures reproducible.
+    """
+
+    def __init__(self, time_to_first_token: float = 0.0, tokens_per_second: float = 0.0,
+                 failure_rate: float = 0.0, seed: int = None, templates: Dict[str, List[str]] = None):
+        self.time_to_first_token = time_to_first_token
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.templates = templates or STANDIN_TEMPLATES
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _kind(self, prompt: str) -> str:
+        if 'Code review for' in prompt:
+            return 'review'
+        if 'interview feedback' in prompt:
+            return 'feedback'
+        if 'Problem:' in prompt:
+            return 'guidance'
+        return 'default'
+
+    def response_for(self, prompt: str) -> str:
+        templates = self.templates.get(self._kind(prompt)) or self.templates['default']
+        index = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest(), 16) % len(templates)
+        problem = _PROBLEM_RE.search(prompt)
+        return templates[index].format(problem=problem.group(1).strip() if problem else 'this problem')
+
+    def stream(self, prompt: str, temperature: float = 0.5) -> Iterator[str]:
+        with self._random_lock:
+            fail = self._random.random() < self.failure_rate
+        if self.time_to_first_token:
+            time.sleep(self.time_to_first_token)
+        if fail:
+            raise LLMBackendError("Injected stand-in failure")
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0
+        for index, token in enumerate(_TOKEN_RE.findall(self.response_for(prompt))):
+            if delay and index:
+                time.sleep(delay)
+            yield token
+
+
+def llm_backend() -> LLMBackend:
+    """The backend configured by LLM_BACKEND and LLM_BACKEND_OPTIONS."""
+    backend_class = import_string(getattr(settings, 'LLM_BACKEND', 'ai_interview.llm_backends.KronosBackend'))
+    return backend_class(**getattr(settings, 'LLM_BACKEND_OPTIONS', {}))
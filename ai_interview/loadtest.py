@@ -0,0 +1,233 @@
+"""
+WebSocket load test for the realtime interview path.
+
+Each simulated candidate drives one session through ws/interview/<id>/ the
+way the interview page does: connect and wait for the greeting, send
+preferences and wait for the problem, chat, submit code, end the
+interview. The time from each frame sent to the AI reply it triggers is
+recorded per step, so the loadtest_interviews command can report
+p50/p95/p99 latency, throughput and errors.
+
+Candidates talk either to an in-process InterviewConsumer (through
+channels' WebsocketCommunicator, measuring one worker) or to a running
+server over the network (needs the optional websockets package).
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+# (message, ...) choices for each step of the script
+PREFERENCE_MESSAGES = [
+    "easy arrays",
+    "Let's do an easy string problem",
+    "medium array please",
+    "easy dynamic programming",
+    "I'd like a medium graph problem",
+]
+CHAT_MESSAGES = [
+    "I think I should use a hash table here, then iterate once",
+    "What is the time complexity of my approach with two pointers?",
+    "Could you explain the constraints again?",
+    "Should I handle the empty input separately?",
+]
+SUBMITTED_CODE = (
+    "class Solution:\n    def solve(self, nums):\n        seen = {}\n"
+    "        for index, value in enumerate(nums):\n            seen[value] = index\n        return seen\n"
+)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 < fraction <= 1)."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class LoadTestStats:
+    """Reply latencies per step and error counts collected across candidates."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.completed = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def record(self, step: str, seconds: float) -> None:
+        self.latencies[step].append(seconds)
+
+    def error(self, kind: str) -> None:
+        self.errors[kind] += 1
+
+    @property
+    def replies(self) -> int:
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def summary(self) -> Dict:
+        steps = dict(self.latencies)
+        steps['all'] = [value for values in self.latencies.values() for value in values]
+        return {
+            'steps': {
+                step: {
+                    'count': len(values),
+                    'p50': percentile(values, 0.50),
+                    'p95': percentile(values, 0.95),
+                    'p99': percentile(values, 0.99),
+                }
+                for step, values in steps.items() if values
+            },
+            'replies_per_second': self.replies / self.elapsed if self.elapsed else 0.0,
+            'completed': self.completed,
+            'errors': dict(self.errors),
+            'elapsed': self.elapsed,
+        }
+
+
+class InProcessConnection:
+    """A socket to an InterviewConsumer running in this process."""
+
+    def __init__(self, application, session_id: int):
+        from channels.testing import WebsocketCommunicator
+        self.communicator = WebsocketCommunicator(application, f"/ws/interview/{session_id}/")
+
+    async def connect(self) -> bool:
+        connected, _ = await self.communicator.connect()
+        return connected
+
+    async def send(self, data: Dict) -> None:
+        await self.communicator.send_json_to(data)
+
+    async def receive(self, timeout: float) -> Optional[Dict]:
+        """The next frame, or None once the server has closed the socket."""
+        message = await self.communicator.receive_output(timeout)
+        if message['type'] == 'websocket.close':
+            return None
+        return json.loads(message['text'])
+
+    async def close(self) -> None:
+        await self.communicator.disconnect()
+
+
+class NetworkConnection:
+    """A socket to a running server (e.g. daphne), through the websockets package."""
+
+    def __init__(self, base_url: str, session_id: int):
+        self.url = f"{base_url.rstrip('/')}/ws/interview/{session_id}/"
+        self.socket = None
+
+    async def connect(self) -> bool:
+        import websockets
+        self.socket = await websockets.connect(self.url)
+        return True
+
+    async def send(self, data: Dict) -> None:
+        await self.socket.send(json.dumps(data))
+
+    async def receive(self, timeout: float) -> Optional[Dict]:
+        import websockets
+        try:
+            return json.loads(await asyncio.wait_for(self.socket.recv(), timeout))
+        except websockets.ConnectionClosed:
+            return None
+
+    async def close(self) -> None:
+        if self.socket is not None:
+            await self.socket.close()
+
+
+class Candidate:
+    """One simulated candidate working through a session."""
+
+    def __init__(self, connection, stats: LoadTestStats, rng: random.Random, chat_turns: int = 3,
+                 think_time: float = 0.0, timeout: float = 30.0):
+        self.connection = connection
+        self.stats = stats
+        self.rng = rng
+        self.chat_turns = chat_turns
+        self.think_time = think_time
+        self.timeout = timeout
+        self.message_count = 0
+
+    async def ai_reply(self, step: str, started: float) -> Optional[str]:
+        """Wait for the next AI message, recording its latency against ``step``."""
+        while True:
+            frame = await self.connection.receive(self.timeout)
+            if frame is None:
+                self.stats.error(f'{step}: closed')
+                return None
+            if frame.get('type') == 'error':
+                self.stats.error(f"{step}: {frame.get('message', '')[:60]}")
+                return None
+            if frame.get('type') == 'chat_message' and frame.get('sender') == 'ai':
+                self.stats.record(step, time.monotonic() - started)
+                return frame['message']
+
+    async def say(self, step: str, data: Dict) -> Optional[str]:
+        if self.think_time:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.think_time))
+        started = time.monotonic()
+        await self.connection.send(data)
+        return await self.ai_reply(step, started)
+
+    async def chat(self, step: str, message: str) -> Optional[str]:
+        self.message_count += 1
+        return await self.say(step, {'type': 'chat_message', 'message': message, 'client_msg_id': f'load-{self.message_count}'})
+
+    async def run(self) -> None:
+        try:
+            started = time.monotonic()
+            if not await self.connection.connect():
+                self.stats.error('connect: refused')
+                return
+            if await self.ai_reply('greeting', started) is None:
+                return
+
+            reply = await self.chat('select', self.rng.choice(PREFERENCE_MESSAGES))
+            if reply is None:
+                return
+            if "couldn't find" in reply:
+                self.stats.error('select: no problem')
+
+            for _ in range(self.chat_turns):
+                if await self.chat('chat', self.rng.choice(CHAT_MESSAGES)) is None:
+                    return
+
+            submission = {'type': 'code_submission', 'code': SUBMITTED_CODE, 'language': 'python',
+                          'testResults': {'passed': 2, 'total': 3}}
+            if await self.say('code', submission) is None:
+                return
+            if await self.say('end', {'type': 'end_interview'}) is None:
+                return
+            self.stats.completed += 1
+        except asyncio.TimeoutError:
+            self.stats.error('timeout')
+        except Exception as e:
+            self.stats.error(f'{type(e).__name__}: {str(e)[:60]}')
+        finally:
+            try:
+                await self.connection.close()
+            except Exception:
+                pass
+
+
+async def run_load(connections: List, stats: LoadTestStats, seed: int = None, ramp_up: float = 0.0,
+                   **candidate_options) -> LoadTestStats:
+    """Run one candidate per connection concurrently, starting them evenly over ``ramp_up`` seconds."""
+    rng = random.Random(seed)
+
+    async def start(index, connection):
+        if ramp_up:
+            await asyncio.sleep(ramp_up * index / len(connections))
+        await Candidate(connection, stats, random.Random(rng.random()), **candidate_options).run()
+
+    stats.started_at = time.monotonic()
+    await asyncio.gather(*(start(index, connection) for index, connection in enumerate(connections)))
+    stats.finished_at = time.monotonic()
+    return stats
@@ -0,0 +1,81 @@
+import timeit
+from django.core.management.base import BaseCommand, CommandError
+from ai_interview.intent_matcher import match_intent
+from ai_interview.output_normalizer import clean_expected_output, format_expected_output
+from ai_interview.problem_parser import parse_problem_content, parse_problem_content_regex
+from ai_interview.testing import (
+    MATCHER_MESSAGES, legacy_clean_output, legacy_format_output, legacy_match_intent, load_example_outputs,
+    load_problem_contents, regex_disagreements
+)
+from ai_interview.topics import canonical_topic
+
+
+class Command(BaseCommand):
+    help = 'Run micro-benchmarks for hot code paths'
+
+    targets = ['matcher', 'parser', 'outputs']
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=self.targets, help='What to benchmark')
+        parser.add_argument('--number', type=int, default=2000, help='Iterations per measurement')
+        parser.add_argument('--repeat', type=int, default=5, help='Measurements to take (best is reported)')
+
+    def handle(self, *args, **options):
+        getattr(self, f"benchmark_{options['target']}")(options['number'], options['repeat'])
+
+    def report(self, label, baseline, candidate, number, items):
+        """Print best-of-repeat timings for a baseline and a candidate implementation."""
+        baseline_best = min(baseline) / (number * items)
+        candidate_best = min(candidate) / (number * items)
+        self.stdout.write(label)
+        self.stdout.write(f"  current:  {baseline_best * 1e6:8.2f} us/item")
+        self.stdout.write(f"  new:      {candidate_best * 1e6:8.2f} us/item")
+        self.stdout.write(self.style.SUCCESS(f"  speedup:  {baseline_best / candidate_best:8.2f}x"))
+
+    def benchmark_matcher(self, number, repeat):
+        for message in MATCHER_MESSAGES:
+            expected, actual = legacy_match_intent(message), match_intent(message)
+            # The legacy matcher predates the canonical topic slugs
+            expected['topics'] = [canonical_topic(topic) for topic in expected['topics']]
+            if expected != actual:
+                raise CommandError(f"Matcher mismatch for {message!r}: {expected} != {actual}")
+
+        def run(func):
+            return lambda: [func(message) for message in MATCHER_MESSAGES]
+
+        baseline = timeit.repeat(run(legacy_match_intent), number=number, repeat=repeat)
+        candidate = timeit.repeat(run(match_intent), number=number, repeat=repeat)
+        self.report('Intent matcher', baseline, candidate, number, len(MATCHER_MESSAGES))
+
+    def benchmark_parser(self, number, repeat):
+        contents = load_problem_contents()
+        for slug, content in contents.items():
+            problems = regex_disagreements(content)
+            if problems:
+                raise CommandError(f"Parser mismatch for {slug}: " + '; '.join(problems))
+
+        def run(func):
+            return lambda: [func(content) for content in contents.values()]
+
+        baseline = timeit.repeat(run(parse_problem_content_regex), number=number, repeat=repeat)
+        candidate = timeit.repeat(run(parse_problem_content), number=number, repeat=repeat)
+        self.report('Problem content parser', baseline, candidate, number, len(contents))
+        size = sum(len(content) for content in contents.values())
+        self.stdout.write(f"  throughput: {size * number / min(candidate) / 1e6:6.2f} MB/s "
+                          f"(regex {size * number / min(baseline) / 1e6:.2f} MB/s)")
+
+    def benchmark_outputs(self, number, repeat):
+        outputs = load_example_outputs()
+        for baseline_func, candidate_func in [(legacy_clean_output, clean_expected_output),
+                                              (legacy_format_output, format_expected_output)]:
+            for output in outputs:
+                expected, actual = baseline_func(output), candidate_func(output)
+                if expected != actual:
+                    raise CommandError(f"{candidate_func.__name__} mismatch for {output!r}: {expected!r} != {actual!r}")
+
+        def run(func):
+            return lambda: [func(output) for output in outputs]
+
+        baseline = timeit.repeat(run(legacy_clean_output), number=number, repeat=repeat)
+        candidate = timeit.repeat(run(clean_expected_output), number=number, repeat=repeat)
+        self.report('Example output cleaning', baseline, candidate, number, len(outputs))
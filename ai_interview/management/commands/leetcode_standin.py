@@ -0,0 +1,40 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from ai_interview.leetcode_standin import FIXTURES_DIR, LeetCodeStandIn, graphql_url, make_server
+
+
+class Command(BaseCommand):
+    help = 'Serve recorded LeetCode GraphQL responses locally, with optional latency and error injection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR,
+                            help='Directory with question_list.json and questions/<slug>.json')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many random extra seconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with an error')
+        parser.add_argument('--error-status', type=int, default=503, help='HTTP status of injected errors')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible latency and errors')
+
+    def handle(self, *args, **options):
+        standin = LeetCodeStandIn(
+            fixtures_dir=options['fixtures'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            error_status=options['error_status'],
+            seed=options['seed'],
+        )
+        server = make_server(standin, options['host'], options['port'])
+        self.stdout.write(
+            f"Serving {len(standin.questions)} questions from {options['fixtures']}\n"
+            f"Set LEETCODE_GRAPHQL_URL={graphql_url(server)} to use it (Ctrl-C to stop)"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        self.stdout.write(f"Answered {standin.requests} requests")
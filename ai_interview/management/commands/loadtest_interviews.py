@@ -0,0 +1,129 @@
+import asyncio
+import json
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from ai_interview.leetcode_service import leetcode_service
+from ai_interview.leetcode_standin import LeetCodeStandIn, graphql_url, start_standin
+from ai_interview.loadtest import InProcessConnection, LoadTestStats, NetworkConnection, run_load
+from ai_interview.message_writer import chat_message_writer
+from ai_interview.models import InterviewSession
+from ai_interview.session_prefetch import start_session_prefetch
+
+USERNAME_PREFIX = 'loadtest-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive concurrent simulated candidates through ws/interview/<id>/ and report reply latency. '
+        'By default the consumer runs in this process against the LLM and LeetCode stand-ins; '
+        'with --url a running server is tested instead (configure its stand-ins through '
+        'LLM_BACKEND and LEETCODE_GRAPHQL_URL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidates', type=int, default=20, help='Concurrent simulated candidates')
+        parser.add_argument('--chat-turns', type=int, default=3, help='Chat messages per candidate after selection')
+        parser.add_argument('--ramp-up', type=float, default=0.0, help='Seconds over which candidates connect')
+        parser.add_argument('--think-time', type=float, default=0.0, help='Mean seconds between a reply and the next message')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds to wait for each reply')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--url', default=None, help='ws://host:port of a running server instead of in-process')
+        parser.add_argument('--llm-ttft', type=float, default=0.3, help='Stand-in LLM time to first token (s)')
+        parser.add_argument('--llm-tps', type=float, default=50.0, help='Stand-in LLM tokens per second')
+        parser.add_argument('--llm-failure-rate', type=float, default=0.0)
+        parser.add_argument('--leetcode-latency', type=float, default=0.1, help='Stand-in LeetCode latency (s)')
+        parser.add_argument('--leetcode-error-rate', type=float, default=0.0)
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+        parser.add_argument('--keep', action='store_true', help='Keep the load-test users and sessions afterwards')
+
+    def handle(self, *args, **options):
+        sessions = self.create_sessions(options['candidates'])
+        user_ids = [session.user_id for session in sessions]
+        try:
+            if options['url']:
+                stats = self.run(options, [NetworkConnection(options['url'], session.id) for session in sessions])
+            else:
+                stats = self.run_in_process(options, sessions)
+        finally:
+            chat_message_writer.flush()
+            if not options['keep']:
+                User.objects.filter(id__in=user_ids).delete()
+        self.report(stats, options)
+
+    def create_sessions(self, count):
+        """A new user and session per candidate. Existing users are never reused, so cleanup only deletes this run's."""
+        usernames = [f'{USERNAME_PREFIX}{index}' for index in range(count)]
+        existing = sorted(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        if existing:
+            raise CommandError(
+                f"Load-test users already exist ({', '.join(existing[:5])}{', ...' if len(existing) > 5 else ''}); "
+                f"delete them before running again"
+            )
+        sessions = []
+        with transaction.atomic():
+            for username in usernames:
+                user = User.objects.create_user(username=username)
+                sessions.append(InterviewSession.objects.create(user=user, status='preparing'))
+        return sessions
+
+    def run(self, options, connections):
+        stats = LoadTestStats()
+        asyncio.run(run_load(
+            connections, stats, seed=options['seed'], ramp_up=options['ramp_up'],
+            chat_turns=options['chat_turns'], think_time=options['think_time'], timeout=options['timeout'],
+        ))
+        return stats
+
+    def run_in_process(self, options, sessions):
+        from channels.routing import URLRouter
+        from ai_interview.routing import websocket_urlpatterns
+
+        standin = LeetCodeStandIn(latency=options['leetcode_latency'], error_rate=options['leetcode_error_rate'],
+                                  seed=options['seed'])
+        server = start_standin(standin)
+        live_url = leetcode_service.GRAPHQL_URL
+        leetcode_service.GRAPHQL_URL = graphql_url(server)
+        leetcode_service.pools.clear()
+        llm_options = {
+            'time_to_first_token': options['llm_ttft'],
+            'tokens_per_second': options['llm_tps'],
+            'failure_rate': options['llm_failure_rate'],
+            'seed': options['seed'],
+        }
+        try:
+            with override_settings(
+                CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+                LLM_BACKEND='ai_interview.llm_backends.StandInBackend',
+                LLM_BACKEND_OPTIONS=llm_options,
+            ):
+                # What start_interview does for each new session
+                for session in sessions:
+                    start_session_prefetch(session)
+                application = URLRouter(websocket_urlpatterns)
+                stats = self.run(options, [InProcessConnection(application, session.id) for session in sessions])
+        finally:
+            leetcode_service.GRAPHQL_URL = live_url
+            leetcode_service.pools.clear()
+            server.shutdown()
+            server.server_close()
+        self.stdout.write(f"LeetCode stand-in answered {standin.requests} requests")
+        return stats
+
+    def report(self, stats, options):
+        summary = stats.summary()
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        self.stdout.write(f"{options['candidates']} candidates, {summary['completed']} completed "
+                          f"in {summary['elapsed']:.1f}s")
+        self.stdout.write(f"  {'step':<10}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for step, row in summary['steps'].items():
+            self.stdout.write(f"  {step:<10}{row['count']:>7}{row['p50'] * 1000:>10.0f}"
+                              f"{row['p95'] * 1000:>10.0f}{row['p99'] * 1000:>10.0f}")
+        self.stdout.write(self.style.SUCCESS(f"  throughput: {summary['replies_per_second']:.1f} replies/s"))
+        if summary['errors']:
+            self.stdout.write(self.style.ERROR(f"  errors: {sum(summary['errors'].values())}"))
+            for kind, count in sorted(summary['errors'].items()):
+                self.stdout.write(f"    {count:>5}  {kind}")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from ai_interview.problem_parser import PARSER_VERSION, parsed_content_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete stored problem content parses made by parser versions other than the current one. '
+        'Run after a PARSER_VERSION bump once every process runs the new version.'
+    )
+
+    def handle(self, *args, **options):
+        deleted = parsed_content_cache.prune()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} parses from parser versions other than {PARSER_VERSION}'
+        ))
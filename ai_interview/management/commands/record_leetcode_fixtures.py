@@ -0,0 +1,30 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from ai_interview.leetcode_service import leetcode_service
+from ai_interview.leetcode_standin import FIXTURES_DIR, record_fixtures
+
+
+class Command(BaseCommand):
+    help = 'Record questionList and question responses for the LeetCode stand-in'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*',
+                            help='Questions to record details for (default: those already in the fixtures)')
+        parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR, help='Directory to write to')
+        parser.add_argument('--page-size', type=int, default=100, help='Questions per questionList request')
+        parser.add_argument('--pages', type=int, default=None,
+                            help='questionList pages to record (default: the whole catalog)')
+
+    def handle(self, *args, **options):
+        slugs = options['slugs'] or sorted(path.stem for path in (options['fixtures'] / 'questions').glob('*.json'))
+        try:
+            recorded = record_fixtures(
+                leetcode_service, options['fixtures'], slugs,
+                catalog_page_size=options['page_size'], catalog_pages=options['pages'],
+            )
+        except Exception as e:
+            raise CommandError(f"Recording failed: {e}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Recorded {recorded['questions']} questionList entries and {recorded['details']} of {len(slugs)} questions "
+            f"from {leetcode_service.GRAPHQL_URL} into {options['fixtures']}"
+        ))
@@ -0,0 +1,82 @@
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ai_interview.catalog import (
+    clear_checkpoint, load_checkpoint, mirror_catalog, refresh_catalog, refresh_problem_content, save_checkpoint,
+)
+from ai_interview.leetcode_service import leetcode_service
+from ai_interview.models import LeetCodeQuestion
+
+
+class Command(BaseCommand):
+    help = 'Mirror the full LeetCode question catalog into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=settings.LEETCODE_CATALOG_PAGE_SIZE,
+                            help='Questions per questionList request')
+        parser.add_argument('--workers', type=int, default=settings.LEETCODE_CATALOG_WORKERS,
+                            help='Pages fetched concurrently')
+        parser.add_argument('--checkpoint', type=Path, default=settings.LEETCODE_CATALOG_CHECKPOINT,
+                            help='File where a partial fetch is saved so the next run resumes it')
+        parser.add_argument('--restart', action='store_true', help='Ignore any saved checkpoint')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only write questions that are new or changed since the last sync')
+        parser.add_argument('--skip-content', action='store_true',
+                            help='With --incremental, do not re-check the content of stored problems')
+
+    def handle(self, *args, **options):
+        if options['incremental']:
+            return self.handle_incremental(options)
+
+        checkpoint = options['checkpoint']
+        resume = None if options['restart'] else load_checkpoint(checkpoint)
+        if resume and resume.page_size == options['page_size']:
+            self.stdout.write(f"Resuming: {len(resume.pages)} pages already fetched")
+
+        started = time.monotonic()
+        fetch = leetcode_service.fetch_catalog(
+            page_size=options['page_size'],
+            workers=options['workers'],
+            resume=resume,
+            on_page=lambda fetch, skip: save_checkpoint(checkpoint, fetch),
+        )
+        elapsed = time.monotonic() - started
+
+        if not fetch.complete:
+            for skip, error in sorted(fetch.failed.items()):
+                self.stderr.write(f"  page at skip={skip}: {error}")
+            raise CommandError(
+                f"Fetched {len(fetch.pages)} pages in {elapsed:.1f}s but {len(fetch.missing_skips())} are missing; "
+                f"run again to resume from {checkpoint}"
+            )
+
+        count = mirror_catalog(fetch.questions())
+        clear_checkpoint(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f"Mirrored {count} questions ({len(fetch.pages)} pages) in {elapsed:.1f}s"
+        ))
+
+    def handle_incremental(self, options):
+        if not LeetCodeQuestion.objects.exists():
+            raise CommandError("The catalog has not been mirrored yet; run without --incremental first")
+
+        started = time.monotonic()
+        summary = refresh_catalog(page_size=options['page_size'], workers=options['workers'])
+        if summary['failed']:
+            raise CommandError(f"{summary['failed']} pages could not be fetched; nothing was written")
+        self.stdout.write(self.style.SUCCESS(
+            f"Catalog: {summary['new']} new ({summary['beyond_known_max']} beyond the highest known ID), "
+            f"{summary['changed']} changed, {summary['problems_updated']} problems updated "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
+
+        if options['skip_content']:
+            return
+        started = time.monotonic()
+        summary = refresh_problem_content(workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Content: {summary['checked']} problems checked, {summary['rematerialized']} re-materialized, "
+            f"{summary['baselined']} hashes recorded, {summary['failed']} failed "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
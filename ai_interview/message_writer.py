@@ -0,0 +1,118 @@
+"""
+Write-behind persistence for chat messages.
+
+Consumers broadcast a message first and hand it to this buffer, which
+saves messages with bulk_create in small batches from a background thread.
+Messages are written in the order they were enqueued, so per-session
+ordering is preserved.
+"""
+import atexit
+import logging
+import threading
+from typing import List
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from .instrumentation import span
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+class ChatMessageWriter:
+    """Per-process write-behind buffer for ChatMessage rows"""
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None):
+        self.batch_size = batch_size or getattr(settings, 'CHAT_MESSAGE_BATCH_SIZE', 20)
+        self.flush_interval = flush_interval or getattr(settings, 'CHAT_MESSAGE_FLUSH_INTERVAL', 0.5)
+
+        self._buffer: List[ChatMessage] = []
+        self._buffer_lock = threading.Lock()
+        # Serialises flushes so batches reach the database in enqueue order
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        # Durable flush on interpreter shutdown
+        atexit.register(self.flush)
+
+    def enqueue(self, session_id: int, message_type: str, content: str) -> None:
+        """Queue a chat message for persistence."""
+        message = ChatMessage(
+            session_id=session_id, message_type=message_type, content=content, timestamp=timezone.now()
+        )
+
+        if not getattr(settings, 'CHAT_MESSAGE_WRITE_BEHIND', True):
+            message.save()
+            return
+
+        with self._buffer_lock:
+            self._buffer.append(message)
+            pending = len(self._buffer)
+
+        self._ensure_thread()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    async def aenqueue(self, session_id: int, message_type: str, content: str) -> None:
+        """enqueue() for async callers; without write-behind the save runs off the event loop."""
+        if getattr(settings, 'CHAT_MESSAGE_WRITE_BEHIND', True):
+            self.enqueue(session_id, message_type, content)
+        else:
+            await database_sync_to_async(self.enqueue)(session_id, message_type, content)
+
+    def pending_count(self) -> int:
+        """Number of messages waiting to be written."""
+        with self._buffer_lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """Write every queued message now. Returns the number of messages written."""
+        with self._flush_lock:
+            with self._buffer_lock:
+                pending, self._buffer = self._buffer, []
+
+            if not pending:
+                return 0
+
+            try:
+                with span('db.chat_messages', messages=len(pending)):
+                    ChatMessage.objects.bulk_create(pending)
+                return len(pending)
+            except Exception as e:
+                # Fall back to row-by-row so one bad row (e.g. a deleted
+                # session) does not take the rest of the batch with it
+                logger.error(f"Bulk chat message write failed, retrying individually: {e}")
+                written = 0
+                for message in pending:
+                    try:
+                        message.save()
+                        written += 1
+                    except Exception as row_error:
+                        logger.error(f"Dropping chat message for session {message.session_id}: {row_error}")
+                return written
+
+    def _ensure_thread(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._buffer_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='chat-message-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Chat message writer flush failed: {e}")
+            finally:
+                close_old_connections()
+
+
+# Global instance
+chat_message_writer = ChatMessageWriter()
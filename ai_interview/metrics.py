@@ -0,0 +1,184 @@
+"""
+Prometheus metrics for every worker process.
+
+Counters, gauges and span histograms live in process memory
+(ai_interview.instrumentation), so recording them costs a lock and an
+addition. Each worker's MetricsPublisher copies a snapshot of them into
+the Django cache every METRICS_PUBLISH_INTERVAL seconds; /metrics merges
+the snapshots of all live workers with its own, so a scrape sums the
+Daphne workers and reads only the cache, never the database. The cache is
+Redis (settings.CACHES); a process-local one fails a system check, since
+a scrape would only see the worker that answers it.
+
+A worker's counters restart from zero when it does, which Prometheus'
+rate() treats as a counter reset.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterable, List
+from django.conf import settings
+from django.core.cache import cache
+from .instrumentation import counters, gauges, histograms
+from .leetcode_service import leetcode_service
+from .message_writer import chat_message_writer
+from .problem_warmer import problem_warmer
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'ai_interview_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+WORKERS_KEY = 'metrics:workers'
+
+# Gauges read when a snapshot is taken rather than kept up to date
+GAUGE_CALLBACKS: Dict[str, Callable[[], float]] = {
+    'chat_message_writer_pending': lambda: chat_message_writer.pending_count(),
+    'problem_warmer_queue_depth': lambda: problem_warmer.queue_depth(),
+    'leetcode_requests_in_flight': lambda: leetcode_service._flights.in_flight() + leetcode_service._async_flights.in_flight(),
+    'leetcode_circuit_open': lambda: int(leetcode_service.breaker.is_open()),
+}
+
+
+def _worker_key(worker_id: str) -> str:
+    return f"metrics:worker:{worker_id}"
+
+
+def local_snapshot() -> Dict:
+    """This process's metrics as plain lists, ready to be cached."""
+    snapshot = {
+        'counters': [[name, list(labels), metric.value] for (name, labels), metric in counters().items()],
+        'gauges': [[name, list(labels), metric.value] for (name, labels), metric in gauges().items()],
+        'histograms': [],
+    }
+    for name, read in GAUGE_CALLBACKS.items():
+        try:
+            snapshot['gauges'].append([name, [], read()])
+        except Exception as e:
+            logger.warning(f"Metrics gauge {name} failed: {e}")
+    for (name, labels), metric in histograms().items():
+        data = metric.snapshot()
+        snapshot['histograms'].append([
+            name, list(labels), [bound for bound, _ in data['buckets']],
+            [count for _, count in data['buckets']], data['sum'], data['count'],
+        ])
+    return snapshot
+
+
+def merge_snapshots(snapshots: Iterable[Dict]) -> Dict:
+    """Sum snapshots from several workers, metric by metric."""
+    merged = {'counters': {}, 'gauges': {}, 'histograms': {}, 'workers': 0}
+    for snapshot in snapshots:
+        merged['workers'] += 1
+        for kind in ('counters', 'gauges'):
+            for name, labels, value in snapshot[kind]:
+                key = (name, tuple(map(tuple, labels)))
+                merged[kind][key] = merged[kind].get(key, 0) + value
+        for name, labels, bounds, cumulative, total, count in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            existing = merged['histograms'].get(key)
+            if existing is None:
+                merged['histograms'][key] = [list(bounds), list(cumulative), total, count]
+            else:
+                existing[1] = [a + b for a, b in zip(existing[1], cumulative)]
+                existing[2] += total
+                existing[3] += count
+    return merged
+
+
+def _metric_name(name: str) -> str:
+    return PREFIX + name.replace('.', '_').replace('-', '_')
+
+
+def _label_text(labels, extra: str = '') -> str:
+    pairs = [
+        '{}="{}"'.format(label, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for label, value in labels
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _bound_text(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def render(merged: Dict) -> str:
+    """The Prometheus text exposition of merged snapshots."""
+    lines: List[str] = []
+
+    def family(kind: str, metrics: Dict, suffix: str = '') -> None:
+        by_name: Dict[str, List] = {}
+        for (name, labels), value in metrics.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for name in sorted(by_name):
+            metric_name = _metric_name(name) + suffix
+            lines.append(f"# TYPE {metric_name} {kind}")
+            for labels, value in sorted(by_name[name]):
+                if kind == 'histogram':
+                    bounds, cumulative, total, count = value
+                    for bound, running in zip(bounds, cumulative):
+                        le = f'le="{_bound_text(bound)}"'
+                        lines.append(f"{metric_name}_bucket{_label_text(labels, le)} {running}")
+                    lines.append(f"{metric_name}_sum{_label_text(labels)} {total}")
+                    lines.append(f"{metric_name}_count{_label_text(labels)} {count}")
+                else:
+                    lines.append(f"{metric_name}{_label_text(labels)} {value}")
+
+    family('counter', merged['counters'])
+    family('gauge', merged['gauges'])
+    family('histogram', merged['histograms'], suffix='_seconds')
+    lines.append(f"# TYPE {PREFIX}metrics_workers gauge")
+    lines.append(f"{PREFIX}metrics_workers {merged['workers']}")
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsPublisher:
+    """Copies this worker's snapshot into the shared cache on a daemon thread."""
+
+    def __init__(self, interval: float = None):
+        self.interval = interval if interval is not None else getattr(settings, 'METRICS_PUBLISH_INTERVAL', 15)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start publishing (idempotent); a no-op when the interval is 0."""
+        if not self.interval or (self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='metrics-publisher', daemon=True)
+            self._thread.start()
+
+    def publish(self) -> None:
+        cache.set(_worker_key(self.worker_id), local_snapshot(), timeout=self.interval * 3)
+        workers = cache.get(WORKERS_KEY) or []
+        if self.worker_id not in workers:
+            cache.set(WORKERS_KEY, workers + [self.worker_id], timeout=None)
+
+    def collect(self) -> Dict:
+        """This worker's live metrics merged with the last published snapshot of every other worker."""
+        workers = cache.get(WORKERS_KEY) or []
+        others = [worker for worker in workers if worker != self.worker_id]
+        published = cache.get_many([_worker_key(worker) for worker in others])
+        if len(published) < len(others):
+            # Workers whose snapshots expired have stopped; forget them
+            live = [worker for worker in workers if worker == self.worker_id or _worker_key(worker) in published]
+            cache.set(WORKERS_KEY, live, timeout=None)
+        return merge_snapshots([local_snapshot(), *published.values()])
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.publish()
+            except Exception as e:
+                logger.warning(f"Publishing metrics failed: {e}")
+            time.sleep(self.interval)
+
+
+# Global instance
+metrics_publisher = MetricsPublisher()
@@ -0,0 +1,49 @@
+"""
+Development middleware reporting the database work of each request.
+"""
+import logging
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCountMiddleware:
+    """
+    Log the number of queries and the time spent in them for every request.
+
+    Requests over QUERY_COUNT_WARNING_THRESHOLD queries are logged as
+    warnings so N+1 regressions stand out. Counting goes through
+    execute_wrapper, so it works without DEBUG; enabled in settings only
+    while DEBUG is on.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = {'queries': 0, 'seconds': 0.0}
+
+        def count(execute, sql, params, many, context):
+            query_started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats['queries'] += 1
+                stats['seconds'] += time.perf_counter() - query_started
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            response = self.get_response(request)
+
+        threshold = getattr(settings, 'QUERY_COUNT_WARNING_THRESHOLD', 20)
+        log = logger.warning if stats['queries'] > threshold else logger.info
+        log(
+            f"{request.method} {request.path} {response.status_code}: {stats['queries']} queries "
+            f"in {stats['seconds'] * 1000:.1f} ms ({(time.perf_counter() - started) * 1000:.1f} ms total)"
+        )
+        return response
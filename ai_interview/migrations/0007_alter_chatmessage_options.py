@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interview', '0006_interviewsession_problem_name_request_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='chatmessage',
+            options={'ordering': ['timestamp', 'id']},
+        ),
+    ]
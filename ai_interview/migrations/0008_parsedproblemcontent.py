@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interview', '0007_alter_chatmessage_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParsedProblemContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('parser_version', models.PositiveIntegerField()),
+                ('parsed', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('content_hash', 'parser_version')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interview', '0008_parsedproblemcontent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeetCodeQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title_slug', models.CharField(max_length=200, unique=True)),
+                ('leetcode_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('title', models.CharField(max_length=200)),
+                ('difficulty', models.CharField(choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], max_length=10)),
+                ('paid_only', models.BooleanField(default=False)),
+                ('topics', models.JSONField(default=list)),
+                ('ac_rate', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
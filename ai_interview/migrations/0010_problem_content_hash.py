@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interview', '0009_leetcodequestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
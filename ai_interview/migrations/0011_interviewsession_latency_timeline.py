@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interview', '0010_problem_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='latency_timeline',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -27,28 +27,31 @@ class UserProfile(models.Model):
         return f"{self.user.username}'s Profile"
     
     def update_statistics(self):
-        """Update profile statistics based on completed interviews"""
-        completed_sessions = InterviewSession.objects.filter(
-            user=self.user,
-            status='completed'
+        """
+        Update profile statistics based on completed interviews.
+
+        One aggregate query; the profile is saved only when a value changed.
+        Returns the aggregate, which also carries the total interview time.
+        """
+        stats = InterviewSession.objects.filter(user=self.user, status='completed').aggregate(
+            total_interviews=models.Count('id'),
+            # Count unique problems solved
+            total_problems_solved=models.Count('problem', distinct=True),
+            average_score=models.Avg('performance_score'),
+            total_duration=models.Sum(models.ExpressionWrapper(
+                models.F('completed_at') - models.F('started_at'), output_field=models.DurationField()
+            )),
         )
-        
-        self.total_interviews = completed_sessions.count()
-        
-        # Count unique problems solved
-        self.total_problems_solved = completed_sessions.filter(
-            problem__isnull=False
-        ).values('problem').distinct().count()
-        
-        # Calculate average score
-        scores = completed_sessions.filter(
-            performance_score__isnull=False
-        ).values_list('performance_score', flat=True)
-        
-        if scores:
-            self.average_score = sum(scores) / len(scores)
-        
-        self.save()
+
+        changed = [
+            field for field in ('total_interviews', 'total_problems_solved', 'average_score')
+            if stats[field] is not None and getattr(self, field) != stats[field]
+        ]
+        for field in changed:
+            setattr(self, field, stats[field])
+        if changed:
+            self.save(update_fields=changed + ['updated_at'])
+        return stats
 
 
 @receiver(post_save, sender=User)
@@ -59,8 +62,12 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, created, update_fields=None, **kwargs):
     """Save profile when user is saved"""
+    # A new user's profile was just created, and partial saves (last_login
+    # on every login) change nothing the profile depends on
+    if created or update_fields:
+        return
     if hasattr(instance, 'profile'):
         instance.profile.save()
 
@@ -85,12 +92,28 @@ class Problem(models.Model):
     hints = models.JSONField(default=list)  # Progressive hints for the problem
     function_signature = models.TextField(blank=True)  # Generated function signature
     test_cases = models.JSONField(default=list)  # Generated test cases
+    content_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of the LeetCode content HTML
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"{self.title} ({self.difficulty})"
 
 
+class LeetCodeQuestion(models.Model):
+    """Local mirror of LeetCode's question catalog (questionList summaries)"""
+    title_slug = models.CharField(max_length=200, unique=True)
+    leetcode_id = models.IntegerField(null=True, blank=True, db_index=True)  # questionFrontendId
+    title = models.CharField(max_length=200)
+    difficulty = models.CharField(max_length=10, choices=Problem.DIFFICULTY_CHOICES)
+    paid_only = models.BooleanField(default=False)
+    topics = models.JSONField(default=list)  # LeetCode tag slugs
+    ac_rate = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.leetcode_id}. {self.title}"
+
+
 class InterviewSession(models.Model):
     STATUS_CHOICES = [
         ('preparing', 'Preparing'),
@@ -121,6 +144,9 @@ class InterviewSession(models.Model):
     communication_score = models.FloatField(null=True, blank=True, help_text="Communication score (0-100)")
     problem_solving_score = models.FloatField(null=True, blank=True, help_text="Problem solving score (0-100)")
     
+    # One [at, kind, first_token, reply, tts] row (ms) per turn - see latency_timeline
+    latency_timeline = models.JSONField(default=list, blank=True)
+    
     def __str__(self):
         return f"Interview {self.id} - {self.user.username}"
     
@@ -146,10 +172,12 @@ class ChatMessage(models.Model):
     session = models.ForeignKey(InterviewSession, on_delete=models.CASCADE, related_name='messages')
     message_type = models.CharField(max_length=10, choices=MESSAGE_TYPE_CHOICES)
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the message is sent, not when the write-behind buffer saves it
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
-        ordering = ['timestamp']
+        # id breaks ties between messages written in the same batch
+        ordering = ['timestamp', 'id']
     
     def __str__(self):
         return f"{self.message_type}: {self.content[:50]}..."
@@ -180,6 +208,20 @@ class UserProblem(models.Model):
         return f"{self.user.username} - {self.problem.title}"
 
 
+class ParsedProblemContent(models.Model):
+    """Memoized parse of a LeetCode content HTML document, keyed by its hash and the parser version"""
+    content_hash = models.CharField(max_length=64)  # SHA-256 of the content HTML
+    parser_version = models.PositiveIntegerField()
+    parsed = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['content_hash', 'parser_version']
+    
+    def __str__(self):
+        return f"Parsed content {self.content_hash[:12]} (v{self.parser_version})"
+
+
 class InterviewRecording(models.Model):
     """Store interview session recordings and metadata"""
     session = models.OneToOneField(InterviewSession, on_delete=models.CASCADE, related_name='recording')
@@ -0,0 +1,117 @@
+"""
+Normalization of example outputs into test case expectations.
+
+get_official_test_cases, generate_test_cases and _format_test_output all
+turn the "Output:" text of a LeetCode example into the string shown to the
+candidate and compared against their program's output. The cleaning steps
+live here as a table of precompiled substitutions, and the typed value of
+the output (bool, number, list, string or None) is derived once so it can
+be stored on the test case next to the string.
+"""
+import json
+import re
+from typing import Any, Dict, Tuple
+from .problem_parser import clean_html_text
+
+# Applied in order to the first line of the cleaned output
+OUTPUT_CLEANING_STEPS = [
+    # Leftover tags and named entities (both empty after clean_html_text unless double-escaped)
+    (re.compile(r'<[^>]*>'), ''),
+    (re.compile(r'&[a-zA-Z]+;'), ''),
+    # Any whitespace run becomes one space
+    (re.compile(r'\s+'), ' '),
+]
+
+_FIRST_NUMBER_RE = re.compile(r'\d+')
+_BOOLEANS = {'true': 'True', 'false': 'False'}
+# Literals json.loads does not know in the spellings LeetCode or Python use
+_LITERALS = {'True': True, 'False': False, 'None': None}
+
+
+def clean_expected_output(output_text: str) -> str:
+    """Reduce the raw "Output:" text of an example to the expected value string."""
+    # Remove HTML tags and extra text, keeping just the first line
+    return _clean_first_line(clean_html_text(output_text).split('\n', 1)[0])
+
+
+def _clean_first_line(output_text: str) -> str:
+    output_text = output_text.replace('"', '')
+
+    for pattern, replacement in OUTPUT_CLEANING_STEPS:
+        output_text = pattern.sub(replacement, output_text)
+    output_text = output_text.strip()
+
+    # Fix common boolean values
+    output_text = _BOOLEANS.get(output_text.lower(), output_text)
+
+    # Remove any remaining quotes if they're not part of the actual value
+    if output_text.startswith("'") and output_text.endswith("'"):
+        output_text = output_text[1:-1]
+
+    # If the output still looks like markup, try to extract just the value
+    if '<' in output_text or 'class=' in output_text:
+        lowered = output_text.lower()
+        if 'true' in lowered:
+            output_text = 'True'
+        elif 'false' in lowered:
+            output_text = 'False'
+        else:
+            number_match = _FIRST_NUMBER_RE.search(output_text)
+            if number_match:
+                output_text = number_match.group()
+
+    return output_text
+
+
+def format_expected_output(output_text: str) -> str:
+    """Format an output for comparison: booleans capitalised, strings quoted."""
+    if not output_text:
+        return ""
+
+    output_text = output_text.strip()
+
+    # Already quoted, numbers and lists are kept as they are
+    if output_text.startswith('"') and output_text.endswith('"'):
+        return output_text
+    boolean = _BOOLEANS.get(output_text.lower())
+    if boolean:
+        return boolean
+    if output_text.isdigit() or (output_text.startswith('-') and output_text[1:].isdigit()):
+        return output_text
+    if output_text.startswith('[') and output_text.endswith(']'):
+        return output_text
+
+    # Default: wrap in quotes
+    return f'"{output_text}"'
+
+
+def expected_value(output_text: str) -> Any:
+    """
+    Typed value of an output: JSON literals (numbers, lists, quoted strings,
+    true/false/null) and Python's True/False/None are decoded, anything else
+    is returned as the bare string.
+    """
+    text = output_text.strip()
+    if text in _LITERALS:
+        return _LITERALS[text]
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def normalize_output(raw_output: str) -> Tuple[str, Any]:
+    """Return (expected string, typed expected value) for the raw output of a LeetCode example."""
+    first_line = clean_html_text(raw_output).split('\n', 1)[0]
+    # The typed value is read before quotes are stripped, so ["a","b"] stays a list of strings
+    return _clean_first_line(first_line), expected_value(first_line)
+
+
+def official_test_case(example: Dict) -> Dict:
+    """Test case for an example parsed from the problem content."""
+    expected, value = normalize_output(example.get('output', '').strip())
+    return {
+        'input': example.get('input', '').replace('columnNumber = ', '').strip(),
+        'expected': expected,
+        'expected_value': value,
+    }
@@ -0,0 +1,378 @@
+"""
+Single-pass parser for LeetCode problem content HTML.
+
+ProblemContentParser walks the document's tags once, in order, and routes
+text into the description, the current example's input/output/explanation
+or the constraints as it goes. Section changes are driven by the bold labels
+LeetCode uses ("Example 1:", "Input:", "Output:", "Explanation:",
+"Constraints:"), whether they are written with <strong> or <b>.
+
+parse_problem_content_regex is the previous regex implementation. It is kept
+as the reference the parser is checked against and as a fallback for
+content without any recognisable example labels.
+
+ParsedContentCache memoizes results by content hash and PARSER_VERSION, in
+memory and in the ParsedProblemContent table.
+"""
+import copy
+import hashlib
+import html
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from .models import ParsedProblemContent
+
+logger = logging.getLogger(__name__)
+
+# Bump when the parser's output changes for the same input. Once no process
+# runs the old version any more, run manage.py prune_parsed_content.
+PARSER_VERSION = 1
+
+_EXAMPLE_LABEL_RE = re.compile(r'example\s*\d+:', re.IGNORECASE)
+_FIELD_LABELS = {'input:': 'input', 'output:': 'output', 'explanation:': 'explanation'}
+_CONSTRAINTS_LABEL = 'constraints:'
+_LABEL_TAGS = ('strong', 'b')
+
+# Only these tags change what the parser does; every other tag (code, sup,
+# em, span, li, ...) is stripped from the text between them in one pass
+_STRUCTURAL_TAG_RE = re.compile(r'<(/?)(p|br|pre|div|strong|b)\b([^>]*)>', re.IGNORECASE)
+_OTHER_TAG_RE = re.compile(r'<!--.*?-->|<[^>]+>', re.DOTALL)
+_CLASS_ATTR_RE = re.compile(r'class\s*=\s*["\']([^"\']*)')
+
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+_SPACES_RE = re.compile(r'[ \t]+')
+
+
+def normalize_text(text: str) -> str:
+    """Collapse blank lines and runs of spaces the way clean_html_text does."""
+    text = _BLANK_LINES_RE.sub('\n\n', text)
+    text = _SPACES_RE.sub(' ', text)
+    return text.strip()
+
+
+class ProblemContentParser:
+    """Streaming extractor for description, examples and constraints"""
+
+    def __init__(self):
+        self.description: List[str] = []
+        self.constraints: List[str] = []
+        self.examples: List[Dict[str, List[str]]] = []
+
+        self._section = 'description'  # 'description', 'example' or 'constraints'
+        self._field: Optional[str] = None  # field of the current example being filled
+        self._label: Optional[List[str]] = None  # text of the open <strong>/<b>
+        self._label_depth = 0
+        self._div_depth = 0
+        self._example_block_depth = None  # div depth of the open example-block
+        self._out = self.description  # list that text is currently appended to
+
+    def feed(self, content: str) -> None:
+        """Walk the document once, dispatching tags and the text between them."""
+        # split() yields text, then (closing slash, tag, attributes, text) per tag
+        parts = _STRUCTURAL_TAG_RE.split(content)
+        handle_data, handle_starttag, handle_endtag = self.handle_data, self.handle_starttag, self.handle_endtag
+        if parts[0]:
+            handle_data(parts[0])
+        for index in range(1, len(parts), 4):
+            closing, tag, attrs, text = parts[index:index + 4]
+            tag = tag.lower()
+            if closing:
+                handle_endtag(tag)
+            else:
+                handle_starttag(tag, attrs)
+                if attrs.endswith('/'):
+                    handle_endtag(tag)
+            if text:
+                handle_data(text)
+        if self._label is not None:
+            # Unclosed <strong>/<b>: keep its text rather than dropping it
+            text, self._label, self._label_depth = ''.join(self._label), None, 0
+            self._route()
+            self._out.append(text)
+
+    def _route(self) -> None:
+        # Point _out at the list the current state writes to, so writing
+        # text is a plain append
+        if self._label is not None:
+            self._out = self._label
+        elif self._section == 'description':
+            self._out = self.description
+        elif self._section == 'constraints':
+            self._out = self.constraints
+        elif self._field:
+            self._out = self.examples[-1][self._field]
+        else:
+            self._out = []  # between an example label and its first field
+
+    def _set_section(self, section: str, field: Optional[str] = None) -> None:
+        self._section, self._field = section, field
+        self._route()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _LABEL_TAGS:
+            if self._label is None:
+                self._label = []
+                self._route()
+            self._label_depth += 1
+            return
+        if tag == 'div':
+            self._div_depth += 1
+            class_attr = _CLASS_ATTR_RE.search(attrs) if self._section == 'example' else None
+            if class_attr and 'example-block' in class_attr.group(1).split():
+                self._example_block_depth = self._div_depth
+            return
+        if tag == 'p' or tag == 'br':
+            # Constraints run until the next paragraph or line break
+            if self._section == 'constraints' and self._label is None:
+                self._set_section('description')
+            self._out.append('\n')
+        elif tag == 'pre':
+            self._out.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in _LABEL_TAGS:
+            if self._label is None:
+                return
+            self._label_depth -= 1
+            if self._label_depth == 0:
+                text = ''.join(self._label)
+                self._label = None
+                self._route()
+                self._handle_label(text)
+            return
+        if tag == 'div':
+            if self._example_block_depth == self._div_depth:
+                self._example_block_depth = None
+                self._set_section('description')
+            self._div_depth = max(self._div_depth - 1, 0)
+            return
+        if tag == 'p':
+            self._out.append('\n')
+        elif tag == 'pre' and self._section == 'example' and self._field:
+            self._set_section('description')
+
+    def _handle_label(self, text: str) -> None:
+        label = text.strip().lower()
+        if _EXAMPLE_LABEL_RE.fullmatch(label):
+            self.examples.append({'input': [], 'output': [], 'explanation': []})
+            self._set_section('example')
+        elif self._section == 'example' and label in _FIELD_LABELS:
+            self._set_section('example', _FIELD_LABELS[label])
+        elif label == _CONSTRAINTS_LABEL:
+            self._set_section('constraints')
+        else:
+            # Ordinary bold text
+            self._out.append(text)
+
+    def handle_data(self, data):
+        if '<' in data:
+            data = _OTHER_TAG_RE.sub('', data)
+        if '&' in data:
+            data = html.unescape(data)
+        self._out.append(data)
+
+    def result(self) -> Dict:
+        examples = []
+        for example in self.examples:
+            explanation = normalize_text(''.join(example['explanation']))
+            examples.append({
+                'input': normalize_text(''.join(example['input'])),
+                'output': normalize_text(''.join(example['output'])),
+                'explanation': explanation or None
+            })
+        return {
+            'description': normalize_text(''.join(self.description)),
+            'constraints': normalize_text(''.join(self.constraints)),
+            'examples': examples
+        }
+
+
+def parse_problem_content(content: str) -> Dict:
+    """Parse LeetCode problem content into description, constraints and examples."""
+    if not content:
+        return {}
+
+    parser = ProblemContentParser()
+    parser.feed(content)
+    parsed = parser.result()
+
+    # Examples written without bold labels are left to the regex patterns
+    if not parsed['examples'] and 'example' in content.lower():
+        return parse_problem_content_regex(content)
+    return parsed
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 hex digest of a content HTML document."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class ParsedContentCache:
+    """
+    Memoizes parse_problem_content by a SHA-256 of the content HTML.
+
+    Entries are keyed by PARSER_VERSION as well, so bumping the version
+    makes every stored parse a miss and content is re-parsed on next use.
+    Rows of other versions are kept, since processes still on the old
+    version read them during a rolling deploy; prune() (manage.py
+    prune_parsed_content) deletes them once the deploy is done. Results are
+    copied on the way out; callers may modify them freely.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or getattr(settings, 'PARSED_CONTENT_CACHE_SIZE', 512)
+        self._memory: OrderedDict = OrderedDict()  # (hash, version) -> parsed, in LRU order
+        self._lock = threading.Lock()
+
+    def parse(self, content: str) -> Dict:
+        """Return parse_problem_content(content), reusing a stored result when there is one."""
+        if not content:
+            return {}
+
+        key = (content_hash(content), PARSER_VERSION)
+        with self._lock:
+            parsed = self._memory.get(key)
+            if parsed is not None:
+                self._memory.move_to_end(key)
+                return copy.deepcopy(parsed)
+
+        parsed = self._load(key)
+        if parsed is None:
+            parsed = parse_problem_content(content)
+            self._store(key, parsed)
+
+        with self._lock:
+            self._memory[key] = parsed
+            if len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return copy.deepcopy(parsed)
+
+    def _load(self, key) -> Optional[Dict]:
+        content_hash, parser_version = key
+        return ParsedProblemContent.objects.filter(
+            content_hash=content_hash, parser_version=parser_version
+        ).values_list('parsed', flat=True).first()
+
+    def _store(self, key, parsed: Dict) -> None:
+        content_hash, parser_version = key
+        try:
+            with transaction.atomic():
+                ParsedProblemContent.objects.create(
+                    content_hash=content_hash, parser_version=parser_version, parsed=parsed
+                )
+        except IntegrityError:
+            pass  # Stored concurrently by another worker
+
+    def prune(self, parser_version: int = None) -> int:
+        """Delete stored parses made by other parser versions. Returns the number of rows deleted."""
+        deleted, _ = ParsedProblemContent.objects.exclude(
+            parser_version=parser_version or PARSER_VERSION
+        ).delete()
+        if deleted:
+            logger.info(f"Deleted {deleted} parses from old parser versions")
+        return deleted
+
+    def clear(self) -> None:
+        """Drop the in-memory layer (stored parses are kept)."""
+        with self._lock:
+            self._memory.clear()
+
+
+# Global instance
+parsed_content_cache = ParsedContentCache()
+
+
+_TAG_NEWLINE_RES = [re.compile(r'<br\s*/?>'), re.compile(r'<p[^>]*>'), re.compile(r'</p>')]
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def clean_html_text(text: str) -> str:
+    """Clean HTML text while preserving important formatting"""
+    if not text:
+        return ""
+
+    # Decode HTML entities first
+    text = html.unescape(text)
+
+    # Preserve line breaks and paragraphs
+    for pattern in _TAG_NEWLINE_RES:
+        text = pattern.sub('\n', text)
+
+    # Remove other HTML tags
+    text = _TAG_RE.sub('', text)
+
+    return normalize_text(text)
+
+
+# Example patterns for the regex parser, ordered by specificity
+EXAMPLE_PATTERNS = [
+    # Pattern 1: Handle the new LeetCode format with example-block divs (most specific)
+    r'<strong class="example">Example\s*(\d+):</strong>.*?<div class="example-block">.*?<strong>Input:</strong>\s*<span[^>]*>(.*?)</span>.*?<strong>Output:</strong>\s*<span[^>]*>(.*?)</span>.*?</div>',
+    # Pattern 2: <strong>Example X:</strong> with <pre> blocks
+    r'<strong>Example\s*(\d+):</strong>.*?<pre>.*?<strong>Input:</strong>\s*(.*?)<strong>Output:</strong>\s*(.*?)(?:<strong>Explanation:</strong>\s*(.*?))?</pre>',
+    # Pattern 3: <b>Example X:</b> with <pre> blocks
+    r'<b>Example\s*(\d+):</b>.*?<pre>.*?<b>Input:</b>\s*(.*?)<b>Output:</b>\s*(.*?)(?:<b>Explanation:</b>\s*(.*?))?</pre>',
+    # Pattern 4: Plain text examples without <pre>
+    r'<strong>Example\s*(\d+):</strong>.*?<strong>Input:</strong>\s*(.*?)<strong>Output:</strong>\s*(.*?)(?:<strong>Explanation:</strong>\s*(.*?))?(?=<strong>Example|$)',
+    # Pattern 5: More flexible pattern
+    r'Example\s*(\d+):.*?Input:\s*(.*?)Output:\s*(.*?)(?:Explanation:\s*(.*?))?(?=Example|\Z)',
+    # Pattern 6: Handle cases where output might be in different format
+    r'<strong>Example\s*(\d+):</strong>.*?<strong>Input:</strong>\s*(.*?)<strong>Output:</strong>\s*(.*?)(?=<strong>Example|$)',
+    # Pattern 7: Handle cases with different HTML structure
+    r'<b>Example\s*(\d+):</b>.*?<b>Input:</b>\s*(.*?)<b>Output:</b>\s*(.*?)(?=<b>Example|$)'
+]
+
+CONSTRAINTS_PATTERNS = [
+    r'<strong>Constraints:</strong>(.*?)(?:<p>|<br>|$)',
+    r'<b>Constraints:</b>(.*?)(?:<p>|<br>|$)',
+    r'Constraints:(.*?)(?:<p>|<br>|$)'
+]
+
+
+def parse_problem_content_regex(content: str) -> Dict:
+    """Parse LeetCode problem content with the original regex patterns (reference implementation)"""
+    if not content:
+        return {}
+
+    # Extract examples using multiple regex patterns
+    examples = []
+    for pattern in EXAMPLE_PATTERNS:
+        matches = re.findall(pattern, content, re.DOTALL | re.IGNORECASE)
+        if matches:
+            for match in matches:
+                input_text = clean_html_text(match[1])
+                output_text = clean_html_text(match[2])
+                explanation = clean_html_text(match[3]) if len(match) > 3 and match[3] else None
+
+                examples.append({
+                    'input': input_text,
+                    'output': output_text,
+                    'explanation': explanation
+                })
+            break  # Use first pattern that finds matches
+
+    # Extract constraints using multiple patterns
+    constraints = ""
+    for pattern in CONSTRAINTS_PATTERNS:
+        constraints_match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
+        if constraints_match:
+            constraints = clean_html_text(constraints_match.group(1))
+            break
+
+    # Extract the main description by removing examples and constraints
+    description = content
+    for pattern in EXAMPLE_PATTERNS + CONSTRAINTS_PATTERNS:
+        description = re.sub(pattern, '', description, flags=re.DOTALL | re.IGNORECASE)
+
+    # Clean up the description while preserving some formatting
+    description = clean_html_text(description)
+
+    return {
+        'description': description,
+        'constraints': constraints,
+        'examples': examples
+    }
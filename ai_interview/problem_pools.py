@@ -0,0 +1,138 @@
+"""
+In-memory problem pools for random problem selection.
+
+Each (difficulty, topic) pool is a compact array of LeetCode question IDs,
+fetched once and refreshed periodically. Question summaries are stored once
+per ID and shared between pools. Per-user exclusion is an IdBitset, so
+sampling an unseen problem stays O(1) expected time no matter how many
+problems the user has already been given.
+"""
+import random
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+from .singleflight import SingleFlight
+
+
+class IdBitset:
+    """Compact set of non-negative integer IDs backed by a bytearray"""
+
+    def __init__(self, ids: Iterable = ()):
+        self._bits = bytearray()
+        self._count = 0
+        for id in ids:
+            self.add(id)
+
+    def add(self, id) -> None:
+        id = int(id)
+        if id < 0:
+            # A negative index would wrap around to the end of the bytearray
+            raise ValueError(f"IdBitset holds non-negative IDs, got {id}")
+        byte, bit = divmod(id, 8)
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(byte - len(self._bits) + 1))
+        if not self._bits[byte] & (1 << bit):
+            self._bits[byte] |= 1 << bit
+            self._count += 1
+
+    def __contains__(self, id) -> bool:
+        try:
+            byte, bit = divmod(int(id), 8)
+        except (TypeError, ValueError):
+            return False
+        return 0 <= byte < len(self._bits) and bool(self._bits[byte] & (1 << bit))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        for byte_index, byte in enumerate(self._bits):
+            if byte:
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        yield byte_index * 8 + bit
+
+
+class ProblemPoolIndex:
+    """Lazily built (difficulty, topic) -> question ID pools"""
+
+    # Random probes before falling back to scanning the remaining IDs
+    MAX_SAMPLE_ATTEMPTS = 16
+    # Seconds before an empty pool is fetched again
+    EMPTY_POOL_TTL = 60
+
+    def __init__(self, fetch_problems: Callable[..., List[Dict]], pool_size: int = None, ttl: int = None):
+        """
+        Args:
+            fetch_problems: callable(difficulty=..., topic=..., limit=...) returning
+                LeetCode question summaries (LeetCodeService.get_problems)
+        """
+        self.fetch_problems = fetch_problems
+        self.pool_size = pool_size or getattr(settings, 'PROBLEM_POOL_SIZE', 1000)
+        self.ttl = ttl or getattr(settings, 'PROBLEM_POOL_TTL', 6 * 60 * 60)
+
+        self._pools: Dict[Tuple, Tuple[float, array]] = {}  # key -> (built_at, ids)
+        self._questions: Dict[int, Dict] = {}  # question id -> summary
+        self._lock = threading.Lock()
+        # Concurrent misses for one pool share a single fetch
+        self._flights = SingleFlight()
+
+    def _key(self, difficulty: Optional[str], topic: Optional[str]) -> Tuple:
+        return ((difficulty or '').lower(), (topic or '').lower())
+
+    def get_pool(self, difficulty: str = None, topic: str = None) -> array:
+        """Return the ID array for a pool, fetching it if missing or stale."""
+        key = self._key(difficulty, topic)
+        cached = self._pools.get(key)
+        if cached:
+            built_at, ids = cached
+            # Empty pools (often a failed fetch) are retried much sooner
+            if time.monotonic() - built_at < (self.ttl if ids else self.EMPTY_POOL_TTL):
+                return ids
+
+        return self._flights.do(key, lambda: self._build_pool(key, difficulty, topic))
+
+    def _build_pool(self, key: Tuple, difficulty: Optional[str], topic: Optional[str]) -> array:
+        questions = self.fetch_problems(difficulty=difficulty, topic=topic, limit=self.pool_size)
+        ids = array('i')
+        with self._lock:
+            for question in questions:
+                try:
+                    question_id = int(question['frontendQuestionId'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self._questions[question_id] = question
+                ids.append(question_id)
+            self._pools[key] = (time.monotonic(), ids)
+        return ids
+
+    def question(self, question_id: int) -> Optional[Dict]:
+        """Return the cached summary for a question ID."""
+        return self._questions.get(question_id)
+
+    def sample(self, difficulty: str = None, topic: str = None, exclude: IdBitset = None) -> Optional[Dict]:
+        """Pick a random question from a pool that is not in the exclusion set."""
+        ids = self.get_pool(difficulty, topic)
+        if not ids:
+            return None
+        exclude = exclude if exclude is not None else IdBitset()
+
+        # Rejection sampling: O(1) expected while most of the pool is unseen
+        for _ in range(self.MAX_SAMPLE_ATTEMPTS):
+            question_id = ids[random.randrange(len(ids))]
+            if question_id not in exclude:
+                return self._questions.get(question_id)
+
+        # Nearly exhausted pool: pick from what is left
+        remaining = [question_id for question_id in ids if question_id not in exclude]
+        if not remaining:
+            return None
+        return self._questions.get(random.choice(remaining))
+
+    def clear(self) -> None:
+        """Drop all pools so they are rebuilt on next use."""
+        with self._lock:
+            self._pools.clear()
+            self._questions.clear()
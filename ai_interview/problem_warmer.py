@@ -0,0 +1,221 @@
+"""
+Background pre-materialisation of problems.
+
+Turning a LeetCode question into a Problem row (fetching details, parsing
+the HTML, deriving the signature and test cases) takes seconds. The
+warmer does that ahead of time so that, for every (difficulty, topic) pool
+that has been asked for, a few ready Problem rows are waiting and
+select_problem only needs a database read.
+"""
+import logging
+import queue
+import threading
+from typing import Dict, Optional
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from .models import Problem
+from .leetcode_service import leetcode_service
+from .problem_pools import IdBitset
+from .problem_parser import content_hash
+
+logger = logging.getLogger(__name__)
+
+
+def problem_content_fields(leetcode_problem: Dict, details: Dict) -> Dict:
+    """
+    Problem fields derived from a question's content: description,
+    constraints, examples, function signature, test cases and content hash.
+    """
+    # Parse the content
+    parsed_content = leetcode_service.parse_problem_content(details.get('content', ''))
+    
+    # Official function signature and test cases, from these same details
+    # (a cached copy may predate a content change)
+    logger.debug(f"Getting official data for {leetcode_problem['titleSlug']}")
+    try:
+        function_signature = leetcode_service.function_signature_from_details(details, leetcode_problem['titleSlug'])
+        test_cases = leetcode_service.test_cases_from_details(details, leetcode_problem['titleSlug'])
+    except Exception as e:
+        logger.warning(f"Exception getting official data for {leetcode_problem['titleSlug']}: {e}")
+        function_signature, test_cases = "", []
+    
+    logger.debug(f"Official function signature length: {len(function_signature) if function_signature else 0}")
+    logger.debug(f"Official test cases count: {len(test_cases) if test_cases else 0}")
+    
+    # Fallback to generated ones if official ones are not available
+    if not function_signature:
+        logger.info(f"No official function signature found for {leetcode_problem['titleSlug']}, using generated one")
+        function_signature = leetcode_service.extract_function_signature(
+            details.get('content', ''), 
+            leetcode_problem['title']
+        )
+    
+    if not test_cases:
+        logger.info(f"No official test cases found for {leetcode_problem['titleSlug']}, using generated ones")
+        test_cases = leetcode_service.generate_test_cases(
+            parsed_content.get('examples', []), 
+            leetcode_problem['title']
+        )
+    
+    logger.debug(f"Final function signature length: {len(function_signature) if function_signature else 0}")
+    logger.debug(f"Final test cases count: {len(test_cases) if test_cases else 0}")
+    logger.debug(f"Final function signature content: {repr(function_signature)}")
+    
+    return {
+        'description': parsed_content.get('description', ''),
+        'constraints': parsed_content.get('constraints', ''),
+        'examples': parsed_content.get('examples', []),
+        'function_signature': function_signature,
+        'test_cases': test_cases,
+        'content_hash': content_hash(details.get('content', '')),
+    }
+
+
+def rematerialize_problem(problem: Problem, leetcode_problem: Dict, details: Dict) -> Problem:
+    """Rebuild a Problem's content-derived fields in place after its content changed upstream."""
+    for field, value in problem_content_fields(leetcode_problem, details).items():
+        setattr(problem, field, value)
+    problem.save()
+    logger.info(f"Re-materialized problem {problem.title} ({problem.leetcode_id})")
+    return problem
+
+
+def materialize_problem(leetcode_problem: Dict) -> Optional[Problem]:
+    """Return the Problem row for a LeetCode question summary, creating or completing it as needed."""
+    # Check if we already have this problem in our database
+    problem = Problem.objects.filter(leetcode_id=leetcode_problem['frontendQuestionId']).first()
+    
+    if problem:
+        logger.debug(f"Using existing problem: {problem.title}")
+        # If the existing problem doesn't have a function signature, generate it
+        if not problem.function_signature:
+            logger.debug(f"Existing problem missing function signature, generating...")
+            function_signature = leetcode_service.get_official_function_signature(
+                leetcode_problem['titleSlug']
+            )
+            if not function_signature:
+                logger.info(f"No official function signature found for {leetcode_problem['titleSlug']}, using generated one")
+                details = leetcode_service.get_problem_details(leetcode_problem['titleSlug'])
+                if details:
+                    function_signature = leetcode_service.extract_function_signature(
+                        details.get('content', ''), 
+                        leetcode_problem['title']
+                    )
+            
+            if function_signature:
+                problem.function_signature = function_signature
+                problem.save()
+                logger.debug(f"Updated function signature for existing problem: {len(function_signature)} chars")
+    else:
+        # Fetch detailed problem content
+        details = leetcode_service.get_problem_details(leetcode_problem['titleSlug'])
+        if not details:
+            return None
+        
+        fields = problem_content_fields(leetcode_problem, details)
+        
+        # Create new problem in database
+        try:
+            with transaction.atomic():
+                problem = Problem.objects.create(
+                    leetcode_id=leetcode_problem['frontendQuestionId'],
+                    title_slug=leetcode_problem['titleSlug'],
+                    title=leetcode_problem['title'],
+                    difficulty=leetcode_problem['difficulty'].lower(),
+                    topics=[tag['slug'] for tag in leetcode_problem.get('topicTags', [])],
+                    **fields
+                )
+        except IntegrityError:
+            # Materialised concurrently (e.g. by the warmer) - use that row
+            return Problem.objects.filter(leetcode_id=leetcode_problem['frontendQuestionId']).first()
+        
+        logger.debug(f"Problem created with ID: {problem.id}")
+        logger.debug(f"Saved function signature length: {len(problem.function_signature) if problem.function_signature else 0}")
+        logger.debug(f"Saved function signature content: {repr(problem.function_signature)}")
+
+    return problem
+
+
+def ready_problems(difficulty: str = None, topic: str = None, user_id: int = None):
+    """
+    Fully materialised problems for a pool, optionally excluding those
+    already given to a user (an anti-join against UserProblem).
+    """
+    problems = Problem.objects.exclude(function_signature='')
+    if difficulty:
+        problems = problems.filter(difficulty=difficulty.lower())
+    if topic:
+        # topics is a JSON list of tag slugs; match the quoted slug
+        problems = problems.filter(topics__icontains=f'"{topic}"')
+    if user_id:
+        problems = problems.exclude(userproblem__user_id=user_id)
+    return problems
+
+
+class ProblemWarmer:
+    """
+    Background worker that keeps a few ready Problem rows per (difficulty,
+    topic) pool. Pools are shared by all users: a user's history is only
+    excluded when select_problem picks a row, so materialization grows with
+    the number of pools rather than the number of users.
+    """
+
+    def __init__(self, ready_count: int = None):
+        self.ready_count = ready_count or getattr(settings, 'PROBLEM_WARMER_READY_COUNT', 3)
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def request(self, difficulty: str = None, topic: str = None) -> None:
+        """Ask the warmer to top up a pool if it runs low. Returns immediately."""
+        if not getattr(settings, 'PROBLEM_WARMER_ENABLED', True):
+            return
+        key = (difficulty, topic)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name='problem-warmer', daemon=True)
+                self._thread.start()
+        self._queue.put(key)
+
+    def queue_depth(self) -> int:
+        """Number of pools waiting to be warmed."""
+        return self._queue.qsize()
+
+    def warm(self, difficulty: str = None, topic: str = None) -> int:
+        """Materialise problems until the pool has ready_count ready rows. Returns how many were created."""
+        missing = self.ready_count - ready_problems(difficulty, topic).count()
+        if missing <= 0:
+            return 0
+
+        # Skip everything already materialised
+        exclude = IdBitset(Problem.objects.filter(leetcode_id__isnull=False).values_list('leetcode_id', flat=True))
+        created = 0
+        for _ in range(missing):
+            leetcode_problem = leetcode_service.pools.sample(difficulty, topic, exclude)
+            if not leetcode_problem:
+                break
+            exclude.add(leetcode_problem['frontendQuestionId'])
+            if materialize_problem(leetcode_problem):
+                created += 1
+        logger.info(f"Problem warmer: warmed {created} problems for difficulty={difficulty}, topic={topic}")
+        return created
+
+    def _run(self) -> None:
+        while True:
+            key = self._queue.get()
+            try:
+                self.warm(*key)
+            except Exception as e:
+                logger.warning(f"Problem warmer: failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                close_old_connections()
+
+
+# Global instance
+problem_warmer = ProblemWarmer()
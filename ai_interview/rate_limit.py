@@ -0,0 +1,162 @@
+"""
+Rate limiting and circuit breaking for outbound leetcode.com requests.
+
+Every GraphQL attempt LeetCodeService makes takes a token from a token
+bucket first, so a burst of interviews starting together is smoothed out
+rather than tripping LeetCode's own rate limiting. With
+LEETCODE_RATE_LIMIT_REDIS_URL set, the bucket lives in Redis and is shared
+by every worker process; otherwise each process has its own.
+
+The circuit breaker counts consecutive failed attempts. Once it opens,
+requests fail immediately for LEETCODE_BREAKER_RESET seconds, then a single
+trial request decides whether it closes again.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """In-process token bucket refilled at ``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Take a token if one is available and return 0, else return the seconds until one will be."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class RedisTokenBucket:
+    """
+    Token bucket stored in Redis, shared by every process using the same key.
+
+    The refill-and-take step runs as one Lua script so concurrent workers
+    cannot both spend the last token. If Redis is unreachable the local
+    bucket is used instead, so a Redis outage degrades to per-process limits
+    rather than blocking LeetCode calls.
+    """
+
+    TAKE_SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or ARGV[2])
+    local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or ARGV[3])
+    local rate, capacity, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str, key: str, rate: float, capacity: int):
+        import redis
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._take = self._client.register_script(self.TAKE_SCRIPT)
+        self._local = TokenBucket(rate, capacity)
+
+    def take(self) -> float:
+        try:
+            # Redis server time keeps every worker on one clock
+            seconds, microseconds = self._client.time()
+            return float(self._take(keys=[self.key], args=[self.rate, self.capacity, seconds + microseconds / 1e6]))
+        except Exception as e:
+            logger.warning(f"Shared rate limiter unavailable, using the local bucket: {e}")
+            return self._local.take()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker: closed, open, then half-open for one
+    trial request. A trial that never reports back (e.g. it was cancelled)
+    is given up on after another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return 'open'
+            return 'half-open'
+
+    def is_open(self) -> bool:
+        """True while requests are being refused (a half-open breaker counts as closed)."""
+        return self.state == 'open'
+
+    def allow(self) -> bool:
+        """Whether a request may go out now. In the half-open state only one trial is let through."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("LeetCode circuit breaker closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_started is not None or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning(f"LeetCode circuit breaker open after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+            self._trial_started = None
+
+
+def leetcode_rate_limiter():
+    """The token bucket configured by the LEETCODE_RATE_LIMIT* settings."""
+    rate = getattr(settings, 'LEETCODE_RATE_LIMIT', 5)
+    capacity = getattr(settings, 'LEETCODE_RATE_LIMIT_BURST', 10)
+    url = getattr(settings, 'LEETCODE_RATE_LIMIT_REDIS_URL', None)
+    if url:
+        return RedisTokenBucket(url, 'leetcode:rate_limit', rate, capacity)
+    return TokenBucket(rate, capacity)
+
+
+def leetcode_circuit_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        getattr(settings, 'LEETCODE_BREAKER_THRESHOLD', 5),
+        getattr(settings, 'LEETCODE_BREAKER_RESET', 30),
+    )
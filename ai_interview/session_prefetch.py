@@ -0,0 +1,74 @@
+"""
+Speculative prefetch for newly started interview sessions.
+
+Nothing is needed from LeetCode or ElevenLabs until the candidate answers the
+greeting, which leaves the seconds between "Start interview" and their first
+message idle. start_interview uses that time to warm, in the background,
+what the first turns will need: the user's exclusion set, the problem pools
+they are likely to ask for and the greeting audio.
+"""
+import logging
+import threading
+from typing import List, Optional, Tuple
+from django.conf import settings
+from django.db import close_old_connections
+from .models import InterviewSession
+from .ai_agent import INITIAL_GREETING, get_excluded_problem_ids
+from .instrumentation import bind_session
+from .leetcode_service import leetcode_service
+from .problem_warmer import problem_warmer
+from .topics import canonical_topic
+from .voice_service import voice_service
+
+logger = logging.getLogger(__name__)
+
+# Past sessions consulted when guessing the next preferences
+HISTORY_SESSIONS = 5
+
+
+def likely_pools(session: InterviewSession) -> List[Tuple[str, Optional[str]]]:
+    """
+    Guess the (difficulty, topic) pools the candidate will ask for, most
+    likely first, from the preferences of their recent sessions.
+    """
+    history = (
+        InterviewSession.objects
+        .filter(user_id=session.user_id, difficulty_preference__isnull=False)
+        .exclude(id=session.id)
+        .order_by('-started_at')
+        .values_list('difficulty_preference', 'topic_preferences')[:HISTORY_SESSIONS]
+    )
+    pools = []
+    for difficulty, topics in history:
+        topic = canonical_topic(topics[0]) if topics else None
+        if (difficulty, topic) not in pools:
+            pools.append((difficulty, topic))
+    return pools
+
+
+def prefetch_session(session: InterviewSession) -> None:
+    """Warm everything the first turns of a session need. Blocking."""
+    bind_session(session.id)
+    try:
+        get_excluded_problem_ids(session)
+
+        for difficulty, topic in likely_pools(session):
+            leetcode_service.pools.get_pool(difficulty, topic)
+            problem_warmer.request(difficulty, topic)
+
+        # The client asks for the greeting audio as soon as the socket opens
+        if voice_service.is_available():
+            voice_service.generate_speech(INITIAL_GREETING)
+    except Exception as e:
+        logger.warning(f"Session prefetch failed for session {session.id}: {e}")
+    finally:
+        close_old_connections()
+
+
+def start_session_prefetch(session: InterviewSession) -> None:
+    """Run prefetch_session on a background thread and return immediately."""
+    if not getattr(settings, 'SESSION_PREFETCH_ENABLED', True):
+        return
+    threading.Thread(
+        target=prefetch_session, args=(session,), name=f'session-prefetch-{session.id}', daemon=True
+    ).start()
@@ -0,0 +1,108 @@
+"""
+Replay buffer for interview WebSocket frames.
+
+Every frame broadcast to a session is stamped with a per-session sequence
+number and kept in a small ring buffer so a reconnecting client can ask for
+the frames it missed instead of refetching the whole session over HTTP.
+The buffer lives in Django's cache, which is shared between workers
+(see ai_interview.checks).
+"""
+from typing import Dict, List, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+
+class SessionReplayBuffer:
+    """Per-session ring buffer of sequenced WebSocket frames"""
+
+    def __init__(self, size: int = None, timeout: int = None):
+        self.size = size or getattr(settings, 'INTERVIEW_REPLAY_BUFFER_SIZE', 50)
+        self.timeout = timeout or getattr(settings, 'INTERVIEW_REPLAY_TIMEOUT', 60 * 60)
+
+    def _seq_key(self, session_id) -> str:
+        return f"interview_replay:{session_id}:seq"
+
+    def _slot_key(self, session_id, seq: int) -> str:
+        # Slots are reused modulo the buffer size, which makes this a ring
+        # buffer without needing a read-modify-write of a shared list.
+        return f"interview_replay:{session_id}:slot:{seq % self.size}"
+
+    def _idempotency_key(self, session_id, client_msg_id: str) -> str:
+        return f"interview_replay:{session_id}:client_msg:{client_msg_id}"
+
+    def _next_seq(self, session_id) -> int:
+        # The sync incr() is atomic on the locmem, Redis and memcached backends;
+        # the async aincr() is a get-then-set on all of them and hands out
+        # repeated numbers to concurrent frames.
+        seq_key = self._seq_key(session_id)
+        try:
+            seq = cache.incr(seq_key)
+        except ValueError:
+            # First frame of the session (or the counter expired). add() keeps
+            # the value of a concurrent frame that got there first.
+            cache.add(seq_key, 0, self.timeout)
+            seq = cache.incr(seq_key)
+        # Keep the counter alive as long as the frames it numbers; the page
+        # drops frames whose seq is not above the last one it saw.
+        cache.touch(seq_key, self.timeout)
+        return seq
+
+    async def append(self, session_id, frame: Dict) -> int:
+        """Assign the next sequence number to a frame and store it. Returns the sequence number."""
+        seq = await sync_to_async(self._next_seq)(session_id)
+        await cache.aset(self._slot_key(session_id, seq), {'seq': seq, 'frame': frame}, self.timeout)
+        return seq
+
+    def last_seq(self, session_id) -> int:
+        """Return the most recent sequence number issued for a session (0 if none)."""
+        return cache.get(self._seq_key(session_id), 0)
+
+    async def alast_seq(self, session_id) -> int:
+        """Async version of last_seq()."""
+        return await cache.aget(self._seq_key(session_id), 0)
+
+    async def frames_since(self, session_id, last_seq: int) -> Optional[List[Dict]]:
+        """
+        Return the frames newer than last_seq in order, each stamped with its seq.
+
+        Returns None when the buffer no longer reaches back far enough, in
+        which case the client has to resynchronise from the HTTP endpoint.
+        """
+        current = await self.alast_seq(session_id)
+        if last_seq == current:
+            return []
+        # A client ahead of the server means the buffer was reset (e.g. cache
+        # flushed), so its sequence numbers are meaningless now.
+        if last_seq > current or current - last_seq > self.size:
+            return None
+
+        keys = [self._slot_key(session_id, seq) for seq in range(last_seq + 1, current + 1)]
+        entries = await cache.aget_many(keys)
+
+        frames = []
+        for seq in range(last_seq + 1, current + 1):
+            entry = entries.get(self._slot_key(session_id, seq))
+            # A missing or overwritten slot means the gap cannot be filled
+            if not entry or entry['seq'] != seq:
+                return None
+            frames.append({**entry['frame'], 'seq': seq})
+        return frames
+
+    async def claim_client_message(self, session_id, client_msg_id: str) -> bool:
+        """
+        Record a client message id. Returns False if it was already seen, so
+        resent messages are not processed (and sent to the LLM) twice.
+        """
+        if not client_msg_id:
+            return True
+        return await cache.aadd(self._idempotency_key(session_id, client_msg_id), True, self.timeout)
+
+    async def release_client_message(self, session_id, client_msg_id: str) -> None:
+        """Forget a claimed client message id so a resend of a message that went unanswered is processed."""
+        if client_msg_id:
+            await cache.adelete(self._idempotency_key(session_id, client_msg_id))
+
+
+# Global instance
+session_replay = SessionReplayBuffer()
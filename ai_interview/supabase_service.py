@@ -5,6 +5,7 @@ import os
 import logging
 from typing import Optional, Tuple
 from supabase import create_client, Client
+from .instrumentation import counter, span
 from datetime import datetime
 import mimetypes
 
@@ -51,11 +52,13 @@ class SupabaseService:
         
         try:
             # Upload file to storage
-            response = self.client.storage.from_(self.bucket_name).upload(
-                path=file_path,
-                file=file_data,
-                file_options={"content-type": content_type} if content_type else {}
-            )
+            with span('supabase.upload', path=file_path, bytes=len(file_data)):
+                response = self.client.storage.from_(self.bucket_name).upload(
+                    path=file_path,
+                    file=file_data,
+                    file_options={"content-type": content_type} if content_type else {}
+                )
+            counter('supabase_upload_bytes_total').inc(len(file_data))
             
             # Get public URL
             public_url = self.client.storage.from_(self.bucket_name).get_public_url(file_path)
@@ -1,3 +1,1291 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+import httpx
+import requests
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from .ai_agent import AIInterviewAgent, get_excluded_problem_ids
+from .catalog import mirror_catalog, refresh_catalog, refresh_problem_content
+from .checks import check_shared_cache
+from .consumers import InterviewConsumer
+from .intent_matcher import (
+    CHANGE_KEYWORDS, DIFFICULTY_KEYWORDS, NON_PROBLEM_NAME_WORDS, PROBLEM_REQUEST_KEYWORDS, TOPIC_KEYWORDS,
+    find_keywords, match_intent
+)
+from .latency_timeline import timeline_summary
+from .instrumentation import Histogram, bind_session, counter, histogram, span
+from .metrics import local_snapshot, merge_snapshots, metrics_publisher, render
+from .leetcode_service import LeetCodeService, leetcode_service
+from .loadtest import LoadTestStats, percentile
+from .message_writer import ChatMessageWriter
+from .llm_backends import LLMBackend, LLMBackendError, StandInBackend
+from .leetcode_standin import LeetCodeStandIn, graphql_url, record_fixtures, start_standin
+from .models import (
+    ChatMessage, CodeSubmission, InterviewSession, LeetCodeQuestion, ParsedProblemContent,
+    Problem, UserProblem
+)
+from .output_normalizer import clean_expected_output, format_expected_output, normalize_output
+from .problem_parser import ParsedContentCache, parse_problem_content
+from .problem_pools import IdBitset, ProblemPoolIndex
+from .rate_limit import CircuitBreaker
+from .routing import websocket_urlpatterns
+from .problem_warmer import ProblemWarmer, ready_problems
+from .session_prefetch import prefetch_session
+from .session_replay import SessionReplayBuffer
+from .testing import (
+    MATCHER_MESSAGES, PROBLEM_CONTENT_DIR, legacy_clean_output, legacy_format_output, legacy_match_intent,
+    load_example_outputs, load_problem_contents, regex_disagreements
+)
+from .topics import canonical_topic
 
-# Create your tests here.
+
+CONSUMER_SETTINGS = dict(
+    KRONOS_API_KEY='test-key', PROBLEM_WARMER_ENABLED=False,
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+)
+
+
+async def receive_ai_reply(communicator):
+    """Frames up to and including the next AI reply or error."""
+    frames = []
+    while True:
+        frames.append(await communicator.receive_json_from(timeout=5))
+        if frames[-1].get('sender') == 'ai' or frames[-1]['type'] == 'error':
+            return frames
+
+
+class SessionReplayTests(TestCase):
+    """Sequence numbers, replay and client message dedupe of the replay buffer"""
+
+    def setUp(self):
+        cache.clear()
+        self.buffer = SessionReplayBuffer(size=5, timeout=60)
+
+    def test_concurrent_appends_get_distinct_increasing_seqs(self):
+        async def append_all():
+            return await asyncio.gather(*(self.buffer.append(1, {'n': n}) for n in range(20)))
+
+        self.assertEqual(sorted(async_to_sync(append_all)()), list(range(1, 21)))
+        self.assertEqual(self.buffer.last_seq(1), 20)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'replay-short', 'TIMEOUT': 1,
+    }})
+    def test_seq_outlives_the_default_cache_timeout(self):
+        async_to_sync(self.buffer.append)(1, {'n': 1})
+        time.sleep(1.1)
+        self.assertEqual(async_to_sync(self.buffer.append)(1, {'n': 2}), 2)
+
+    def test_frames_since(self):
+        for n in range(1, 4):
+            async_to_sync(self.buffer.append)(1, {'type': 'chat_message', 'n': n})
+
+        frames = async_to_sync(self.buffer.frames_since)(1, 1)
+        self.assertEqual([(frame['seq'], frame['n']) for frame in frames], [(2, 2), (3, 3)])
+        self.assertEqual(async_to_sync(self.buffer.frames_since)(1, 3), [])
+        # A client ahead of the server, or further behind than the buffer reaches, must resync
+        self.assertIsNone(async_to_sync(self.buffer.frames_since)(1, 4))
+        for n in range(4, 9):
+            async_to_sync(self.buffer.append)(1, {'type': 'chat_message', 'n': n})
+        self.assertIsNone(async_to_sync(self.buffer.frames_since)(1, 2))
+        self.assertEqual(len(async_to_sync(self.buffer.frames_since)(1, 3)), 5)
+
+    def test_claim_client_message(self):
+        claim = async_to_sync(self.buffer.claim_client_message)
+        self.assertTrue(claim(1, 'm1'))
+        self.assertFalse(claim(1, 'm1'))
+        self.assertTrue(claim(2, 'm1'))
+        self.assertTrue(claim(1, None))
+        self.assertTrue(claim(1, None))
+        async_to_sync(self.buffer.release_client_message)(1, 'm1')
+        self.assertTrue(claim(1, 'm1'))
+
+    @override_settings(**CONSUMER_SETTINGS)
+    def test_resent_message_is_answered_once_and_after_a_failure(self):
+        user = User.objects.create_user(username='candidate', password='password123')
+        problem = Problem.objects.create(title='Two Sum', description='Find two numbers.', difficulty='easy')
+        session = InterviewSession.objects.create(user=user, problem=problem, status='active')
+        message = {'type': 'chat_message', 'message': 'Should I sort first?', 'client_msg_id': 'm1'}
+
+        async def interview():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/interview/{session.id}/")
+            await communicator.connect()
+            # The first attempt fails, so the resend is processed
+            await communicator.send_json_to(message)
+            failed = await receive_ai_reply(communicator)
+            await communicator.send_json_to(message)
+            answered = await receive_ai_reply(communicator)
+            # Once answered, a resend is ignored and the reply comes through resume instead
+            await communicator.send_json_to(message)
+            await communicator.send_json_to({'type': 'resume', 'last_seq': failed[-1]['seq']})
+            replayed = [await communicator.receive_json_from(timeout=5) for _ in answered]
+            self.assertTrue(await communicator.receive_nothing(0.1))
+            await communicator.disconnect()
+            return failed, answered, replayed
+
+        with mock.patch('ai_interview.consumers.AIInterviewAgent.provide_guidance',
+                        side_effect=[RuntimeError('LLM unavailable'), 'Sorting costs O(n log n).']) as guidance:
+            failed, answered, replayed = async_to_sync(interview)()
+
+        self.assertEqual(guidance.call_count, 2)
+        self.assertEqual(failed[-1]['type'], 'error')
+        self.assertEqual(answered[-1]['message'], 'Sorting costs O(n log n).')
+        self.assertEqual(replayed, answered)
+        seqs = [frame['seq'] for frame in failed + answered]
+        self.assertEqual(seqs, sorted(set(seqs)))
+
+
+@override_settings(**CONSUMER_SETTINGS)
+class SubscriberFanoutTests(TestCase):
+    """Frames go straight to the socket of a lone subscriber and through the group otherwise"""
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='candidate', password='password123')
+        problem = Problem.objects.create(title='Two Sum', description='Find two numbers.', difficulty='easy',
+                                         hints=['Use a hash map'])
+        self.session = InterviewSession.objects.create(user=user, problem=problem, status='active')
+        self.path = f"/ws/interview/{self.session.id}/"
+
+    def sent(self):
+        return {fanout: histogram('channel.send', fanout=fanout).snapshot()['count'] for fanout in ('direct', 'group')}
+
+    def test_fanout_follows_subscribers(self):
+        fanouts = []
+
+        async def hint(communicator, *others):
+            before = self.sent()
+            await communicator.send_json_to({'type': 'request_hint', 'hint_level': 1})
+            reply = await receive_ai_reply(communicator)
+            for other in others:
+                self.assertEqual(await receive_ai_reply(other), reply)
+            after = self.sent()
+            fanouts.append('direct' if after['direct'] > before['direct'] else 'group')
+
+        async def interview():
+            first = WebsocketCommunicator(URLRouter(websocket_urlpatterns), self.path)
+            await first.connect()
+            await hint(first)
+
+            second = WebsocketCommunicator(URLRouter(websocket_urlpatterns), self.path)
+            await second.connect()
+            await first.receive_nothing(0.05)
+            await hint(first, second)
+            await hint(second, first)
+
+            await second.disconnect()
+            await first.receive_nothing(0.05)
+            await hint(first)
+
+            # A peer that vanished without subscriber.left is dropped once it
+            # misses a presence check, and the fast path comes back
+            await get_channel_layer().group_send(f"session_{self.session.id}", {
+                'type': 'subscriber.joined', 'channel': 'crashed-worker.channel',
+            })
+            await first.receive_nothing(0.05)
+            await hint(first)
+            with override_settings(INTERVIEW_PRESENCE_CHECK_INTERVAL=0):
+                await hint(first)
+                await first.receive_nothing(0.05)
+                await hint(first)
+            await first.disconnect()
+
+        async_to_sync(interview)()
+        self.assertEqual(fanouts, ['direct', 'group', 'group', 'direct', 'group', 'group', 'direct'])
+
+
+class ChatMessageWriterTests(TestCase):
+    """Write-behind persistence of chat messages"""
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='candidate', password='password123')
+        problem = Problem.objects.create(title='Two Sum', description='Find two numbers.', difficulty='easy')
+        self.session = InterviewSession.objects.create(user=user, problem=problem, status='active')
+        # Flushed explicitly on the test thread; the background thread never starts
+        self.writer = ChatMessageWriter(batch_size=3, flush_interval=60)
+        patcher = mock.patch.object(ChatMessageWriter, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def transcript(self):
+        return list(self.session.messages.values_list('message_type', 'content'))
+
+    def test_batch_is_written_in_enqueue_order(self):
+        self.writer.enqueue(self.session.id, 'user', 'first')
+        self.writer.enqueue(self.session.id, 'ai', 'second')
+        self.assertFalse(self.writer._wakeup.is_set())
+        self.writer.enqueue(self.session.id, 'user', 'third')
+        # A full batch wakes the writer thread
+        self.assertTrue(self.writer._wakeup.is_set())
+        self.assertEqual(self.transcript(), [])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.writer.flush(), 3)
+        self.assertEqual(self.writer.pending_count(), 0)
+        self.assertEqual(self.transcript(), [('user', 'first'), ('ai', 'second'), ('user', 'third')])
+        self.assertEqual(self.writer.flush(), 0)
+
+    @override_settings(CHAT_MESSAGE_WRITE_BEHIND=False)
+    def test_without_write_behind_messages_are_saved_inline(self):
+        async_to_sync(self.writer.aenqueue)(self.session.id, 'user', 'saved now')
+        self.assertEqual(self.writer.pending_count(), 0)
+        self.assertEqual(self.transcript(), [('user', 'saved now')])
+
+    def test_consumer_flushes_on_disconnect(self):
+        async def interview():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/interview/{self.session.id}/")
+            await communicator.connect()
+            await communicator.send_json_to({'type': 'chat_message', 'message': 'Should I sort first?'})
+            await receive_ai_reply(communicator)
+            self.assertEqual(self.writer.pending_count(), 2)
+            await communicator.disconnect()
+
+        with override_settings(**CONSUMER_SETTINGS, LLM_BACKEND='ai_interview.llm_backends.StandInBackend',
+                               LLM_BACKEND_OPTIONS={}), \
+                mock.patch('ai_interview.consumers.chat_message_writer', self.writer):
+            async_to_sync(interview)()
+
+        self.assertEqual(self.writer.pending_count(), 0)
+        self.assertEqual([message_type for message_type, _ in self.transcript()], ['user', 'ai'])
+
+    def test_transcript_is_saved_before_the_end_of_interview_close(self):
+        async def interview():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/interview/{self.session.id}/")
+            await communicator.connect()
+            await communicator.send_json_to({'type': 'end_interview'})
+            while (await communicator.receive_output(timeout=5))['type'] != 'websocket.close':
+                pass
+            # Nothing waits for the disconnect: the client loads the results page now
+            return self.writer.pending_count(), await database_sync_to_async(self.transcript)()
+
+        with override_settings(**CONSUMER_SETTINGS), \
+                mock.patch('ai_interview.consumers.chat_message_writer', self.writer):
+            pending, transcript = async_to_sync(interview)()
+
+        self.assertEqual(pending, 0)
+        self.assertEqual([message_type for message_type, _ in transcript], ['ai'])
+
+    def test_timestamp_is_the_enqueue_time(self):
+        self.writer.enqueue(self.session.id, 'user', 'first')
+        enqueued_by = timezone.now()
+        time.sleep(0.01)
+        self.writer.flush()
+        self.assertLessEqual(self.session.messages.get().timestamp, enqueued_by)
+
+    @override_settings(**CONSUMER_SETTINGS, CHAT_MESSAGE_WRITE_BEHIND=False,
+                       LLM_BACKEND='ai_interview.llm_backends.StandInBackend', LLM_BACKEND_OPTIONS={})
+    def test_consumer_without_write_behind(self):
+        async def interview():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/interview/{self.session.id}/")
+            await communicator.connect()
+            await communicator.send_json_to({'type': 'chat_message', 'message': 'Should I sort first?'})
+            reply = await receive_ai_reply(communicator)
+            await communicator.disconnect()
+            return reply
+
+        self.assertEqual(async_to_sync(interview)()[-1]['sender'], 'ai')
+        self.assertEqual([message_type for message_type, _ in self.transcript()], ['user', 'ai'])
+
+
+@override_settings(**CONSUMER_SETTINGS)
+class ConsumerSessionUpdateTests(TestCase):
+    """InterviewConsumer.update_session writes only the columns that changed"""
+
+    def test_update_session_saves_changed_fields_only(self):
+        user = User.objects.create_user(username='candidate', password='password123')
+        created = InterviewSession.objects.create(user=user, status='preparing', topic_preferences=['array'])
+        consumer = InterviewConsumer()
+        consumer.session = async_to_sync(consumer.get_session)(created.id)
+
+        with self.assertNumQueries(0):
+            async_to_sync(consumer.update_session)()
+
+        consumer.session.status = 'active'
+        # In-place changes to JSON fields count too
+        consumer.session.topic_preferences.append('graph')
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(consumer.update_session)()
+        self.assertEqual(len(queries), 1)
+        update = queries[0]['sql']
+        self.assertIn('"status"', update)
+        self.assertIn('"topic_preferences"', update)
+        self.assertNotIn('"difficulty_preference"', update)
+        self.assertNotIn('"started_at"', update)
+
+        # Saved values become the new baseline
+        with self.assertNumQueries(0):
+            async_to_sync(consumer.update_session)()
+        created.refresh_from_db()
+        self.assertEqual(created.status, 'active')
+        self.assertEqual(created.topic_preferences, ['array', 'graph'])
+
+
+class IntentMatcherTests(TestCase):
+    """The single-pass matcher agrees with the substring checks it replaced"""
+
+    # Keywords nested in, overlapping or repeated around other keywords
+    OVERLAPPING_MESSAGES = [
+        "segment tree", "hash tables and a hash table", "i would like to do two sum", "i want to do it",
+        "streets of strings", "dpdp", "two pointers, two pointer", "treetrees", "linked lists or a linked list",
+        "can we do a different problem", "easy or hard", "HARD then Easy", "fenwick treeheap", "",
+    ]
+
+    def messages(self):
+        return MATCHER_MESSAGES + self.OVERLAPPING_MESSAGES
+
+    def test_find_keywords_matches_substring_scan(self):
+        keywords = set(PROBLEM_REQUEST_KEYWORDS + CHANGE_KEYWORDS + DIFFICULTY_KEYWORDS +
+                       list(TOPIC_KEYWORDS) + NON_PROBLEM_NAME_WORDS)
+        for message in self.messages():
+            message_lower = message.lower()
+            with self.subTest(message=message):
+                self.assertEqual(
+                    find_keywords(message_lower),
+                    {keyword: message_lower.find(keyword) for keyword in keywords if keyword in message_lower},
+                )
+
+    def test_match_intent_matches_legacy(self):
+        for message in self.messages():
+            expected = legacy_match_intent(message)
+            # The legacy matcher predates the canonical topic slugs
+            expected['topics'] = [canonical_topic(topic) for topic in expected['topics']]
+            with self.subTest(message=message):
+                self.assertEqual(match_intent(message), expected)
+
+
+class TopicTests(TestCase):
+    """Interview topics map to LeetCode tag slugs and are filtered server-side"""
+
+    def test_canonical_topic(self):
+        cases = {
+            'array': 'array', 'arrays': 'array', 'Arrays ': 'array', 'dp': 'dynamic-programming',
+            'dynamic programming': 'dynamic-programming', 'dynamic-programming': 'dynamic-programming',
+            'hash tables': 'hash-table', 'two-pointers': 'two-pointers', 'heap': 'heap-priority-queue',
+            'fenwick-tree': 'binary-indexed-tree', 'linked lists': 'linked-list', 'Union Find': 'union-find',
+            'quantum': None, '': None, None: None,
+        }
+        for topic, slug in cases.items():
+            with self.subTest(topic=topic):
+                self.assertEqual(canonical_topic(topic), slug)
+
+    def test_problems_variables_filter_by_tag(self):
+        service = LeetCodeService()
+        self.assertEqual(service._problems_variables('Medium', 'trees', 20), {
+            'categorySlug': '', 'limit': 20, 'skip': 0,
+            'filters': {'difficulty': 'MEDIUM', 'tags': ['tree']},
+        })
+        self.assertEqual(service._problems_variables(topic='Fenwick Tree')['filters'], {'tags': ['binary-indexed-tree']})
+        # Unknown topics are passed through in slug form
+        self.assertEqual(service._problems_variables(topic='Bit Manipulation')['filters'], {'tags': ['bit-manipulation']})
+        self.assertEqual(service._problems_variables()['filters'], {})
+
+
+class ProblemPoolTests(TestCase):
+    """Random sampling from the (difficulty, topic) pools with per-user exclusions"""
+
+    def setUp(self):
+        self.fetches = []
+
+        def fetch_problems(difficulty=None, topic=None, limit=None):
+            self.fetches.append((difficulty, topic))
+            return [{'frontendQuestionId': str(id), 'titleSlug': f'problem-{id}'} for id in range(1, 41)] + [
+                {'titleSlug': 'no-id'}, {'frontendQuestionId': 'abc'},
+            ]
+
+        self.pools = ProblemPoolIndex(fetch_problems, pool_size=100, ttl=60)
+
+    def test_id_bitset(self):
+        ids = IdBitset([3, '17', 3, 0])
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(list(ids), [0, 3, 17])
+        self.assertIn(17, ids)
+        self.assertIn('3', ids)
+        for missing in (1, 16, 18, 10 ** 6, -1, -5, None, 'abc'):
+            self.assertNotIn(missing, ids)
+        with self.assertRaises(ValueError):
+            ids.add(-1)
+        # A rejected negative id must not alias an existing one
+        self.assertEqual(list(ids), [0, 3, 17])
+
+    def test_pool_is_fetched_once(self):
+        self.assertEqual(list(self.pools.get_pool('Easy', 'Array')), list(range(1, 41)))
+        self.pools.get_pool('easy', 'array')
+        self.assertEqual(self.fetches, [('Easy', 'Array')])
+        self.assertEqual(self.pools.question(7)['titleSlug'], 'problem-7')
+
+    def test_concurrent_misses_share_one_fetch(self):
+        fetch_started, release = threading.Event(), threading.Event()
+        fetch = self.pools.fetch_problems
+
+        def slow_fetch(**kwargs):
+            fetch_started.set()
+            release.wait(5)
+            return fetch(**kwargs)
+
+        self.pools.fetch_problems = slow_fetch
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(self.pools.get_pool, 'easy', 'array') for _ in range(4)]
+            fetch_started.wait(5)
+            time.sleep(0.05)
+            release.set()
+            results = [list(future.result()) for future in futures]
+        self.assertEqual(len(self.fetches), 1)
+        self.assertEqual(results, [list(range(1, 41))] * 4)
+
+    def test_sample_skips_excluded_ids(self):
+        exclude = IdBitset(range(1, 40))
+        for _ in range(20):
+            self.assertEqual(self.pools.sample('easy', exclude=exclude)['frontendQuestionId'], '40')
+        self.assertIn(int(self.pools.sample('easy')['frontendQuestionId']), range(1, 41))
+
+    def test_sample_falls_back_to_scanning_the_rest(self):
+        exclude = IdBitset(range(1, 40))
+        with mock.patch('ai_interview.problem_pools.random.randrange', return_value=0) as randrange:
+            self.assertEqual(self.pools.sample('easy', exclude=exclude)['frontendQuestionId'], '40')
+        self.assertEqual(randrange.call_count, ProblemPoolIndex.MAX_SAMPLE_ATTEMPTS)
+
+    def test_sample_with_everything_excluded(self):
+        self.assertIsNone(self.pools.sample('easy', exclude=IdBitset(range(1, 41))))
+        empty = ProblemPoolIndex(lambda **kwargs: [])
+        self.assertIsNone(empty.sample('easy'))
+
+
+@override_settings(KRONOS_API_KEY='test-key', PROBLEM_WARMER_ENABLED=False)
+class SelectProblemQueryCountTests(TestCase):
+    """select_problem must not issue more queries as a user's history grows"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='candidate', password='password123')
+        self.next_problem = Problem.objects.create(
+            leetcode_id=1000, title_slug='next-problem', title='Next Problem',
+            description='...', difficulty='easy', function_signature='class Solution: pass'
+        )
+
+    def give_history(self, first_id, last_id):
+        for leetcode_id in range(first_id, last_id + 1):
+            problem = Problem.objects.create(
+                leetcode_id=leetcode_id, title_slug=f'problem-{leetcode_id}',
+                title=f'Problem {leetcode_id}', description='...', difficulty='easy'
+            )
+            UserProblem.objects.create(user=self.user, problem=problem)
+
+    def new_session(self, topics=('graph',)):
+        # next_problem has no topics, so by default nothing is pre-materialised
+        # for the session and selection goes to LeetCode
+        return InterviewSession.objects.create(
+            user=self.user, difficulty_preference='easy', topic_preferences=list(topics)
+        )
+
+    def select_problem(self, session):
+        """Run select_problem against a canned LeetCode pick; returns (query count, exclude_ids passed)."""
+        leetcode_problem = {
+            'frontendQuestionId': '1000', 'titleSlug': 'next-problem',
+            'title': 'Next Problem', 'difficulty': 'Easy', 'topicTags': []
+        }
+        agent = AIInterviewAgent()
+        with mock.patch('ai_interview.ai_agent.leetcode_service.get_random_problem', return_value=leetcode_problem) as get_random_problem:
+            with CaptureQueriesContext(connection) as context:
+                problem = agent.select_problem(session)
+        self.assertEqual(problem, self.next_problem)
+        return len(context.captured_queries), get_random_problem.call_args.kwargs['exclude_ids']
+
+    def test_exclusion_set_is_one_query(self):
+        self.give_history(1, 25)
+        session = self.new_session()
+
+        with self.assertNumQueries(1):
+            excluded = get_excluded_problem_ids(session)
+        self.assertEqual(excluded, frozenset(range(1, 26)))
+
+        # Cached for the rest of the session
+        with self.assertNumQueries(0):
+            get_excluded_problem_ids(session)
+
+    def test_query_count_independent_of_history(self):
+        self.give_history(1, 2)
+        short_history_queries, _ = self.select_problem(self.new_session())
+
+        UserProblem.objects.filter(problem=self.next_problem).delete()
+        self.give_history(3, 40)
+        long_history_queries, exclude_ids = self.select_problem(self.new_session())
+
+        self.assertEqual(short_history_queries, long_history_queries)
+        self.assertEqual(len(exclude_ids), 40)
+
+    def test_assignment_updates_cached_exclusions(self):
+        session = self.new_session()
+        self.select_problem(session)
+        with self.assertNumQueries(0):
+            self.assertIn(1000, get_excluded_problem_ids(session))
+
+    def test_prefers_pre_materialised_problem(self):
+        session = self.new_session(topics=())
+        agent = AIInterviewAgent()
+        with mock.patch('ai_interview.ai_agent.leetcode_service.get_random_problem') as get_random_problem:
+            self.assertEqual(agent.select_problem(session), self.next_problem)
+        get_random_problem.assert_not_called()
+
+    def test_pre_materialised_problems_exclude_history(self):
+        self.assertIn(self.next_problem, ready_problems('easy', None, self.user.id))
+        UserProblem.objects.create(user=self.user, problem=self.next_problem)
+        self.assertNotIn(self.next_problem, ready_problems('easy', None, self.user.id))
+
+    def test_warmer_pools_are_shared_between_users(self):
+        # The pool is full even though this user has seen every row in it
+        UserProblem.objects.create(user=self.user, problem=self.next_problem)
+        warmer = ProblemWarmer(ready_count=1)
+        with mock.patch('ai_interview.problem_warmer.leetcode_service.pools.sample') as sample:
+            self.assertEqual(warmer.warm('easy', None), 0)
+        sample.assert_not_called()
+
+        # The user's history is only excluded when a row is chosen
+        problem_7 = Problem.objects.create(leetcode_id=7, title_slug='problem-7', title='Problem 7',
+                                           description='...', difficulty='easy', function_signature='pass')
+        with mock.patch('ai_interview.ai_agent.leetcode_service.get_random_problem') as get_random_problem, \
+                mock.patch('ai_interview.ai_agent.problem_warmer.request') as request:
+            self.assertEqual(AIInterviewAgent().select_problem(self.new_session(topics=())), problem_7)
+        get_random_problem.assert_not_called()
+        request.assert_called_once_with('easy', None)
+
+
+class SessionPrefetchTests(TestCase):
+    """Starting a session warms what its first turns need"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='candidate', password='password123')
+        InterviewSession.objects.create(user=self.user, difficulty_preference='hard', topic_preferences=['graphs'])
+        InterviewSession.objects.create(user=self.user, difficulty_preference='easy', topic_preferences=['arrays'])
+        InterviewSession.objects.create(user=self.user, difficulty_preference='easy', topic_preferences=['array'])
+
+    def test_prefetch_warms_exclusions_and_likely_pools(self):
+        session = InterviewSession.objects.create(user=self.user, status='preparing')
+        with mock.patch('ai_interview.session_prefetch.leetcode_service.pools.get_pool') as get_pool, \
+                mock.patch('ai_interview.session_prefetch.problem_warmer.request') as request, \
+                mock.patch('ai_interview.session_prefetch.voice_service.is_available', return_value=False):
+            prefetch_session(session)
+
+        self.assertCountEqual(
+            [call.args for call in get_pool.call_args_list],
+            [('easy', 'array'), ('hard', 'graph')]
+        )
+        request.assert_any_call('easy', 'array')
+        with self.assertNumQueries(0):
+            get_excluded_problem_ids(session)
+
+
+class ProblemParserTests(TestCase):
+    """The single-pass parser against the fixture corpus in testdata/problems"""
+
+    def test_matches_expected_output(self):
+        for slug, content in load_problem_contents().items():
+            with self.subTest(slug):
+                expected = json.loads((PROBLEM_CONTENT_DIR / f'{slug}.json').read_text())
+                self.assertEqual(parse_problem_content(content), expected)
+
+    def test_agrees_with_regex_parser(self):
+        for slug, content in load_problem_contents().items():
+            with self.subTest(slug):
+                self.assertEqual(regex_disagreements(content), [])
+
+    def test_unlabelled_examples_fall_back_to_regex(self):
+        parsed = parse_problem_content('<p>Add two numbers.</p>\nExample 1: Input: a = 1, b = 2 Output: 3')
+        self.assertEqual(parsed['examples'], [{'input': 'a = 1, b = 2', 'output': '3', 'explanation': None}])
+
+    def test_parses_are_memoized_by_content_hash(self):
+        content = load_problem_contents()['two-sum']
+        cache = ParsedContentCache()
+        first = cache.parse(content)
+        with self.assertNumQueries(0), mock.patch('ai_interview.problem_parser.parse_problem_content') as parse:
+            self.assertEqual(cache.parse(content), first)
+        parse.assert_not_called()
+
+        # A fresh process finds the stored parse instead of parsing again
+        with self.assertNumQueries(1), mock.patch('ai_interview.problem_parser.parse_problem_content') as parse:
+            self.assertEqual(ParsedContentCache().parse(content), first)
+        parse.assert_not_called()
+
+    def test_parser_version_invalidates_stored_parses(self):
+        content = load_problem_contents()['two-sum']
+        ParsedContentCache().parse(content)
+        with mock.patch('ai_interview.problem_parser.PARSER_VERSION', 2), \
+                mock.patch('ai_interview.problem_parser.parse_problem_content', wraps=parse_problem_content) as parse:
+            ParsedContentCache().parse(content)
+        parse.assert_called_once()
+        # Old parses stay for processes still on the old version until pruned explicitly
+        versions = ParsedProblemContent.objects.order_by('parser_version').values_list('parser_version', flat=True)
+        self.assertEqual(list(versions), [1, 2])
+        with mock.patch('ai_interview.problem_parser.PARSER_VERSION', 2):
+            call_command('prune_parsed_content', stdout=io.StringIO())
+        self.assertEqual(list(versions.all()), [2])
+
+
+class OutputNormalizerTests(TestCase):
+    """Expected values derived from example outputs"""
+
+    def test_matches_previous_cleaning(self):
+        for output in load_example_outputs():
+            with self.subTest(output):
+                self.assertEqual(clean_expected_output(output), legacy_clean_output(output))
+                self.assertEqual(format_expected_output(output), legacy_format_output(output))
+
+    def test_typed_expected_values(self):
+        cases = {
+            '[0,1]': ('[0,1]', [0, 1]),
+            'true': ('True', True),
+            '"bab"': ('bab', 'bab'),
+            '[["bat"],["nat","tan"]]': ('[[bat],[nat,tan]]', [['bat'], ['nat', 'tan']]),
+            '2.00000': ('2.00000', 2.0),
+            '[1,null,2]': ('[1,null,2]', [1, None, 2]),
+            '<span class="example-io">7</span>': ('7', 7),
+            '1\nExplanation: one island': ('1', 1),
+        }
+        for output, expected in cases.items():
+            with self.subTest(output):
+                self.assertEqual(normalize_output(output), expected)
+
+
+class CatalogFetchTests(TestCase):
+    """Paginated catalog fetch and the LeetCodeQuestion mirror"""
+
+    def setUp(self):
+        self.catalog = [
+            {'frontendQuestionId': str(number), 'titleSlug': f'problem-{number}', 'title': f'Problem {number}',
+             'difficulty': 'Easy', 'paidOnly': number % 10 == 0, 'topicTags': [{'slug': 'array'}], 'acRate': 50.0}
+            for number in range(1, 251)
+        ]
+        self.failing_skips = {100}
+
+    def fetch_problem_page(self, skip, limit, filters=None, query=None):
+        if skip in self.failing_skips:
+            self.failing_skips.discard(skip)
+            raise ConnectionError('reset by peer')
+        return {'total': len(self.catalog), 'questions': self.catalog[skip:skip + limit]}
+
+    def test_failed_pages_are_resumed_and_merged_in_order(self):
+        service = LeetCodeService()
+        with mock.patch.object(service, 'fetch_problem_page', side_effect=self.fetch_problem_page) as fetch_page:
+            partial = service.fetch_catalog(page_size=100, workers=3)
+            self.assertFalse(partial.complete)
+            self.assertEqual(list(partial.failed), [100])
+
+            fetch_page.reset_mock()
+            fetch = service.fetch_catalog(page_size=100, workers=3, resume=partial)
+        # Only the missing page was requested again
+        self.assertEqual([call.args[0] for call in fetch_page.call_args_list], [100])
+        self.assertTrue(fetch.complete)
+        self.assertEqual(fetch.questions(), self.catalog)
+
+    def test_mirror_upserts_by_slug(self):
+        mirror_catalog(self.catalog)
+        self.catalog[0]['difficulty'] = 'Medium'
+        mirror_catalog(self.catalog[:1])
+        self.assertEqual(LeetCodeQuestion.objects.count(), 250)
+        self.assertEqual(LeetCodeQuestion.objects.get(leetcode_id=1).difficulty, 'medium')
+        self.assertEqual(LeetCodeQuestion.objects.filter(paid_only=True).count(), 25)
+
+    def test_incremental_refresh_writes_only_the_delta(self):
+        mirror_catalog(self.catalog)
+        problem = Problem.objects.create(
+            leetcode_id=2, title_slug='problem-2', title='Problem 2', difficulty='easy', topics=['array'],
+            description='Old', function_signature='def solve(self):', content_hash='stale',
+        )
+        self.catalog[1]['difficulty'] = 'Hard'
+        self.catalog.append({'frontendQuestionId': '251', 'titleSlug': 'problem-251', 'title': 'Problem 251',
+                             'difficulty': 'Easy', 'paidOnly': False, 'topicTags': []})
+        self.failing_skips = set()
+
+        with mock.patch.object(leetcode_service, 'fetch_problem_page', side_effect=self.fetch_problem_page):
+            summary = refresh_catalog(page_size=100, workers=3)
+        self.assertEqual((summary['new'], summary['beyond_known_max'], summary['changed']), (1, 1, 1))
+        self.assertEqual(LeetCodeQuestion.objects.count(), 251)
+        problem.refresh_from_db()
+        self.assertEqual(problem.difficulty, 'hard')
+
+        details = {'content': '<p>Return the answer.</p>', 'codeSnippets': [], 'exampleTestcases': ''}
+        with mock.patch.object(leetcode_service, 'get_problem_details', return_value=details):
+            self.assertEqual(refresh_problem_content(workers=2)['rematerialized'], 1)
+            # The stored hash now matches, so a second pass has nothing to do
+            self.assertEqual(refresh_problem_content(workers=2)['rematerialized'], 0)
+        problem.refresh_from_db()
+        self.assertEqual(problem.description, 'Return the answer.')
+
+    def test_rematerialized_problem_ignores_stale_cached_details(self):
+        cache.clear()
+        problem = Problem.objects.create(
+            leetcode_id=2, title_slug='problem-2', title='Problem 2', difficulty='easy', topics=['array'],
+            description='Old', function_signature='def old(self):', content_hash='stale',
+        )
+
+        def question(content, code, testcases):
+            return {'data': {'question': {
+                'content': content, 'exampleTestcases': testcases,
+                'codeSnippets': [{'lang': 'Python3', 'langSlug': 'python3', 'code': code}],
+            }}}
+
+        key = leetcode_service._response_cache_key(leetcode_service.PROBLEM_DETAILS_QUERY, {'titleSlug': 'problem-2'})
+        cache.set(key, question('<p>Old.</p>', 'def old(self):', '1\n1'))
+        fresh = question('<p>Return the answer.</p>', 'def solve(self, n: int) -> int:', '2\n4')
+        with mock.patch.object(leetcode_service, '_post_graphql', return_value=fresh):
+            self.assertEqual(refresh_problem_content(workers=1)['rematerialized'], 1)
+
+        problem.refresh_from_db()
+        self.assertEqual(problem.description, 'Return the answer.')
+        self.assertEqual(problem.function_signature, 'def solve(self, n: int) -> int:')
+        self.assertEqual([(case['input'], case['expected']) for case in problem.test_cases], [('2', '4')])
+
+
+@override_settings(LEETCODE_RETRY_BACKOFF=0)
+class LeetCodeClientTests(TestCase):
+    """Retries and the response cache shared by the sync and async clients"""
+
+    def setUp(self):
+        cache.clear()
+        self.responses = [httpx.Response(503), httpx.Response(200, json={'data': {'question': {'content': '<p>x</p>'}}})]
+        self.requests = []
+
+    def handle(self, request):
+        self.requests.append(json.loads(request.content))
+        return self.responses.pop(0)
+
+    def test_async_fetch_retries_and_fills_the_shared_cache(self):
+        service = LeetCodeService()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+        async def fetch():
+            async with client:
+                return await service.aget_problem_details('two-sum')
+
+        with mock.patch.object(service, '_async_client', return_value=client):
+            details = asyncio.run(fetch())
+        self.assertEqual(details['content'], '<p>x</p>')
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[0]['variables'], {'titleSlug': 'two-sum'})
+
+        # The sync client is served from the same cache without a request
+        with mock.patch.object(service, '_thread_session', side_effect=AssertionError('not cached')):
+            self.assertEqual(service.get_problem_details('two-sum'), details)
+
+    def test_concurrent_identical_requests_are_coalesced(self):
+        service = LeetCodeService()
+        started = threading.Barrier(10)
+
+        def post(*args, **kwargs):
+            time.sleep(0.1)
+            response = requests.Response()
+            response.status_code, response._content = 200, b'{"data": {"question": {"content": "<p>x</p>"}}}'
+            return response
+
+        http = mock.Mock()
+        http.post.side_effect = post
+
+        def fetch(_):
+            started.wait()
+            return service.get_problem_details('two-sum')
+
+        with mock.patch.object(service, '_thread_session', return_value=http), \
+                ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(fetch, range(10)))
+        self.assertEqual(http.post.call_count, 1)
+        self.assertEqual({result['content'] for result in results}, {'<p>x</p>'})
+
+    def test_graphql_errors_are_not_cached(self):
+        service = LeetCodeService()
+        self.responses = [
+            httpx.Response(200, json={'errors': [{'message': 'rate limited'}], 'data': None}),
+            httpx.Response(200, json={'data': None}),
+            httpx.Response(200, json={'data': {'question': {'content': '<p>x</p>'}}}),
+        ]
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+        async def fetch():
+            async with client:
+                return [await service.aget_problem_details('two-sum') for _ in range(4)]
+
+        with mock.patch.object(service, '_async_client', return_value=client):
+            results = asyncio.run(fetch())
+        self.assertEqual(results[:2], [{}, {}])
+        self.assertEqual([result['content'] for result in results[2:]], ['<p>x</p>', '<p>x</p>'])
+        self.assertEqual(len(self.requests), 3)
+
+
+@override_settings(KRONOS_API_KEY='test-key', PROBLEM_WARMER_ENABLED=False, LEETCODE_RETRY_BACKOFF=0)
+class LeetCodeCircuitBreakerTests(TestCase):
+    """Requests stop once LeetCode keeps failing, and selection is served locally"""
+
+    def setUp(self):
+        cache.clear()
+        self.http = mock.Mock()
+        self.http.post.side_effect = requests.ConnectionError('connection refused')
+        patches = [
+            mock.patch.object(leetcode_service, 'breaker', CircuitBreaker(failure_threshold=3, reset_timeout=30)),
+            mock.patch.object(leetcode_service, 'pools', ProblemPoolIndex(leetcode_service._pool_problems)),
+            mock.patch.object(leetcode_service, '_thread_session', return_value=self.http),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_open_breaker_falls_back_to_mirror_and_stored_problems(self):
+        # Three failed calls open the breaker; each call's retries count once
+        for expected_available in (True, True, False):
+            self.assertEqual(leetcode_service.get_problems('easy'), [])
+            self.assertEqual(leetcode_service.available(), expected_available)
+        self.assertEqual(leetcode_service.get_problem_details('two-sum', use_cache=False), None)
+        self.assertEqual(self.http.post.call_count, 9)
+
+        user = User.objects.create_user(username='candidate', password='password123')
+        stored = Problem.objects.create(
+            leetcode_id=1, title_slug='two-sum', title='Two Sum', difficulty='medium',
+            description='...', function_signature='class Solution: pass'
+        )
+        mirror_catalog([{'frontendQuestionId': '5', 'titleSlug': 'longest-palindrome', 'title': 'Longest Palindrome',
+                         'difficulty': 'Easy', 'topicTags': [{'slug': 'string'}]}])
+        session = InterviewSession.objects.create(user=user, difficulty_preference='easy', topic_preferences=['string'])
+
+        self.assertEqual(AIInterviewAgent().select_problem(session), stored)
+        # The pool came from the mirror; its question could not be materialized offline
+        self.assertEqual(leetcode_service.pools.question(5)['titleSlug'], 'longest-palindrome')
+        self.assertEqual(self.http.post.call_count, 9)
+
+    def test_forbidden_responses_open_the_breaker(self):
+        response = requests.Response()
+        response.status_code, response._content = 403, b'Forbidden'
+        self.http.post.side_effect = None
+        self.http.post.return_value = response
+
+        for _ in range(3):
+            self.assertIsNone(leetcode_service.get_problem_details('two-sum', use_cache=False))
+        # 403 is not retried, and each refused call counts against the breaker
+        self.assertEqual(self.http.post.call_count, 3)
+        self.assertFalse(leetcode_service.available())
+        self.assertIsNone(leetcode_service.get_problem_details('two-sum', use_cache=False))
+        self.assertEqual(self.http.post.call_count, 3)
+
+
+@override_settings(LEETCODE_RETRY_BACKOFF=0)
+class LeetCodeStandInTests(TestCase):
+    """LeetCodeService against the offline GraphQL stand-in"""
+
+    def setUp(self):
+        cache.clear()
+        self.standin = LeetCodeStandIn()
+        self.server = start_standin(self.standin)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        with override_settings(LEETCODE_GRAPHQL_URL=graphql_url(self.server)):
+            self.service = LeetCodeService()
+
+    def test_selection_queries_are_answered_from_fixtures(self):
+        titles = {problem['title'] for problem in self.service.get_problems('easy', 'string')}
+        self.assertEqual(titles, {'Valid Parentheses', 'Length of Last Word'})
+        self.assertIn('def twoSum(self, nums: List[int], target: int)', self.service.get_official_function_signature('two-sum'))
+        test_cases = self.service.get_official_test_cases('two-sum')
+        self.assertEqual(test_cases[0]['expected_value'], [0, 1])
+        self.assertIsNone(self.service.get_problem_details('not-recorded'))
+
+        # Recording from the stand-in reproduces its fixtures
+        with tempfile.TemporaryDirectory() as recorded:
+            counts = record_fixtures(self.service, recorded, ['two-sum'], catalog_page_size=3)
+            self.assertEqual(counts, {'questions': 8, 'details': 1})
+            self.assertEqual(LeetCodeStandIn(recorded).questions, self.standin.questions)
+            self.assertEqual(LeetCodeStandIn(recorded).question('two-sum'), self.standin.question('two-sum'))
+
+    def test_injected_errors_are_retried(self):
+        self.standin.error_rate = 1.0
+        self.assertEqual(self.service.get_problems('easy'), [])
+        self.assertEqual(self.standin.requests, 3)
+
+
+@override_settings(LLM_BACKEND='ai_interview.llm_backends.StandInBackend', LLM_BACKEND_OPTIONS={})
+class StandInLLMTests(TestCase):
+    """The deterministic local LLM backend"""
+
+    def test_agent_uses_configured_backend(self):
+        agent = AIInterviewAgent()
+        self.assertIsInstance(agent.llm, StandInBackend)
+        session = InterviewSession(
+            user=User(username='candidate'),
+            problem=Problem(title='Two Sum', difficulty='easy', description='...'),
+        )
+        with mock.patch('ai_interview.ai_agent.ChatMessage.objects.filter') as history:
+            history.return_value.order_by.return_value = []
+            first = agent.provide_guidance('How do I start?', session)
+            self.assertEqual(agent.provide_guidance('How do I start?', session), first)
+        self.assertIn(first, [t.format(problem='Two Sum') for t in StandInBackend().templates['guidance']])
+
+    def test_streaming_timing_and_failures(self):
+        backend = StandInBackend(time_to_first_token=0.05, tokens_per_second=200)
+        prompt = 'Code review for: Two Sum\n\nCode:\npass'
+        started = time.monotonic()
+        chunks = backend.stream(prompt)
+        first = next(chunks)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        rest = list(chunks)
+        self.assertGreater(len(rest), 10)
+        self.assertEqual(first + ''.join(rest), backend.complete(prompt))
+        self.assertIn('Two Sum', backend.complete(prompt))
+
+        with self.assertRaises(LLMBackendError):
+            StandInBackend(failure_rate=1.0).complete(prompt)
+
+    def test_backends_must_implement_stream(self):
+        class Incomplete(LLMBackend):
+            pass
+
+        class Echo(LLMBackend):
+            def stream(self, prompt, temperature=0.5):
+                yield from prompt.split()
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+        self.assertEqual(Echo().complete('a b'), 'ab')
+
+
+class LoadTestStatsTests(TestCase):
+    """Latency summary of the WebSocket load test"""
+
+    def test_nearest_rank_percentiles_per_step(self):
+        stats = LoadTestStats()
+        for millis in range(1, 101):
+            stats.record('chat', millis / 1000)
+        stats.record('select', 2.0)
+        stats.error('timeout')
+        stats.finished_at = stats.started_at + 10
+
+        self.assertEqual(percentile([3, 1, 2], 0.5), 2)
+        summary = stats.summary()
+        self.assertEqual(summary['steps']['chat']['p95'], 0.095)
+        self.assertEqual(summary['steps']['chat']['p99'], 0.099)
+        self.assertEqual(summary['steps']['all']['count'], 101)
+        self.assertEqual(summary['steps']['all']['p99'], 0.1)
+        self.assertAlmostEqual(summary['replies_per_second'], 10.1)
+        self.assertEqual(summary['errors'], {'timeout': 1})
+
+    def test_refuses_to_reuse_existing_load_test_users(self):
+        User.objects.create_user(username='loadtest-1', password='password123')
+        with self.assertRaises(CommandError):
+            call_command('loadtest_interviews', candidates=3, stdout=io.StringIO())
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['loadtest-1'])
+        self.assertFalse(InterviewSession.objects.exists())
+
+
+class InstrumentationTests(TestCase):
+    """Timing spans feed histograms and structured span logs"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        latencies = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latencies.observe(value)
+        snapshot = latencies.snapshot()
+        self.assertEqual(snapshot['buckets'], [(0.1, 1), (1.0, 3), (float('inf'), 4)])
+        self.assertEqual(snapshot['count'], 4)
+        self.assertAlmostEqual(snapshot['sum'], 4.05)
+
+    def test_span_logs_session_and_records_duration(self):
+        before = histogram('test.work').snapshot()['count']
+
+        @span('test.work', kind='decorated')
+        async def work():
+            await asyncio.sleep(0)
+
+        async def interview_turn():
+            bind_session(42)
+            await work()
+            with self.assertRaises(ValueError):
+                with span('test.work') as timing:
+                    timing.set(status=500)
+                    raise ValueError
+
+        with self.assertLogs('ai_interview.spans', level='DEBUG') as logs:
+            asyncio.run(interview_turn())
+
+        self.assertEqual(histogram('test.work').snapshot()['count'], before + 2)
+        decorated, failed = (record.span for record in logs.records)
+        self.assertEqual((decorated['session_id'], decorated['kind']), (42, 'decorated'))
+        self.assertEqual((failed['status'], failed['error']), (500, 'ValueError'))
+        self.assertGreaterEqual(failed['duration_ms'], 0)
+
+
+@override_settings(METRICS_TOKEN=None)
+class MetricsTests(TestCase):
+    """Prometheus exposition summed across worker snapshots"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_worker_snapshots_are_summed(self):
+        counter('test_events_total', kind='a').inc(2)
+        histogram('test.latency', kind='a').observe(0.2)
+        local = local_snapshot()
+        merged = merge_snapshots([local, local])
+
+        self.assertEqual(merged['workers'], 2)
+        text = render(merged)
+        self.assertIn('ai_interview_test_events_total{kind="a"} 4', text)
+        self.assertIn('ai_interview_test_latency_seconds_bucket{kind="a",le="0.25"} 2', text)
+        self.assertIn('ai_interview_test_latency_seconds_count{kind="a"} 2', text)
+        self.assertIn('# TYPE ai_interview_problem_warmer_queue_depth gauge', text)
+
+    def test_scrape_reads_published_workers_without_queries(self):
+        counter('test_scrapes_total').inc()
+        snapshot = local_snapshot()
+        cache.set('metrics:workers', ['other-host:1', 'gone-host:2'])
+        cache.set('metrics:worker:other-host:1', snapshot)
+
+        with mock.patch.object(metrics_publisher, 'start'), self.assertNumQueries(0):
+            response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ai_interview_metrics_workers 2', response.content.decode())
+        self.assertEqual(cache.get('metrics:workers'), ['other-host:1'])
+
+    def test_process_local_cache_fails_the_system_check(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['ai_interview.E001'])
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/1',
+        }}):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+@override_settings(
+    KRONOS_API_KEY='test-key', PROBLEM_WARMER_ENABLED=False,
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    LLM_BACKEND='ai_interview.llm_backends.StandInBackend',
+    LLM_BACKEND_OPTIONS={'time_to_first_token': 0.02, 'tokens_per_second': 500},
+)
+class LatencyTimelineTests(TestCase):
+    """Turn latencies recorded by the consumer and saved with the session"""
+
+    def test_turn_rows_are_saved_on_disconnect(self):
+        cache.clear()
+        user = User.objects.create_user(username='candidate', password='password123')
+        problem = Problem.objects.create(title='Two Sum', description='Find two numbers.', difficulty='easy')
+        session = InterviewSession.objects.create(user=user, problem=problem, status='active')
+
+        async def interview():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/interview/{session.id}/")
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.send_json_to({'type': 'chat_message', 'message': 'Should I sort first?', 'client_msg_id': 'm1'})
+            while True:
+                frame = await communicator.receive_json_from(timeout=5)
+                if frame.get('sender') == 'ai':
+                    break
+            await communicator.send_json_to({'type': 'tts_ready', 'seq': frame['seq']})
+            await communicator.send_json_to({'type': 'resume', 'last_seq': frame['seq']})
+            await communicator.disconnect()
+
+        async_to_sync(interview)()
+        session.refresh_from_db()
+
+        self.assertEqual(len(session.latency_timeline), 1)
+        at, kind, first_token, reply, tts = session.latency_timeline[0]
+        self.assertEqual(kind, 'chat')
+        self.assertGreaterEqual(first_token, 20)
+        self.assertLessEqual(first_token, reply)
+        self.assertLessEqual(reply, tts)
+        self.assertGreaterEqual(at, 0)
+        self.assertEqual(timeline_summary(session.latency_timeline)['max_reply'], reply)
+
+
+QUERY_BUDGET_SETTINGS = dict(
+    KRONOS_API_KEY='test-key', PROBLEM_WARMER_ENABLED=False, SESSION_PREFETCH_ENABLED=False,
+    CHAT_MESSAGE_WRITE_BEHIND=False, METRICS_TOKEN=None,
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    LLM_BACKEND='ai_interview.llm_backends.StandInBackend', LLM_BACKEND_OPTIONS={},
+)
+
+
+@override_settings(**QUERY_BUDGET_SETTINGS)
+class QueryBudgetTests(TestCase):
+    """
+    Upper bounds on the queries of every view and consumer handler.
+
+    The candidate has several past interviews with messages and
+    submissions, so a per-row query (N+1) pushes a view over its budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='candidate', password='password123')
+        problems = [
+            Problem.objects.create(title=f'Problem {index}', description='Solve it.', difficulty='easy',
+                                   hints=['Use a hash map'], leetcode_id=index, title_slug=f'problem-{index}')
+            for index in range(6)
+        ]
+        for problem in problems[1:]:
+            past = InterviewSession.objects.create(user=cls.user, problem=problem, status='completed',
+                                                   performance_score=70)
+            InterviewSession.objects.filter(id=past.id).update(completed_at=past.started_at + timedelta(minutes=30))
+            for index in range(3):
+                ChatMessage.objects.create(session=past, message_type='user', content=f'Message {index}')
+            CodeSubmission.objects.create(session=past, code='pass')
+        cls.session = InterviewSession.objects.create(user=cls.user, problem=problems[0], status='active')
+        for index in range(4):
+            ChatMessage.objects.create(session=cls.session, message_type='ai', content=f'Reply {index}')
+        CodeSubmission.objects.create(session=cls.session, code='pass')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+
+    def assertQueryBudget(self, budget, method, path, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, **kwargs)
+        self.assertLess(response.status_code, 500, path)
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{method.upper()} {path} ran {len(queries)} queries:\n" + '\n'.join(q['sql'] for q in queries)
+        )
+        return response
+
+    def test_interview_views(self):
+        session_id = self.session.id
+        budgets = [
+            (2, 'get', '/'),
+            (2, 'get', '/ai-interview/start/'),
+            (4, 'get', f'/ai-interview/interview/{session_id}/'),
+            (5, 'get', f'/ai-interview/results/{session_id}/'),
+            (5, 'get', f'/ai-interview/api/session-data/{session_id}/'),
+            (3, 'get', f'/ai-interview/get-test-cases/{session_id}/'),
+            (3, 'get', f'/ai-interview/get-function-signature/{session_id}/'),
+            (2, 'get', '/ai-interview/api/available-voices/'),
+            (4, 'get', f'/ai-interview/api/last-ai-message/{session_id}/'),
+            (0, 'get', '/metrics'),
+        ]
+        for budget, method, path in budgets:
+            with self.subTest(path=path):
+                self.assertQueryBudget(budget, method, path)
+
+    def test_interview_write_views(self):
+        session_id = self.session.id
+        with override_settings(MEDIA_ROOT=self.media_root.name):
+            self.assertQueryBudget(3, 'post', '/ai-interview/start/')
+            self.assertQueryBudget(4, 'post', f'/ai-interview/api/submit-code/{session_id}/',
+                                   data={'code': 'pass'}, content_type='application/json')
+            with mock.patch('ai_interview.views.voice_service.generate_speech', return_value='UklGRg=='):
+                self.assertQueryBudget(2, 'post', '/ai-interview/api/synthesize-speech/',
+                                       data={'text': 'Hello'}, content_type='application/json')
+            self.assertQueryBudget(7, 'post', f'/ai-interview/api/start-recording/{session_id}/')
+            self.assertQueryBudget(5, 'post', f'/ai-interview/api/stop-recording/{session_id}/')
+            self.assertQueryBudget(5, 'post', '/ai-interview/api/upload-video/', data={
+                'session_id': session_id, 'video': SimpleUploadedFile('take.webm', b'video', 'video/webm'),
+            })
+            self.assertQueryBudget(7, 'post', f'/ai-interview/complete/{session_id}/',
+                                   content_type='application/json')
+
+    def test_account_views(self):
+        session_id = self.session.id
+        budgets = [
+            (6, 'get', '/profile/'),
+            (3, 'get', '/profile/edit/'),
+            (5, 'get', '/history/'),
+            (4, 'get', '/history/?status=completed&difficulty=easy&q=Problem'),
+            (5, 'get', f'/history/{session_id}/'),
+        ]
+        for budget, method, path in budgets:
+            with self.subTest(path=path):
+                self.assertQueryBudget(budget, method, path)
+
+    def test_account_write_views(self):
+        self.assertQueryBudget(6, 'post', '/profile/edit/', data={'first_name': 'Ada', 'bio': 'Hi'})
+        with mock.patch('ai_interview.auth_views.supabase_service.upload_avatar',
+                        return_value=(True, 'https://example.com/me.png')):
+            self.assertQueryBudget(4, 'post', '/profile/upload-avatar/', data={
+                'avatar': SimpleUploadedFile('me.png', b'png', 'image/png'),
+            })
+        self.assertQueryBudget(8, 'post', f'/history/{self.session.id}/delete/')
+        self.assertQueryBudget(4, 'get', '/accounts/logout/')
+        self.assertQueryBudget(0, 'get', '/accounts/signup/')
+        self.assertQueryBudget(12, 'post', '/accounts/signup/', data={
+            'username': 'newcomer', 'email': 'new@example.com', 'password': 'password123',
+            'password_confirm': 'password123',
+        })
+
+    @modify_settings(MIDDLEWARE={'append': 'ai_interview.middleware.QueryCountMiddleware'})
+    def test_query_count_middleware(self):
+        with self.assertLogs('ai_interview.middleware', 'INFO') as logs:
+            self.client.get('/history/')
+        self.assertRegex(logs.output[0], r'^INFO:.*GET /history/ 200: 5 queries')
+
+        with override_settings(QUERY_COUNT_WARNING_THRESHOLD=2), \
+                self.assertLogs('ai_interview.middleware', 'INFO') as logs:
+            self.client.get('/history/')
+        self.assertTrue(logs.output[0].startswith('WARNING:'))
+
+    def test_consumer_handlers(self):
+        # Database calls of the consumer run on this thread, so a wrapper on
+        # its connection sees them; each step counts what it added
+        executed = []
+        counts = {}
+
+        def record(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        async def settle(communicator):
+            # Drain replies until the handler goes quiet, so its queries are all counted
+            while not await communicator.receive_nothing(0.1):
+                if (await communicator.receive_output())['type'] == 'websocket.close':
+                    break
+
+        async def step(communicator, name, frame):
+            before = len(executed)
+            await communicator.send_json_to(frame)
+            await settle(communicator)
+            counts[name] = len(executed) - before
+
+        async def interview(session):
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/interview/{session.id}/")
+            before = len(executed)
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await settle(communicator)
+            counts['connect'] = len(executed) - before
+            await step(communicator, 'chat_message', {'type': 'chat_message', 'message': 'Should I sort?', 'client_msg_id': 'm1'})
+            await step(communicator, 'code_submission', {'type': 'code_submission', 'code': 'pass', 'language': 'python'})
+            await step(communicator, 'request_hint', {'type': 'request_hint', 'hint_level': 1})
+            await step(communicator, 'analyze_code', {'type': 'analyze_code', 'code': 'pass'})
+            await step(communicator, 'resume', {'type': 'resume', 'last_seq': 0})
+            await step(communicator, 'tts_ready', {'type': 'tts_ready', 'seq': 1})
+            await step(communicator, 'end_interview', {'type': 'end_interview'})
+            before = len(executed)
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait()
+            counts['disconnect'] = len(executed) - before
+
+        # Preparing with a problem already chosen: greeted on connect, then guided
+        session = InterviewSession.objects.create(user=self.user, problem=self.session.problem, status='preparing')
+        with connection.execute_wrapper(record):
+            async_to_sync(interview)(session)
+
+        budgets = {
+            'connect': 2, 'chat_message': 4, 'code_submission': 2, 'request_hint': 1, 'analyze_code': 1,
+            'resume': 0, 'tts_ready': 0, 'end_interview': 2, 'disconnect': 1,
+        }
+        for name, budget in budgets.items():
+            with self.subTest(handler=name):
+                self.assertLessEqual(counts[name], budget)
@@ -0,0 +1,55 @@
+"""
+Canonical interview topics.
+
+Topics are identified by their LeetCode tag slug so they can be passed
+straight to the questionList ``tags`` filter. Each topic lists the phrases
+candidates use for it; the intent matcher recognises exactly these.
+"""
+from typing import Dict, Optional
+
+# LeetCode tag slug -> phrases that refer to it (in the order topics are reported)
+TOPICS = {
+    'array': ['array', 'arrays'],
+    'string': ['string', 'strings'],
+    'tree': ['tree', 'trees'],
+    'graph': ['graph', 'graphs'],
+    'dynamic-programming': ['dynamic programming', 'dp'],
+    'binary-search': ['binary search'],
+    'two-pointers': ['two pointer', 'two pointers'],
+    'sliding-window': ['sliding window'],
+    'hash-table': ['hash', 'hash table', 'hash tables'],
+    'stack': ['stack', 'stacks'],
+    'queue': ['queue', 'queues'],
+    'linked-list': ['linked list', 'linked lists'],
+    'recursion': ['recursion'],
+    'backtracking': ['backtracking'],
+    'greedy': ['greedy'],
+    'sorting': ['sorting'],
+    'heap-priority-queue': ['heap'],
+    'trie': ['trie'],
+    'union-find': ['union find'],
+    'segment-tree': ['segment tree'],
+    'binary-indexed-tree': ['fenwick tree'],
+}
+
+# Phrase -> tag slug
+TOPIC_SYNONYMS: Dict[str, str] = {
+    phrase: slug
+    for slug, phrases in TOPICS.items()
+    for phrase in phrases
+}
+
+
+def canonical_topic(topic: str) -> Optional[str]:
+    """
+    Map a topic name to its LeetCode tag slug.
+
+    Accepts tag slugs, any listed phrase and the names older sessions stored
+    (e.g. 'arrays', 'fenwick-tree'). Returns None for unknown topics.
+    """
+    if not topic:
+        return None
+    topic = topic.strip().lower()
+    if topic in TOPICS:
+        return topic
+    return TOPIC_SYNONYMS.get(topic) or TOPIC_SYNONYMS.get(topic.replace('-', ' '))
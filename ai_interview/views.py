@@ -1,24 +1,45 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 import json
+import logging
 from .models import InterviewSession, ChatMessage, CodeSubmission, Problem, InterviewRecording
 from .ai_agent import AIInterviewAgent
 from .voice_service import voice_service
+from .session_prefetch import start_session_prefetch
+from .session_replay import session_replay
+from .message_writer import chat_message_writer
+from .latency_timeline import timeline_rows, timeline_summary
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics_publisher, render as render_metrics
 from django.contrib.auth import get_user_model
 
+logger = logging.getLogger(__name__)
+
+
+def flush_local_messages():
+    """
+    Write the chat messages buffered in this process before reading a
+    transcript. This only covers the current process: messages buffered by
+    the Daphne worker serving the session's WebSocket are written by that
+    consumer on disconnect and before it sends the end-of-interview close
+    or a resync, which are what bring the client to these pages.
+    """
+    chat_message_writer.flush()
+
 
 @login_required
 def interview_page(request, session_id):
     """Main interview page with chat interface and IDE."""
-    session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
+    session = get_object_or_404(InterviewSession.objects.select_related('problem'), id=session_id, user=request.user)
+    flush_local_messages()
     
     # Get chat messages for this session
-    messages = ChatMessage.objects.filter(session=session).order_by('timestamp')
+    messages = ChatMessage.objects.filter(session=session).order_by('timestamp', 'id')
     
     # Get code submissions
     code_submissions = CodeSubmission.objects.filter(session=session).order_by('timestamp')
@@ -27,7 +48,9 @@ def interview_page(request, session_id):
         'session': session,
         'messages': messages,
         'code_submissions': code_submissions,
-        'websocket_url': f'ws://{request.get_host()}/ws/interview/{session_id}/'
+        'websocket_url': f'ws://{request.get_host()}/ws/interview/{session_id}/',
+        # Frames up to this sequence number are already rendered from the database
+        'replay_seq': session_replay.last_seq(session.id)
     }
     
     return render(request, 'ai_interview/interview.html', context)
@@ -55,6 +78,8 @@ def start_interview(request):
             user=request.user,
             status='preparing'
         )
+        # Warm pools, exclusions and greeting audio while the page loads
+        start_session_prefetch(session)
         return redirect('interview_page', session_id=session.id)
     
     return render(request, 'ai_interview/start_interview.html')
@@ -63,7 +88,9 @@ def start_interview(request):
 @login_required
 def complete_interview(request, session_id):
     """Complete the interview and generate feedback."""
-    session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
+    session = get_object_or_404(InterviewSession.objects.select_related('problem'), id=session_id, user=request.user)
+    # Feedback reads the whole transcript
+    flush_local_messages()
     
     if request.method == 'POST':
         try:
@@ -81,7 +108,7 @@ def complete_interview(request, session_id):
                 session.save()
             except Exception as feedback_error:
                 # If feedback generation fails, log it but don't block completion
-                print(f"Error generating feedback: {feedback_error}")
+                logger.error(f"Error generating feedback: {feedback_error}")
                 session.ai_feedback = "Feedback generation in progress. Please refresh the page in a moment."
                 session.save()
             
@@ -103,7 +130,7 @@ def complete_interview(request, session_id):
                 }, status=500)
             else:
                 # For non-AJAX requests, still redirect but log the error
-                print(f"Error completing interview: {e}")
+                logger.error(f"Error completing interview: {e}")
                 return redirect('interview_results', session_id=session.id)
     
     return render(request, 'ai_interview/complete_interview.html', {'session': session})
@@ -112,16 +139,19 @@ def complete_interview(request, session_id):
 @login_required
 def interview_results(request, session_id):
     """Display interview results and feedback."""
-    session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
+    session = get_object_or_404(
+        InterviewSession.objects.select_related('problem', 'recording'), id=session_id, user=request.user
+    )
+    flush_local_messages()
     
     # Get all messages and code submissions
-    messages = ChatMessage.objects.filter(session=session).order_by('timestamp')
+    messages = ChatMessage.objects.filter(session=session).order_by('timestamp', 'id')
     code_submissions = CodeSubmission.objects.filter(session=session).order_by('timestamp')
     
     # Try to get recording data
     try:
         recording = session.recording
-    except:
+    except InterviewRecording.DoesNotExist:
         recording = None
     
     context = {
@@ -129,6 +159,8 @@ def interview_results(request, session_id):
         'messages': messages,
         'code_submissions': code_submissions,
         'recording': recording,
+        'latency_timeline': timeline_rows(session.latency_timeline),
+        'latency_summary': timeline_summary(session.latency_timeline),
     }
     
     return render(request, 'ai_interview/results.html', context)
@@ -164,9 +196,10 @@ def submit_code(request, session_id):
 @login_required
 def get_session_data(request, session_id):
     """API endpoint to get session data."""
-    session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
+    session = get_object_or_404(InterviewSession.objects.select_related('problem'), id=session_id, user=request.user)
+    flush_local_messages()
     
-    messages = ChatMessage.objects.filter(session=session).order_by('timestamp')
+    messages = ChatMessage.objects.filter(session=session).order_by('timestamp', 'id')
     code_submissions = CodeSubmission.objects.filter(session=session).order_by('timestamp')
     
     data = {
@@ -211,7 +244,7 @@ def get_session_data(request, session_id):
 @login_required
 def get_test_cases(request, session_id):
     """Get test cases for the current problem in the session."""
-    session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
+    session = get_object_or_404(InterviewSession.objects.select_related('problem'), id=session_id, user=request.user)
     
     if not session.problem:
         return JsonResponse({'test_cases': []})
@@ -273,7 +306,7 @@ def get_test_cases(request, session_id):
 @login_required
 def get_function_signature(request, session_id):
     """Get function signature for the current problem in the session."""
-    session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
+    session = get_object_or_404(InterviewSession.objects.select_related('problem'), id=session_id, user=request.user)
     
     if not session.problem:
         return JsonResponse({'function_signature': ''})
@@ -342,12 +375,13 @@ def get_last_ai_message(request, session_id):
     """Get the last AI message from a session for re-speaking."""
     try:
         session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
+        flush_local_messages()
         
         # Get the last AI message from the session
         last_message = ChatMessage.objects.filter(
             session=session,
             message_type='ai'
-        ).order_by('-timestamp').first()
+        ).order_by('-timestamp', '-id').first()
         
         if last_message:
             return JsonResponse({
@@ -463,3 +497,13 @@ def upload_video(request):
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """Prometheus metrics summed over every worker; reads only the cache."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    metrics_publisher.start()
+    return HttpResponse(render_metrics(metrics_publisher.collect()), content_type=METRICS_CONTENT_TYPE)
@@ -2,9 +2,14 @@ import os
 import io
 import base64
 import hashlib
+import logging
 from typing import Optional, Dict
 from elevenlabs import ElevenLabs, Voice, VoiceSettings
 from django.conf import settings
+from .instrumentation import counter, span
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 
 class VoiceService:
@@ -16,11 +21,13 @@ class VoiceService:
         if api_key:
             self.client = ElevenLabs(api_key=api_key)
         else:
-            print("Warning: ELEVEN_LABS_API_KEY not found in environment variables")
+            logger.warning("Warning: ELEVEN_LABS_API_KEY not found in environment variables")
             self.client = None
         
         # Audio cache to store generated speech
         self.audio_cache: Dict[str, str] = {}  # text_hash -> base64_audio
+        # Concurrent requests for the same uncached audio share one synthesis
+        self._flights = SingleFlight()
     
     def generate_speech(self, text: str, voice_id: str = "21m00Tcm4TlvDq8ikWAM") -> Optional[str]:
         """
@@ -34,7 +41,7 @@ class VoiceService:
             Base64 encoded audio data or None if failed
         """
         if not self.client:
-            print("ElevenLabs client not initialized - API key missing")
+            logger.warning("ElevenLabs client not initialized - API key missing")
             return None
             
         try:
@@ -46,11 +53,26 @@ class VoiceService:
             
             # Check if we have cached audio for this text
             if cache_key in self.audio_cache:
-                print(f"Using cached audio for text: '{clean_text[:30]}...'")
+                counter('tts_cache_requests_total', result='hit').inc()
+                logger.debug(f"Using cached audio for text: '{clean_text[:30]}...'")
                 return self.audio_cache[cache_key]
             
-            print(f"Generating new audio for text: '{clean_text[:30]}...'")
+            counter('tts_cache_requests_total', result='miss').inc()
+            return self._flights.do(cache_key, lambda: self._synthesize(clean_text, voice_id, cache_key))
             
+        except Exception as e:
+            logger.error(f"Error generating speech: {e}")
+            return None
+    
+    def _synthesize(self, clean_text: str, voice_id: str, cache_key: str) -> str:
+        """Generate speech with ElevenLabs and cache it. Raises on failure."""
+        # Another caller may have cached it since generate_speech checked
+        if cache_key in self.audio_cache:
+            return self.audio_cache[cache_key]
+        
+        logger.debug(f"Generating new audio for text: '{clean_text[:30]}...'")
+        
+        with span('tts.synthesize', voice_id=voice_id, characters=len(clean_text)):
             # Generate speech using ElevenLabs
             audio_generator = self.client.text_to_speech.convert(
                 voice_id=voice_id,
@@ -63,21 +85,18 @@ class VoiceService:
                 )
             )
             
-            # Convert generator to bytes
+            # Convert generator to bytes (the audio streams in as it is consumed)
             audio_bytes = b''.join(audio_generator)
-            
-            # Convert audio to base64 for web transmission
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            
-            # Cache the audio for future use
-            self.audio_cache[cache_key] = audio_base64
-            print(f"Cached audio for future use. Cache size: {len(self.audio_cache)}")
-            
-            return audio_base64
-            
-        except Exception as e:
-            print(f"Error generating speech: {e}")
-            return None
+        counter('tts_characters_total').inc(len(clean_text))
+        
+        # Convert audio to base64 for web transmission
+        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+        
+        # Cache the audio for future use
+        self.audio_cache[cache_key] = audio_base64
+        logger.debug(f"Cached audio for future use. Cache size: {len(self.audio_cache)}")
+        
+        return audio_base64
     
     def _clean_text_for_speech(self, text: str) -> str:
         """
@@ -143,7 +162,7 @@ class VoiceService:
     def clear_cache(self) -> None:
         """Clear the audio cache to free memory"""
         self.audio_cache.clear()
-        print("Audio cache cleared")
+        logger.info("Audio cache cleared")
     
     def get_cache_stats(self) -> dict:
         """
@@ -178,7 +197,7 @@ class VoiceService:
                 for voice in voice_list
             ]
         except Exception as e:
-            print(f"Error fetching voices: {e}")
+            logger.warning(f"Error fetching voices: {e}")
             return []
     
     def is_available(self) -> bool:
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -57,6 +58,12 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Log per-request query counts and time while developing; requests over
+# QUERY_COUNT_WARNING_THRESHOLD queries are logged as warnings
+QUERY_COUNT_WARNING_THRESHOLD = 20
+if DEBUG:
+    MIDDLEWARE.append("ai_interview.middleware.QueryCountMiddleware")
+
 ROOT_URLCONF = "interview_platform.urls"
 
 TEMPLATES = [
@@ -134,24 +141,159 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Redis shared by the channel layer and the cache
+REDIS_URL = os.getenv('REDIS_URL', 'redis://172.27.247.142:6379')
+
 # Channels configuration
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [("172.27.247.142", 6379)],
+            "hosts": [REDIS_URL],
         },
     },
 }
 
+# The default cache holds state every Daphne worker must see: WebSocket replay
+# buffers and client message ids, per-session problem exclusions, LeetCode
+# responses and the metrics snapshots /metrics merges. It must be shared, so it
+# lives in Redis (database 1, apart from the channel layer). A process-local
+# backend fails the ai_interview.E001 system check.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv('CACHE_REDIS_URL', f"{REDIS_URL}/1"),
+    },
+}
+
+# manage.py test runs in a single process and needs no Redis
+if sys.argv[1:2] == ['test']:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    SILENCED_SYSTEM_CHECKS = ['ai_interview.E001']
+
+# WebSocket resume: frames kept per session for replay after a reconnect
+INTERVIEW_REPLAY_BUFFER_SIZE = 50
+INTERVIEW_REPLAY_TIMEOUT = 60 * 60  # seconds
+
+# How often a consumer with peers re-checks that they are still there; a peer
+# that does not answer within one interval is forgotten
+INTERVIEW_PRESENCE_CHECK_INTERVAL = 30  # seconds
+
+# Chat messages are persisted write-behind: batched with bulk_create every
+# CHAT_MESSAGE_FLUSH_INTERVAL seconds or once CHAT_MESSAGE_BATCH_SIZE are queued.
+CHAT_MESSAGE_WRITE_BEHIND = True
+CHAT_MESSAGE_BATCH_SIZE = 20
+CHAT_MESSAGE_FLUSH_INTERVAL = 0.5  # seconds
+
+# Random problem selection draws from in-memory (difficulty, topic) pools of
+# up to PROBLEM_POOL_SIZE question IDs, refreshed every PROBLEM_POOL_TTL seconds
+PROBLEM_POOL_SIZE = 1000
+PROBLEM_POOL_TTL = 6 * 60 * 60  # seconds
+
+# A background worker keeps PROBLEM_WARMER_READY_COUNT fully materialised
+# Problem rows per (difficulty, topic) pool so selection is a database read
+PROBLEM_WARMER_ENABLED = True
+PROBLEM_WARMER_READY_COUNT = 3
+
+# Starting a session warms its exclusion set, likely problem pools and the
+# greeting audio in the background
+SESSION_PREFETCH_ENABLED = True
+
+# Parsed problem content is memoized by content hash (and stored in the
+# database); this bounds the in-memory layer
+PARSED_CONTENT_CACHE_SIZE = 512
+
+# sync_leetcode_catalog fetches questionList pages of LEETCODE_CATALOG_PAGE_SIZE
+# with LEETCODE_CATALOG_WORKERS concurrent requests; an interrupted sync
+# resumes from the checkpoint file
+LEETCODE_CATALOG_PAGE_SIZE = 100
+LEETCODE_CATALOG_WORKERS = 8
+LEETCODE_CATALOG_CHECKPOINT = BASE_DIR / 'leetcode_catalog_checkpoint.json'
+
+# GraphQL endpoint LeetCodeService talks to. Point it at a local stand-in
+# (manage.py leetcode_standin) to benchmark or load-test offline.
+LEETCODE_GRAPHQL_URL = os.getenv('LEETCODE_GRAPHQL_URL', 'https://leetcode.com/graphql')
+
+# leetcode.com requests (sync and async) share these limits. Failed requests
+# are retried LEETCODE_MAX_RETRIES times with jittered exponential backoff
+# starting at LEETCODE_RETRY_BACKOFF seconds; problem lists and details are
+# cached in the default cache for LEETCODE_RESPONSE_CACHE_TTL seconds
+LEETCODE_CONNECT_TIMEOUT = 5  # seconds
+LEETCODE_READ_TIMEOUT = 20  # seconds
+LEETCODE_MAX_CONNECTIONS = 20
+LEETCODE_MAX_RETRIES = 2
+LEETCODE_RETRY_BACKOFF = 0.5  # seconds
+LEETCODE_RESPONSE_CACHE_TTL = 60 * 60  # seconds
+
+# Outbound leetcode.com requests are throttled by a token bucket of
+# LEETCODE_RATE_LIMIT requests/second (bursts up to LEETCODE_RATE_LIMIT_BURST),
+# shared by all workers through Redis when LEETCODE_RATE_LIMIT_REDIS_URL is set.
+# After LEETCODE_BREAKER_THRESHOLD consecutive failures requests are refused for
+# LEETCODE_BREAKER_RESET seconds and problems are served from the database.
+LEETCODE_RATE_LIMIT = 5
+LEETCODE_RATE_LIMIT_BURST = 10
+LEETCODE_RATE_LIMIT_MAX_WAIT = 10  # seconds
+LEETCODE_RATE_LIMIT_REDIS_URL = os.getenv('LEETCODE_RATE_LIMIT_REDIS_URL')
+LEETCODE_BREAKER_THRESHOLD = 5
+LEETCODE_BREAKER_RESET = 30  # seconds
+
 # Kronos Labs API Key
 KRONOS_API_KEY = os.getenv('KRONOS_API_KEY')
 
+# LLM used by the interviewer. ai_interview.llm_backends.StandInBackend
+# returns deterministic local completions for benchmarks and load tests
+# (options: time_to_first_token, tokens_per_second, failure_rate, seed);
+# KronosBackend takes model (default "hermes").
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'ai_interview.llm_backends.KronosBackend')
+LLM_BACKEND_OPTIONS = {}
+
 # Supabase Configuration
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 SUPABASE_BUCKET = os.getenv('SUPABASE_BUCKET', 'interview-recordings')
 
+# Logging. AI_INTERVIEW_LOG_LEVEL sets the level of the ai_interview
+# loggers (WARNING or ERROR to quieten them in production). Every timing
+# span is logged as a JSON line to ai_interview.spans when
+# AI_INTERVIEW_SPAN_LOG_LEVEL is DEBUG; spans feed the in-process
+# histograms (ai_interview.instrumentation) whatever the level.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+        'json': {'()': 'ai_interview.instrumentation.JsonFormatter'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+        'spans': {'class': 'logging.StreamHandler', 'formatter': 'json'},
+    },
+    'loggers': {
+        'ai_interview': {
+            'handlers': ['console'],
+            'level': os.getenv('AI_INTERVIEW_LOG_LEVEL', 'INFO'),
+        },
+        'ai_interview.spans': {
+            'handlers': ['spans'],
+            'level': os.getenv('AI_INTERVIEW_SPAN_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Each InterviewSession keeps a latency timeline of up to
+# LATENCY_TIMELINE_MAX_TURNS turns; the results page and admin highlight
+# replies slower than LATENCY_TIMELINE_SLOW_MS.
+LATENCY_TIMELINE_MAX_TURNS = 500
+LATENCY_TIMELINE_SLOW_MS = 5000
+
+# Prometheus metrics at /metrics. Each worker publishes its counters to the
+# cache every METRICS_PUBLISH_INTERVAL seconds (0 disables publishing) and a
+# scrape sums them, which needs a cache shared by the workers. When
+# METRICS_TOKEN is set, scrapes must send "Authorization: Bearer <token>".
+METRICS_PUBLISH_INTERVAL = 15
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 # Static files configuration
 STATICFILES_DIRS = [
     BASE_DIR / "static",
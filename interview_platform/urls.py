@@ -32,6 +32,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("", interview_views.home, name='home'),
     path("ai-interview/", include('ai_interview.urls')),
+    path("metrics", interview_views.metrics, name='metrics'),
     
     # Authentication
     path("accounts/login/", auth_views.LoginView.as_view(), name='login'),